@@ -1,6 +1,9 @@
 import streamlit as st
 from utils import init_session_state
 
+from ofstedai.startup import startup_report
+from ofstedai.telemetry import stage_report
+
 init_session_state()
 
 st.title("Ofsted AI Copilot")
@@ -12,3 +15,9 @@ To get started search for a collection of Schools on the [Search](/Search) page.
 This will load reports for an AI Chat interface on the [Chat](/Chat) page.
 """
 )
+
+with st.sidebar.expander("Start up timings"):
+    st.dataframe(startup_report(), hide_index=True)
+
+with st.sidebar.expander("Stage timings"):
+    st.dataframe(stage_report(), hide_index=True)
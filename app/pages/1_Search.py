@@ -1,60 +1,34 @@
+import os
 import pathlib
 
 import streamlit as st
-from tqdm import tqdm
-from utils import add_chunks_to_vector_store, init_session_state
-
-from ofstedai.api.ofsted_api import (
-    BASE_OFSTED_URL,
-    extract_reports,
-    extract_school_pages,
-    get_pages,
-)
-from ofstedai.models.file import Chunk, File
+from utils import get_lexical_index, get_vector_store, init_session_state
+
+from ofstedai.api.crawler import BASE_OFSTED_URL
 from ofstedai.parsing.file_chunker import FileChunker
+from ofstedai.pipeline import CrawlStateStore, IngestPipeline
+from ofstedai.storage.content_cache import ContentCache
 
 init_session_state()
 
 
-def get_reports_from_url(url: str):
-    with st.spinner("Fetching pages from Ofsted..."):
-        pages = get_pages(url)
-
-    with st.spinner("Fetching pages from Ofsted..."):
-        school_page_progress_bar = st.progress(0)
-        for i, page in tqdm(
-            enumerate(pages),
-            desc="Fetching links: ",
-            unit="page",
-            position=0,
-            leave=True,
-        ):
-            schools = extract_school_pages(page)
-            school_page_progress_bar.progress(float(i + 1) / len(pages))
-        # Hide the progress bar
-        school_page_progress_bar.empty()
-
-    reports_and_schools = []
-    with st.spinner("Fetching reports from Ofsted..."):
-        school_report_progress_bar = st.progress(0)
-        for i, school_url in tqdm(
-            enumerate(schools),
-            desc="Fetching school reports: ",
-            unit="school",
-            position=0,
-            leave=True,
-        ):
-            extracted_report_paths, school_names = extract_reports(school_url)
-            for i, report in enumerate(extracted_report_paths):
-                reports_and_schools.append((report, school_url, school_names[i]))
-            school_report_progress_bar.progress(float(i + 1) / len(schools))
-        # Hide the progress bar
-        school_report_progress_bar.empty()
-
-    return reports_and_schools
-
-
-file_chunker = FileChunker()
+@st.cache_resource
+def get_file_chunker() -> FileChunker:
+    """One chunker, and so one process pool, shared by every session"""
+    return FileChunker(max_workers=os.cpu_count() or 1)
+
+
+@st.cache_resource
+def get_content_cache() -> ContentCache:
+    return ContentCache(path=pathlib.Path("./data/Cache/content_cache.jsonl"))
+
+
+@st.cache_resource
+def get_crawl_state() -> CrawlStateStore:
+    return CrawlStateStore(st.session_state.storage_handler)
+
+
+file_chunker = get_file_chunker()
 
 
 st.title("Ofsted AI Copilot - Search 🔍")
@@ -99,48 +73,57 @@ if categories[categories_input] is not None:
 run_button = st.button("Load School Reports")
 
 if run_button:
-    reports_and_schools = get_reports_from_url(url_input)
+    pipeline = IngestPipeline(
+        storage_handler=st.session_state.storage_handler,
+        vector_store=get_vector_store(),
+        lexical_index=get_lexical_index(),
+        file_chunker=file_chunker,
+        content_cache=get_content_cache(),
+        crawl_state=get_crawl_state(),
+    )
 
-    if len(reports_and_schools) == 0:
+    with st.spinner("Fetching, chunking and indexing reports from Ofsted..."):
+        report_indexing_progress_bar = st.progress(0)
+        stage_stats_table = st.empty()
+
+        for event in pipeline.run(url_input):
+            if event.error:
+                st.error(
+                    f"Failed to {event.stage} {event.file_name or 'reports'}, error: {event.error}"
+                )
+            elif event.cached:
+                st.toast(body=f"{event.file_name} Unchanged")
+            elif event.stage == "index" and not event.done:
+                st.toast(body=f"{event.file_name} Complete")
+
+            stats = {stage_stats.name: stage_stats for stage_stats in event.stats}
+            if stats["download"].processed > 0:
+                report_indexing_progress_bar.progress(
+                    min(
+                        (stats["index"].processed + stats["index"].skipped)
+                        / stats["download"].processed,
+                        1.0,
+                    )
+                )
+            stage_stats_table.dataframe(
+                [
+                    {
+                        "Stage": stage_stats.name,
+                        "Processed": stage_stats.processed,
+                        "Failed": stage_stats.failed,
+                        "Unchanged": stage_stats.skipped,
+                        "Per second": round(stage_stats.throughput, 2),
+                        "Queued": stage_stats.queue_depth,
+                    }
+                    for stage_stats in event.stats
+                ],
+                hide_index=True,
+            )
+
+        report_indexing_progress_bar.empty()
+
+    if stats["download"].processed == 0:
         st.warning("⚠️ No reports found. Try broadening your search criteria.")
         st.stop()
 
-    report_indexing_progress_bar = st.progress(0)
-    for i, report_and_school in enumerate(reports_and_schools):
-        report_path, school_url, school_name = report_and_school
-        file_type = pathlib.Path(report_path).suffix
-        file_name = pathlib.Path(report_path).stem
-
-        file = File(
-            path=report_path,
-            school_url=school_url,
-            school_name=school_name,
-            type=file_type,
-            name=file_name,
-            storage_kind="local",
-            creator_user_uuid="dev",
-        )
-
-        with st.spinner(f"Chunking **{file.name}**"):
-            try:
-                chunks = file_chunker.chunk_file(file=file)
-            except TypeError as err:
-                st.error(f"Failed to process {file.name}, error: {str(err)}")
-                raise err
-
-        # ==================== SAVING ====================
-
-        with st.spinner(f"Saving **{file.name}**"):
-            st.session_state.storage_handler.write_item(item=file)
-            st.session_state.storage_handler.write_items(items=chunks)
-
-        # ==================== INDEXING ====================
-
-        with st.spinner(f"Indexing **{file.name}**"):
-            add_chunks_to_vector_store(chunks=chunks)
-
-        st.toast(body=f"{file.name} Complete")
-        report_indexing_progress_bar.progress(float(i + 1) / len(reports_and_schools))
-    report_indexing_progress_bar.empty()
-
     st.success(f"✅ Successfully loaded reports")
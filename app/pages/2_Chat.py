@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 
 import streamlit as st
@@ -6,18 +7,39 @@ from langchain.chains.llm import LLMChain
 from langchain.chains.qa_with_sources import load_qa_with_sources_chain
 from langchain.prompts import PromptTemplate
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from prompts import CONDENSE_QUESTION_PROMPT, STUFF_DOCUMENT_PROMPT, WITH_SOURCES_PROMPT
 from utils import (
     StreamlitStreamHandler,
     avatar_map,
     create_initial_chat_prompt,
+    get_chat_session_store,
+    get_lexical_index,
+    get_llm,
+    get_vector_store,
     init_session_state,
+    load_chat_session,
     refresh_files,
     render_citation_response,
     show_chat_history,
 )
 
+from ofstedai import telemetry
+from ofstedai.chat import (
+    QuestionCondenser,
+    TimeToFirstTokenHandler,
+    compare_schools,
+    get_answer_cache,
+    pack_context,
+)
+from ofstedai.chat.prompts import (
+    CONDENSE_QUESTION_PROMPT,
+    MAP_SCHOOL_PROMPT,
+    REDUCE_COMPARISON_PROMPT,
+    STUFF_DOCUMENT_PROMPT,
+    WITH_SOURCES_PROMPT,
+)
 from ofstedai.models.chat import ChatMessage
+from ofstedai.retrieval import HybridRetriever
+from ofstedai.vectorstore import get_embedding_function
 
 init_session_state()
 
@@ -34,7 +56,11 @@ st.session_state["school_name_to_file_uuid_map"] = {}
 
 refresh_files()
 
-doc_retrieval_k = 10
+doc_retrieval_k = 20
+# Input tokens allowed for retrieved documents in the answer prompt
+context_token_budget = 3000
+# Schools summarised at once when comparing
+comparison_concurrency = 4
 
 clear_chat = st.sidebar.button("Clear Chat")
 
@@ -47,13 +73,20 @@ if on:
         options=list(st.session_state.school_name_to_file_uuid_map.keys()),
     )
 
-    parent_file_uuid_list = st.session_state.school_name_to_file_uuid_map[
-        school_select[0]
-    ]
+    parent_file_uuid_list = st.session_state.school_name_to_file_uuid_map[school_select]
 else:
     # st.write("OFF. Chatting over all documents.")
     parent_file_uuid_list = []
 
+compare_on = st.sidebar.toggle("Toggle to compare schools")
+
+if compare_on:
+    compare_select = st.sidebar.multiselect(
+        label="Select Schools to compare:",
+        options=list(st.session_state.school_name_to_file_uuid_map.keys()),
+        default=list(st.session_state.school_name_to_file_uuid_map.keys()),
+    )
+
 
 INITIAL_CHAT_PROMPT = create_initial_chat_prompt(
     CORE_OFSTED_PROMPT,
@@ -61,8 +94,14 @@ INITIAL_CHAT_PROMPT = create_initial_chat_prompt(
 )
 
 
+chat_session_store = get_chat_session_store()
+
 if "messages" not in st.session_state or clear_chat:
     st.session_state["messages"] = INITIAL_CHAT_PROMPT
+    # A stored session is only created once the first question is asked
+    st.session_state["chat_session_uuid"] = None
+    st.session_state["history_limit"] = chat_session_store.page_size
+    st.session_state["resume_chat"] = None
     # clear feedback
     for key in list(st.session_state.keys()):
         if key.startswith("feedback_"):
@@ -71,97 +110,240 @@ if "messages" not in st.session_state or clear_chat:
 if "ai_message_markdown_lookup" not in st.session_state:
     st.session_state["ai_message_markdown_lookup"] = {}
 
+previous_sessions = {
+    session.uuid: session.name
+    for session in chat_session_store.list_sessions(creator_user_uuid="dev")[:20]
+}
+resume_chat = st.sidebar.selectbox(
+    label="Resume a previous chat:",
+    options=[None, *previous_sessions.keys()],
+    format_func=lambda session_uuid: previous_sessions.get(session_uuid, "-"),
+    key="resume_chat",
+)
+if resume_chat is not None and resume_chat != st.session_state.chat_session_uuid:
+    st.session_state["history_limit"] = chat_session_store.page_size
+    load_chat_session(resume_chat, limit=st.session_state.history_limit)
+
+if (
+    st.session_state.chat_session_uuid is not None
+    and chat_session_store.message_count(st.session_state.chat_session_uuid)
+    > len(st.session_state.messages)
+    and st.button("Show earlier messages")
+):
+    st.session_state["history_limit"] += chat_session_store.page_size
+    load_chat_session(
+        st.session_state.chat_session_uuid, limit=st.session_state.history_limit
+    )
+
 now_formatted = datetime.now().isoformat().replace(".", "_")
 
 
 show_chat_history()
 
 
+@st.cache_resource
+def get_question_condenser() -> QuestionCondenser:
+    condense_question_chain = LLMChain(llm=get_llm(), prompt=CONDENSE_QUESTION_PROMPT)
+
+    def condense(question: str, chat_history: str) -> str:
+        return condense_question_chain(
+            {
+                "question": question,
+                "chat_history": chat_history,
+            }
+        )["text"]
+
+    return QuestionCondenser(condense)
+
+
 def answer_question(
-    question, chat_history, parent_file_uuid_list=[], callbacks=[], k=5
+    question,
+    chat_history,
+    parent_file_uuid_list=[],
+    callbacks=[],
+    k=5,
+    scope_file_uuids=[],
+    max_context_tokens=3000,
 ):
     docs_with_sources_chain = load_qa_with_sources_chain(
-        st.session_state.llm,
+        get_llm(),
         chain_type="stuff",
         prompt=WITH_SOURCES_PROMPT,
         document_prompt=STUFF_DOCUMENT_PROMPT,
         verbose=True,
     )
 
-    condense_question_chain = LLMChain(
-        llm=st.session_state.llm, prompt=CONDENSE_QUESTION_PROMPT
-    )
-
-    standalone_question = condense_question_chain(
-        {
-            "question": question,
-            "chat_history": chat_history,
-        }
-    )["text"]
+    standalone_question = get_question_condenser()(question, chat_history)
+
+    # Near-identical questions over the same files reuse the earlier answer
+    question_embedding = get_embedding_function().embed_query(standalone_question)
+    cached_result = get_answer_cache().get(question_embedding, scope_file_uuids)
+    if cached_result is not None:
+        return (cached_result, None)
+
+    with telemetry.span("retrieve", k=k, scoped=bool(parent_file_uuid_list)):
+        docs = HybridRetriever(
+            vector_store=get_vector_store(),
+            lexical_index=get_lexical_index(),
+            k=k,
+            parent_file_uuids=parent_file_uuid_list,
+        ).get_relevant_documents(
+            standalone_question,
+        )
+        docs = pack_context(docs, max_tokens=max_context_tokens)
+
+    with telemetry.span("answer", documents=len(docs)):
+        result = docs_with_sources_chain(
+            {
+                "question": standalone_question,
+                "input_documents": docs,
+            },
+            callbacks=callbacks,
+        )
 
-    search_kwargs = {
-        "k": k,
-    }
+    get_answer_cache().put(
+        standalone_question, question_embedding, scope_file_uuids, dict(result)
+    )
 
-    if len(parent_file_uuid_list) > 0:
-        search_kwargs["filter"] = {"parent_file_uuid": x for x in parent_file_uuid_list}
+    return (result, docs_with_sources_chain)
 
-    docs = st.session_state.vector_store.as_retriever(
-        search_kwargs=search_kwargs,
-    ).get_relevant_documents(
-        standalone_question,
-    )
 
-    result = docs_with_sources_chain(
-        {
-            "question": standalone_question,
-            "input_documents": docs,
-        },
-        callbacks=callbacks,
+def compare_question(
+    question,
+    chat_history,
+    school_names,
+    callbacks=[],
+    k=5,
+    max_context_tokens=2000,
+    max_concurrency=4,
+):
+    standalone_question = get_question_condenser()(question, chat_history)
+
+    def retrieve(question, file_uuids):
+        with telemetry.span("retrieve", k=k, scoped=True):
+            return HybridRetriever(
+                vector_store=get_vector_store(),
+                lexical_index=get_lexical_index(),
+                k=k,
+                parent_file_uuids=file_uuids,
+            ).get_relevant_documents(question)
+
+    result = asyncio.run(
+        compare_schools(
+            standalone_question,
+            school_file_uuids={
+                school_name: st.session_state.school_name_to_file_uuid_map[school_name]
+                for school_name in school_names
+            },
+            retrieve=retrieve,
+            llm=get_llm(),
+            map_prompt=MAP_SCHOOL_PROMPT,
+            reduce_prompt=REDUCE_COMPARISON_PROMPT,
+            document_prompt=STUFF_DOCUMENT_PROMPT,
+            max_concurrency=max_concurrency,
+            max_context_tokens=max_context_tokens,
+            callbacks=callbacks,
+        )
     )
 
-    return (result, docs_with_sources_chain)
+    return (result, None)
 
 
 if prompt := st.chat_input():
-    st.session_state.messages.append(
-        ChatMessage(
-            chain=None,
-            message=HumanMessage(content=prompt),
-            creator_user_uuid="dev",
-        )
+    if st.session_state.chat_session_uuid is None:
+        st.session_state["chat_session_uuid"] = chat_session_store.create_session(
+            st.session_state.messages, creator_user_uuid="dev"
+        ).uuid
+
+    question_message = ChatMessage(
+        chain=None,
+        message=HumanMessage(content=prompt),
+        creator_user_uuid="dev",
+    )
+    st.session_state.messages.append(question_message)
+    chat_session_store.append_message(
+        st.session_state.chat_session_uuid, question_message
     )
     st.chat_message("user", avatar=avatar_map["user"]).write(prompt)
 
     with st.chat_message("assistant", avatar=avatar_map["assistant"]):
         response_stream_text = st.empty()
 
-        response, chain = answer_question(
-            question=prompt,
-            chat_history=st.session_state.messages,
-            parent_file_uuid_list=parent_file_uuid_list,
-            k=doc_retrieval_k,
-            callbacks=[
-                StreamlitStreamHandler(
-                    text_element=response_stream_text, initial_text=""
-                ),
-            ],
+        stream_handler = StreamlitStreamHandler(
+            text_element=response_stream_text, initial_text=""
         )
-
-        response_final_markdown = render_citation_response(response)
+        callbacks = [stream_handler, TimeToFirstTokenHandler()]
+
+        # Every stage of the turn is traced under this span
+        with telemetry.span("chat_turn", compare=bool(compare_on)):
+            if compare_on and len(compare_select) > 0:
+                response, chain = compare_question(
+                    question=prompt,
+                    chat_history=st.session_state.messages,
+                    school_names=compare_select,
+                    k=doc_retrieval_k,
+                    max_context_tokens=context_token_budget,
+                    max_concurrency=comparison_concurrency,
+                    callbacks=callbacks,
+                )
+            else:
+                response, chain = answer_question(
+                    question=prompt,
+                    chat_history=st.session_state.messages,
+                    parent_file_uuid_list=parent_file_uuid_list,
+                    k=doc_retrieval_k,
+                    max_context_tokens=context_token_budget,
+                    scope_file_uuids=parent_file_uuid_list
+                    or list(st.session_state.file_uuid_map.keys()),
+                    callbacks=callbacks,
+                )
+
+            response_final_markdown = render_citation_response(response)
 
         response_stream_text.empty()
         response_stream_text.markdown(response_final_markdown, unsafe_allow_html=True)
 
-    st.session_state.messages.append(
-        ChatMessage(
-            chain=chain,
-            message=AIMessage(content=response["output_text"]),
-            creator_user_uuid="dev",
-        )
+        stream_stats = stream_handler.stats
+        if stream_stats["time_to_first_token"] is not None:
+            st.session_state.setdefault("stream_stats", []).append(stream_stats)
+            st.caption(
+                f"First token in {stream_stats['time_to_first_token']:.2f}s, "
+                f"{stream_stats['tokens_per_second'] or 0:.0f} tokens/s"
+            )
+
+    # The chain isn't kept, it would hold the whole prompt and documents
+    answer_message = ChatMessage(
+        chain=None,
+        message=AIMessage(content=response["output_text"]),
+        creator_user_uuid="dev",
+    )
+    st.session_state.messages.append(answer_message)
+    chat_session_store.append_message(
+        st.session_state.chat_session_uuid,
+        answer_message,
+        markdown=response_final_markdown,
     )
 
     # Store the markdown response for later rendering
-    st.session_state.ai_message_markdown_lookup[
-        hash(response["output_text"])
-    ] = response_final_markdown
+    st.session_state.ai_message_markdown_lookup[hash(response["output_text"])] = (
+        response_final_markdown
+    )
+
+    # Only the latest page of history stays in memory, older pages are read
+    # back from storage on request. The system prompt is always kept.
+    if len(st.session_state.messages) > st.session_state.history_limit:
+        system_messages = [
+            message
+            for message in st.session_state.messages[:1]
+            if isinstance(message.message, SystemMessage)
+        ]
+        st.session_state["messages"] = (
+            system_messages
+            + st.session_state.messages[-st.session_state.history_limit :]
+        )
+        kept = {hash(message.message.content) for message in st.session_state.messages}
+        st.session_state["ai_message_markdown_lookup"] = {
+            key: markdown
+            for key, markdown in st.session_state.ai_message_markdown_lookup.items()
+            if key in kept
+        }
@@ -1,6 +1,6 @@
-import json
 import os
 import pathlib
+import time
 from collections import defaultdict
 from datetime import date
 from typing import List
@@ -8,16 +8,20 @@ from typing import List
 import dotenv
 import streamlit as st
 from langchain.callbacks.base import BaseCallbackHandler
-from langchain.chat_models.anthropic import ChatAnthropic
 from langchain.prompts import PromptTemplate
 from langchain.schema import AIMessage, SystemMessage
 from langchain.schema.output import LLMResult
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.vectorstores import Chroma
 
+from ofstedai import retrieval, telemetry, vectorstore
+from ofstedai.chat import (
+    ChatSessionStore,
+    cited_page_numbers,
+    create_chat_model,
+    replace_citations,
+)
 from ofstedai.models import Chunk, File
 from ofstedai.models.chat import ChatMessage
-from ofstedai.storage.filesystem import FileSystemStorageHandler
+from ofstedai.storage import get_storage_handler
 
 # fmt: off
 avatar_map = {"human": "🧑‍💻", "ai": "🦉", "user": "🧑‍💻", "assistant" : "🦉"}
@@ -32,90 +36,150 @@ def init_session_state() -> dict:
     # Grab it as a dictionary too for convenience
     ENV = dotenv.dotenv_values(".env")
 
+    # Both only take effect once per process, however often the page reruns
+    if ENV.get("TRACE_FILE"):
+        telemetry.configure_tracing(ENV["TRACE_FILE"])
+    if ENV.get("METRICS_PORT"):
+        telemetry.start_metrics_server(int(ENV["METRICS_PORT"]))
+
     if "storage_handler" not in st.session_state:
         persistency_folder_path = pathlib.Path("./data/")
-        st.session_state.storage_handler = FileSystemStorageHandler(
-            root_path=persistency_folder_path
+        st.session_state.storage_handler = get_storage_handler(
+            backend=ENV.get("STORAGE_BACKEND") or "filesystem",
+            root_path=persistency_folder_path,
         )
 
-    if "llm" not in st.session_state:
-        st.session_state.llm = ChatAnthropic(
-            anthropic_api_key=ENV["ANTHROPIC_API_KEY"],
-            max_tokens=500,
-            temperature=0.3,
-            streaming=True,
-        )
+    return ENV
 
-    if "embedding_function" not in st.session_state:
-        st.session_state.embedding_function = SentenceTransformerEmbeddings()
 
-    if "vector_store" not in st.session_state:
-        persist_directory = os.path.join("data", "VectorStore")
+@st.cache_resource
+def get_llm():
+    """The chat model, shared by every session and created on first use"""
+    return create_chat_model(dotenv.dotenv_values(".env")["ANTHROPIC_API_KEY"])
 
-        if not os.path.exists(persist_directory):
-            os.makedirs(persist_directory)
 
-        st.session_state.vector_store = Chroma(
-            embedding_function=st.session_state.embedding_function,
-            persist_directory=persist_directory,
+@st.cache_resource
+def get_chat_session_store() -> ChatSessionStore:
+    """Stored chat sessions, shared by every session so idle ones can be evicted"""
+    return ChatSessionStore(
+        get_storage_handler(
+            backend=os.environ.get("STORAGE_BACKEND") or "filesystem",
+            root_path=pathlib.Path("./data/"),
         )
+    )
 
-    return ENV
+
+def load_chat_session(session_uuid: str, limit: int = None):
+    """Read the latest page of a stored chat into the session state"""
+    messages = get_chat_session_store().read_messages(session_uuid, limit=limit)
+    st.session_state["chat_session_uuid"] = session_uuid
+    st.session_state["messages"] = [message.to_chat_message() for message in messages]
+    st.session_state["ai_message_markdown_lookup"] = {
+        hash(message.content): message.markdown
+        for message in messages
+        if message.markdown is not None
+    }
+
+
+def get_vector_store():
+    """The vector store, shared by every session and opened on first use"""
+    return vectorstore.get_vector_store(
+        persist_directory=os.path.join("data", "VectorStore")
+    )
+
+
+def get_lexical_index():
+    """The keyword index, shared by every session and opened on first use"""
+    return retrieval.get_lexical_index(
+        pathlib.Path("./data/LexicalIndex/lexical.sqlite3")
+    )
 
 
 class StreamlitStreamHandler(BaseCallbackHandler):
-    """Callback handler for streamlit stream elements"""
+    """Callback handler for streamlit stream elements.
+
+    Tokens are buffered and the element redrawn at most every
+    `flush_interval` seconds, or sooner once `flush_chars` characters are
+    waiting, rather than on every token. Time to first token and tokens per
+    second are recorded in `stats`.
+    """
+
+    # Async chains otherwise call sync handlers from an executor thread,
+    # which has no streamlit script context to write elements from
+    run_inline = True
 
-    def __init__(self, text_element, initial_text=""):
+    def __init__(
+        self, text_element, initial_text="", flush_interval=0.1, flush_chars=400
+    ):
         self.text_element = text_element
-        self.text = initial_text
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+
+        self._parts = [initial_text]
+        self._pending_chars = 0
+        self._last_flush = 0.0
+        self._start = time.perf_counter()
+        self._first_token = None
+        self.token_count = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def stats(self) -> dict:
+        """Time to first token and generation speed of the latest response"""
+        if self._first_token is None:
+            return {"time_to_first_token": None, "tokens": 0, "tokens_per_second": None}
+        generating = time.perf_counter() - self._first_token
+        return {
+            "time_to_first_token": self._first_token - self._start,
+            "tokens": self.token_count,
+            "tokens_per_second": self.token_count / generating if generating else None,
+        }
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        self._start = time.perf_counter()
+        self._first_token = None
+        self.token_count = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self.on_llm_start(serialized, [], **kwargs)
 
     def on_llm_new_token(self, token: str, **kwargs) -> None:
-        self.text += token
-        self.text_element.write(self.text)
+        now = time.perf_counter()
+        if self._first_token is None:
+            self._first_token = now
+        self.token_count += 1
+
+        self._parts.append(token)
+        self._pending_chars += len(token)
+        if (
+            now - self._last_flush >= self.flush_interval
+            or self._pending_chars >= self.flush_chars
+        ):
+            self.sync()
 
     def on_llm_end(self, response: LLMResult, **kwargs) -> None:
         self.text_element.empty()
 
     def sync(self):
-        self.text_element.write(self.text)
+        text = self.text
+        self._parts = [text]
+        self._pending_chars = 0
+        self._last_flush = time.perf_counter()
+        self.text_element.write(text)
 
 
 def add_chunks_to_vector_store(chunks: List[Chunk]) -> None:
-    """Takes a list of Chunks and embeds them into the vector store
+    """Takes a list of Chunks and embeds them into the vector store, and adds
+    them to the keyword index
 
     Args:
         chunks (List[Chunk]): The chunks to be added to the vector store
     """
-
-    metadatas = [dict(chunk.metadata) for chunk in chunks]
-
-    for i, chunk in enumerate(chunks):
-        # add other chunk fields to metadata
-        metadatas[i]["uuid"] = chunk.uuid
-        metadatas[i]["parent_file_uuid"] = chunk.parent_file_uuid
-        metadatas[i]["index"] = chunk.index
-        metadatas[i]["created_datetime"] = chunk.created_datetime
-        metadatas[i]["token_count"] = chunk.token_count
-        metadatas[i]["text_hash"] = chunk.text_hash
-
-    sanitised_metadatas = []
-
-    for metadata in metadatas:
-        for k, v in metadata.items():
-            if isinstance(v, list) or isinstance(v, dict):
-                # Converting {k} metadata into JSON string to make vectorstore safe
-                metadata[k] = json.dumps(metadata[k], ensure_ascii=False)
-
-        sanitised_metadatas.append(metadata)
-
-    batch_size = 160
-    for i in range(0, len(chunks), batch_size):
-        st.session_state.vector_store.add_texts(
-            texts=[chunk.text for chunk in chunks[i : i + batch_size]],
-            metadatas=[meta for meta in sanitised_metadatas[i : i + batch_size]],
-            ids=[chunk.uuid for chunk in chunks[i : i + batch_size]],
-        )
+    vectorstore.add_chunks_to_vector_store(get_vector_store(), chunks)
+    get_lexical_index().add_chunks(chunks)
 
 
 def refresh_files():
@@ -176,59 +240,22 @@ def get_files_by_uuid(file_uuids):
     return files
 
 
-def replace_doc_ref(
-    output_for_render: str = "",
-    files: List[File] = [],
-    page_numbers: List = [],
-    flexible=False,
-):
-    if len(page_numbers) != len(files):
-        page_numbers = [None for _ in files]
-
-    modified_text = output_for_render
-
-    for i, file in enumerate(files):
-        file_button = f"[{file.name}]({file.school_url})"
-
-        strings_to_replace = [
-            f"<Doc{file.uuid}>",
-        ]
-        if flexible:
-            strings_to_replace += [
-                f"<Doc {file.uuid}>",
-                f"Doc {file.uuid}",
-                f"Document {file.uuid}",
-            ]
-
-        for string_to_replace in strings_to_replace:
-            modified_text = modified_text.replace(string_to_replace, file_button)
-    return modified_text
-
-
 def render_citation_response(response: str):
-    cited_chunks = [
-        (
-            chunk.metadata["parent_doc_uuid"],
-            chunk.metadata["filename"],
-            chunk.metadata["page_numbers"]
-            if "page_numbers" in chunk.metadata
-            else None,
-        )
-        for chunk in response["input_documents"]
-    ]
-    cited_chunks = set(cited_chunks)
-    cited_files = get_files_by_uuid([x[0] for x in cited_chunks])
-    page_numbers = [x[2] for x in cited_chunks]
+    page_numbers = cited_page_numbers(response["input_documents"])
 
-    for j, page_number in enumerate(page_numbers):
-        if isinstance(page_number, str):
-            page_numbers[j] = json.loads(page_number)
+    # Files come from the in-memory map, only reading any it doesn't hold yet
+    files = {
+        file_uuid: st.session_state.file_uuid_map[file_uuid]
+        for file_uuid in page_numbers
+        if file_uuid in st.session_state.file_uuid_map
+    }
+    missing = [file_uuid for file_uuid in page_numbers if file_uuid not in files]
+    if missing:
+        files.update({file.uuid: file for file in get_files_by_uuid(missing)})
 
-    response_markdown = replace_doc_ref(
+    return replace_citations(
         str(response["output_text"]),
-        cited_files,
+        files,
         page_numbers=page_numbers,
         flexible=True,
     )
-
-    return response_markdown
@@ -0,0 +1,297 @@
+"""Local stand-ins for the Ofsted reports site, the chat model and the
+embedding model, so the benchmark suite runs offline and repeatably."""
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult
+from langchain.schema.embeddings import Embeddings
+
+_SENTENCES = [
+    "Leaders have high expectations for what pupils can achieve.",
+    "Pupils behave well in lessons and around the school.",
+    "The curriculum is ambitious and carefully sequenced from the early years.",
+    "Staff receive regular training on safeguarding and know how to report concerns.",
+    "Pupils with special educational needs and/or disabilities are well supported.",
+    "Governors hold leaders to account for the quality of education.",
+    "Reading is prioritised and pupils who fall behind get extra help quickly.",
+    "Attendance has improved but too many pupils are still persistently absent.",
+    "Teachers check what pupils know and address misconceptions.",
+    "The arrangements for safeguarding are effective.",
+    "Pupils enjoy a wide range of clubs, trips and leadership roles.",
+    "In some subjects, the curriculum does not identify the key knowledge pupils need.",
+]
+_JUDGEMENTS = ["Outstanding", "Good", "Requires improvement", "Inadequate"]
+_MONTHS = ["January", "March", "May", "June", "September", "November"]
+
+
+def report_pages(urn: int, index: int, n_pages: int = 4, lines_per_page: int = 40):
+    """Lines of text for each page of a synthetic inspection report"""
+    rng = random.Random(urn * 100 + index)
+    pages = []
+    for page in range(n_pages):
+        lines = []
+        if page == 0:
+            lines += [
+                f"Inspection of Benchmark School {urn}",
+                f"Overall effectiveness: {rng.choice(_JUDGEMENTS)}",
+            ]
+        while len(lines) < lines_per_page:
+            lines.append(rng.choice(_SENTENCES))
+        pages.append(lines)
+    return pages
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal text PDF, one line of text per entry on each page"""
+    n_pages = len(pages)
+    page_ids = [4 + 2 * i for i in range(n_pages)]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {n_pages} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, lines in zip(page_ids, pages):
+        stream = (
+            "BT /F1 10 Tf 14 TL 50 760 Td "
+            + " ".join(f"({_pdf_string(line)}) Tj T*" for line in lines)
+            + " ET"
+        )
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return pdf
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections from a concurrent crawler
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeOfstedServer:
+    """Serves search, school and report pages shaped like reports.ofsted.gov.uk.
+
+    Search results list `schools_per_page` schools a page and link to the
+    next page. Each school's timeline links to `reports_per_school` PDFs.
+    Runs on a background thread; use as a context manager:
+
+        with FakeOfstedServer(n_schools=20) as server:
+            crawler = OfstedCrawler(base_url=server.url)
+            ...await crawler.crawl(server.search_url)
+
+    Args:
+        n_schools (int): Schools across all search pages.
+        reports_per_school (int): Reports on each school's timeline.
+        schools_per_page (int): Schools listed per search page.
+        pages_per_report (int): Pages in each report PDF.
+        latency_seconds (float): Added to every response, as network time.
+    """
+
+    def __init__(
+        self,
+        n_schools: int = 20,
+        reports_per_school: int = 3,
+        schools_per_page: int = 10,
+        pages_per_report: int = 4,
+        latency_seconds: float = 0.0,
+    ):
+        self.n_schools = n_schools
+        self.reports_per_school = reports_per_school
+        self.schools_per_page = schools_per_page
+        self.pages_per_report = pages_per_report
+        self.latency_seconds = latency_seconds
+        self._pdfs = {}
+        self._server: Optional[_Server] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.url}/search?q=benchmark&page=1"
+
+    def search_page(self, page: int) -> str:
+        first = (page - 1) * self.schools_per_page
+        urns = range(
+            100000 + first, 100000 + min(first + self.schools_per_page, self.n_schools)
+        )
+        items = "".join(
+            f'<li><h3><a href="/provider/21/{urn}">Benchmark School {urn}</a></h3></li>'
+            for urn in urns
+        )
+        next_link = ""
+        if first + self.schools_per_page < self.n_schools:
+            next_link = f'<a class="pagination__next" href="/search?q=benchmark&page={page + 1}">Next</a>'
+        return f'<html><body><ul class="results-list">{items}</ul>{next_link}</body></html>'
+
+    def school_page(self, urn: int) -> str:
+        days = "".join(
+            f'<li class="timeline__day"><a class="publication-link" '
+            f'href="{self.url}/documents/{urn}/{index}.pdf">Report '
+            f'<span class="nonvisual">Full inspection, Section 5 - '
+            f"{10 + index} {_MONTHS[index % len(_MONTHS)]} {2023 - index}</span></a></li>"
+            for index in range(self.reports_per_school)
+        )
+        return (
+            f'<html><body><h1 class="heading--title">Benchmark School {urn}</h1>'
+            f'<ol class="timeline">{days}</ol></body></html>'
+        )
+
+    def report_pdf(self, urn: int, index: int) -> bytes:
+        key = (urn, index)
+        if key not in self._pdfs:
+            self._pdfs[key] = make_pdf(report_pages(urn, index, self.pages_per_report))
+        return self._pdfs[key]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency_seconds)
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if parts[0] == "search":
+                    page = int(parse_qs(url.query).get("page", ["1"])[0])
+                    body, content_type = server.search_page(page).encode(), "text/html"
+                elif parts[0] == "provider":
+                    body, content_type = (
+                        server.school_page(int(parts[2])).encode(),
+                        "text/html",
+                    )
+                elif parts[0] == "documents":
+                    body = server.report_pdf(int(parts[1]), int(parts[2].split(".")[0]))
+                    content_type = "application/pdf"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Streams a canned answer citing the documents in its prompt, with a
+    configurable delay before the first token and between tokens"""
+
+    first_token_seconds: float = 0.3
+    token_seconds: float = 0.005
+    n_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        citations = list(dict.fromkeys(re.findall(r"<Doc([0-9a-f-]{36})>", prompt)))
+        words = " ".join(_SENTENCES).split(" ")
+        tokens = [f"{words[i % len(words)]} " for i in range(self.n_tokens)]
+        tokens.append(
+            "\nSources: " + " ".join(f"<Doc{uuid}>" for uuid in citations[:3])
+        )
+        return tokens
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        time.sleep(self.first_token_seconds)
+        for token in tokens:
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token)
+            time.sleep(self.token_seconds)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        await asyncio.sleep(self.first_token_seconds)
+        for token in tokens:
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token)
+            await asyncio.sleep(self.token_seconds)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))]
+        )
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors seeded by each text's hash, for runs that
+    leave the embedding model out"""
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).normal(size=self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,118 @@
+"""Recall against memory for the numpy vector index's quantized search.
+
+Searches the same queries in float32, float16 and int8, with and without
+exact rescoring of the candidates, and reports recall@k against exact
+float32 search along with the bytes per vector that must stay in memory.
+
+By default the index is built from synthetic clustered embeddings, which
+stand in for the near duplicate boilerplate of report chunks. Pass
+--persist-directory to measure an existing index instead; its quantized
+copies are built in place.
+
+    python benchmarks/quantization.py --n-vectors 200000
+"""
+
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+import typer
+
+from ofstedai.vectorstore.numpy_store import NumpyVectorStore, quantizations
+
+
+def make_embeddings(n_vectors: int, dim: int, n_topics: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(n_topics, size=n_vectors)]
+    vectors += 0.5 * rng.normal(size=(n_vectors, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int):
+    distances = (vectors**2).sum(axis=1)[None, :] - 2 * queries @ vectors.T
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def resident_bytes_per_vector(quantization: Optional[str], dim: int) -> int:
+    """The arrays scanned by every search: the vectors searched in and the
+    float32 norms, plus the int8 scales"""
+    if quantization == "float16":
+        return dim * 2 + 4
+    if quantization == "int8":
+        return dim + 4 + 4
+    return dim * 4 + 4
+
+
+def main(
+    n_vectors: int = 100000,
+    dim: int = 768,
+    n_topics: int = 500,
+    n_queries: int = 200,
+    k: int = 10,
+    rescore_factor: int = 4,
+    persist_directory: Optional[str] = None,
+):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = persist_directory or temporary_directory
+        store = NumpyVectorStore(directory, embedding_function=None)
+        if persist_directory is None:
+            vectors = make_embeddings(n_vectors, dim, n_topics)
+            for start in range(0, n_vectors, 10000):
+                batch = vectors[start : start + 10000]
+                store.add_embeddings(
+                    texts=[""] * len(batch),
+                    embeddings=batch,
+                    ids=[str(i) for i in range(start, start + len(batch))],
+                )
+        for quantization in quantizations:
+            store.quantize(quantization)
+
+        rows = np.flatnonzero(store._alive[: store._count])
+        vectors = np.asarray(store._vectors[rows])
+        dim = vectors.shape[1]
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.choice(len(vectors), n_queries, replace=False)]
+        queries = queries + 0.3 * rng.normal(size=queries.shape).astype(np.float32)
+        truth = rows[exact_neighbours(vectors, queries, k)]
+
+        typer.echo(
+            f"{len(rows)} vectors of {dim} dimensions, {n_queries} queries, recall@{k}:"
+        )
+        typer.echo(
+            f"  {'search':<24} {'bytes/vector':>12} {'MB in memory':>12} "
+            f"{'recall':>8} {'ms/query':>9}"
+        )
+        for quantization in [None, *quantizations]:
+            for factor in [1, rescore_factor] if quantization else [1]:
+                searcher = NumpyVectorStore(
+                    directory,
+                    embedding_function=None,
+                    quantization=quantization,
+                    rescore_factor=factor,
+                    n_probe=len(rows),
+                )
+                start = time.perf_counter()
+                found = [
+                    [row for row, _ in searcher._search(query, k, None)]
+                    for query in queries
+                ]
+                elapsed = (time.perf_counter() - start) / n_queries * 1000
+                recall = np.mean(
+                    [len(set(f) & set(t)) / k for f, t in zip(found, truth.tolist())]
+                )
+
+                name = quantization or "float32"
+                if quantization:
+                    name += f" rescore x{factor}" if factor > 1 else " no rescore"
+                per_vector = resident_bytes_per_vector(quantization, dim)
+                typer.echo(
+                    f"  {name:<24} {per_vector:>12} "
+                    f"{per_vector * len(rows) / 2**20:>12.1f} "
+                    f"{recall:>8.3f} {elapsed:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,78 @@
+"""Micro-benchmark for reading stored Chunks back into models.
+
+Compares the original read path (json.load then a new TypeAdapter per item)
+with the cached validator and trusted paths in ofstedai.storage.serialization.
+
+    python benchmarks/serialization.py --n-items 2000
+"""
+
+import json
+import pathlib
+import tempfile
+import time
+
+import typer
+from pydantic import TypeAdapter
+
+from ofstedai.models import Chunk
+from ofstedai.storage.filesystem import FileSystemStorageHandler
+from ofstedai.storage.serialization import deserialize_item, orjson
+
+
+def make_chunks(n_items: int):
+    return [
+        Chunk(
+            parent_file_uuid="benchmark",
+            index=i,
+            text="Pupils behave well and are keen to learn. " * 20,
+            metadata={"filename": "benchmark.pdf", "page_numbers": [1, 2]},
+            creator_user_uuid="benchmark",
+        )
+        for i in range(n_items)
+    ]
+
+
+def time_per_item(read, paths) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        read(path)
+    return (time.perf_counter() - start) / len(paths) * 1e6
+
+
+def original_read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return TypeAdapter(Chunk).validate_python(json.load(f))
+
+
+def cached_read(path):
+    with open(path, "rb") as f:
+        return deserialize_item(f.read(), Chunk)
+
+
+def trusted_read(path):
+    with open(path, "rb") as f:
+        return deserialize_item(f.read(), Chunk, trusted=True)
+
+
+def main(n_items: int = 2000):
+    with tempfile.TemporaryDirectory() as root:
+        storage_handler = FileSystemStorageHandler(root_path=pathlib.Path(root))
+        storage_handler.write_items(make_chunks(n_items))
+        paths = list((pathlib.Path(root) / "Chunk").iterdir())
+
+        baseline = time_per_item(original_read, paths)
+        results = {
+            "json.load + new TypeAdapter": baseline,
+            "cached validate_json": time_per_item(cached_read, paths),
+            f"trusted ({'orjson' if orjson else 'json'})": time_per_item(
+                trusted_read, paths
+            ),
+        }
+
+    typer.echo(f"Reading {n_items} Chunks, microseconds per item:")
+    for name, micros in results.items():
+        typer.echo(f"  {name:<32} {micros:8.1f}  ({baseline / micros:.1f}x)")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,293 @@
+"""Offline benchmark suite for each stage from crawl to answer.
+
+A local fake of the Ofsted reports site is crawled with OfstedCrawler, and
+the downloaded reports go through the FileChunker, each storage handler,
+embedding into the vector store, HybridRetriever and an answer chain
+streamed from a fake chat model. Every stage reports its throughput and
+p50/p95 latency.
+
+Results are written as JSON so runs can be compared. Pass an earlier result
+as --baseline to print the change per stage and flag regressions.
+
+    python benchmarks/suite.py --n-schools 20 --fake-embeddings
+    python benchmarks/suite.py --baseline benchmarks/results/<earlier>.json
+
+Without --fake-embeddings the real sentence transformer is timed, which
+needs it downloaded already to run offline.
+"""
+
+import asyncio
+import contextlib
+import json
+import pathlib
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import typer
+from fakes import FakeEmbeddings, FakeOfstedServer, FakeStreamingChatModel
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.chains.qa_with_sources import load_qa_with_sources_chain
+
+from ofstedai.api.crawler import OfstedCrawler
+from ofstedai.chat import pack_context
+from ofstedai.chat.prompts import STUFF_DOCUMENT_PROMPT, WITH_SOURCES_PROMPT
+from ofstedai.parsing.file_chunker import FileChunker
+from ofstedai.pipeline.ingest import report_to_file
+from ofstedai.retrieval import HybridRetriever, LexicalIndex
+from ofstedai.storage import get_storage_handler
+from ofstedai.storage.backends import storage_backends
+from ofstedai.vectorstore import (
+    EmbeddingService,
+    add_chunks_to_vector_store,
+    load_vector_store,
+)
+
+QUESTIONS = [
+    "How well do pupils behave?",
+    "What did inspectors say about safeguarding?",
+    "How is reading taught?",
+    "Is attendance a concern?",
+    "How are pupils with SEND supported?",
+    "What should the school do to improve?",
+    "How effective are leaders and governors?",
+    "What is the overall effectiveness judgement?",
+]
+
+# A stage this much slower at p50, or lower in throughput, than the
+# baseline is flagged as a regression
+REGRESSION_THRESHOLD = 0.1
+
+
+def summarise(latencies: List[float], items: int, seconds: float, unit: str) -> dict:
+    """Throughput and latency percentiles for one stage"""
+    return {
+        "unit": unit,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / seconds, 3) if seconds else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+    }
+
+
+class Timer:
+    """Collects the latency of each call made within `measure()`"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+
+    def summary(self, items: int, unit: str) -> dict:
+        return summarise(self.latencies, items, time.perf_counter() - self.start, unit)
+
+
+class FirstTokenTimer(BaseCallbackHandler):
+    """Records the time from the start of an answer to its first token"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token: Optional[float] = None
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.start
+
+
+async def crawl(server: FakeOfstedServer, ingest_folder: str):
+    timer = Timer()
+    async with OfstedCrawler(
+        base_url=server.url, requests_per_second=0, ingest_folder=ingest_folder
+    ) as crawler:
+        school_urls = await crawler.extract_school_pages(
+            await crawler.get_pages(server.search_url)
+        )
+
+        async def extract(school_url):
+            with timer.measure():
+                return await crawler.extract_reports(school_url)
+
+        results = await asyncio.gather(*(extract(url) for url in school_urls))
+    reports = [report for school_reports in results for report in school_reports]
+    return reports, timer.summary(len(reports), "reports")
+
+
+def run_suite(
+    root: pathlib.Path,
+    n_schools: int,
+    reports_per_school: int,
+    pages_per_report: int,
+    fake_embeddings: bool,
+    vector_backend: str,
+    first_token_seconds: float,
+) -> Dict[str, dict]:
+    stages = {}
+
+    with FakeOfstedServer(
+        n_schools=n_schools,
+        reports_per_school=reports_per_school,
+        pages_per_report=pages_per_report,
+    ) as server:
+        reports, stages["crawl"] = asyncio.run(crawl(server, str(root / "Ingest")))
+    files = [report_to_file(report) for report in reports]
+
+    timer = Timer()
+    chunker = FileChunker()
+    chunks_by_file = []
+    for file in files:
+        with timer.measure():
+            chunks_by_file.append(chunker.chunk_file(file))
+    n_chunks = sum(len(chunks) for chunks in chunks_by_file)
+    stages["chunk"] = timer.summary(len(files), "files")
+
+    for backend in storage_backends:
+        storage_handler = get_storage_handler(backend, root_path=root / backend)
+        timer = Timer()
+        for file, chunks in zip(files, chunks_by_file):
+            with timer.measure():
+                storage_handler.write_item(file)
+                storage_handler.write_items(chunks)
+        stages[f"store_write[{backend}]"] = timer.summary(n_chunks, "chunks")
+
+        timer = Timer()
+        for chunks in chunks_by_file:
+            with timer.measure():
+                storage_handler.read_items([chunk.uuid for chunk in chunks], "Chunk")
+        stages[f"store_read[{backend}]"] = timer.summary(n_chunks, "chunks")
+
+    if fake_embeddings:
+        embedding_function = FakeEmbeddings()
+    else:
+        embedding_function = EmbeddingService(cache=None)
+        # Loading the model is a one-off start up cost, not part of the stage
+        embedding_function.embed_documents(["warm up"])
+    vector_store = load_vector_store(
+        str(root / "VectorStore"),
+        embedding_function=embedding_function,
+        backend=vector_backend,
+    )
+    lexical_index = LexicalIndex(root / "LexicalIndex" / "lexical.sqlite3")
+
+    timer = Timer()
+    for chunks in chunks_by_file:
+        with timer.measure():
+            add_chunks_to_vector_store(vector_store, chunks)
+            lexical_index.add_chunks(chunks)
+    stages["embed"] = timer.summary(n_chunks, "chunks")
+
+    school_file_uuids = [
+        file.uuid for file in files if file.school_name == files[0].school_name
+    ]
+    for name, scope in [("retrieve", None), ("retrieve_scoped", school_file_uuids)]:
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            lexical_index=lexical_index,
+            k=20,
+            parent_file_uuids=scope,
+        )
+        timer = Timer()
+        for question in QUESTIONS * 4:
+            with timer.measure():
+                retriever.get_relevant_documents(question)
+        stages[name] = timer.summary(len(QUESTIONS) * 4, "queries")
+
+    chain = load_qa_with_sources_chain(
+        FakeStreamingChatModel(first_token_seconds=first_token_seconds),
+        chain_type="stuff",
+        prompt=WITH_SOURCES_PROMPT,
+        document_prompt=STUFF_DOCUMENT_PROMPT,
+    )
+    retriever = HybridRetriever(
+        vector_store=vector_store, lexical_index=lexical_index, k=20
+    )
+    timer = Timer()
+    first_tokens = []
+    for question in QUESTIONS:
+        first_token_timer = FirstTokenTimer()
+        with timer.measure():
+            docs = pack_context(retriever.get_relevant_documents(question))
+            chain(
+                {"question": question, "input_documents": docs},
+                callbacks=[first_token_timer],
+            )
+        first_tokens.append(first_token_timer.first_token)
+    stages["answer"] = timer.summary(len(QUESTIONS), "answers")
+    stages["time_to_first_token"] = summarise(
+        first_tokens, len(QUESTIONS), sum(first_tokens), "answers"
+    )
+    return stages
+
+
+def compare(stages: Dict[str, dict], baseline: Dict[str, dict]):
+    """Print each stage's change against a baseline run"""
+    typer.echo("\nAgainst baseline:")
+    for name, stage in stages.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        p50_change = stage["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0
+        regressed = p50_change > REGRESSION_THRESHOLD
+        if stage["throughput"] and before["throughput"]:
+            throughput_change = stage["throughput"] / before["throughput"] - 1
+            regressed = regressed or throughput_change < -REGRESSION_THRESHOLD
+        else:
+            throughput_change = 0
+        typer.echo(
+            f"  {name:<26} p50 {p50_change:+7.1%}  throughput {throughput_change:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+
+
+def main(
+    n_schools: int = 20,
+    reports_per_school: int = 3,
+    pages_per_report: int = 4,
+    fake_embeddings: bool = False,
+    vector_backend: str = "chroma",
+    first_token_seconds: float = 0.3,
+    output_dir: pathlib.Path = pathlib.Path(__file__).parent / "results",
+    baseline: Optional[pathlib.Path] = None,
+):
+    config = {
+        "n_schools": n_schools,
+        "reports_per_school": reports_per_school,
+        "pages_per_report": pages_per_report,
+        "fake_embeddings": fake_embeddings,
+        "vector_backend": vector_backend,
+        "first_token_seconds": first_token_seconds,
+    }
+    with tempfile.TemporaryDirectory() as root:
+        stages = run_suite(pathlib.Path(root), **config)
+
+    typer.echo(
+        f"  {'stage':<26} {'items':>7} {'throughput':>20} {'p50 ms':>9} {'p95 ms':>9}"
+    )
+    for name, stage in stages.items():
+        throughput = f"{stage['throughput'] or 0:.1f} {stage['unit']}/s"
+        typer.echo(
+            f"  {name:<26} {stage['items']:>7} {throughput:>20} "
+            f"{stage['p50_ms']:>9.1f} {stage['p95_ms']:>9.1f}"
+        )
+
+    started = datetime.now().isoformat(timespec="seconds")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{started.replace(':', '-')}.json"
+    with open(output_path, "w") as f:
+        json.dump({"started": started, "config": config, "stages": stages}, f, indent=4)
+    typer.echo(f"\nWrote {output_path}")
+
+    if baseline is not None:
+        with open(baseline) as f:
+            compare(stages, json.load(f)["stages"])
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1 @@
+from ofstedai import startup  # noqa: F401, start the start up clock first
@@ -0,0 +1,448 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from ofstedai import telemetry
+from ofstedai.models.report import Report
+from ofstedai.storage.content_cache import ContentCache, UrlCacheEntry, hash_content
+
+BASE_OFSTED_URL = "https://reports.ofsted.gov.uk"
+DEFAULT_INGEST_FOLDER = "./data/Ingest"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Total number of requests in flight at once across all hosts
+DEFAULT_MAX_CONCURRENCY = 16
+# Requests started per second against any single host, 0 disables the limit
+DEFAULT_REQUESTS_PER_SECOND = 8.0
+
+# Decides whether a report found on a school's timeline should be downloaded
+ReportFilter = Callable[[Report], bool]
+# Called with the URL and name of each school whose timeline was read
+SchoolCallback = Callable[[str, str], None]
+
+
+def parse_next_page_url(html: bytes, base_url: str = BASE_OFSTED_URL) -> Optional[str]:
+    """Find the link to the next page of a paginated search result"""
+    soup = BeautifulSoup(html, "html.parser")
+    next_button = soup.find("a", class_="pagination__next")
+
+    if next_button:
+        return base_url + next_button["href"]
+
+
+def parse_school_links(html: bytes, base_url: str = BASE_OFSTED_URL) -> List[str]:
+    """Find every school page linked from a search result page"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    school_urls = []
+    links = soup.select("ul.results-list > li > h3")
+    for link in links:
+        tag = link.find("a", href=True)
+        if tag:
+            school_urls.append(base_url + tag["href"])
+    return school_urls
+
+
+def parse_school_name(html: bytes) -> str:
+    """Read the school's name from the heading of its page"""
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.find("h1", class_="heading--title").text.strip()
+
+
+def parse_school_timeline(
+    html: bytes, school_url: str, ingest_folder: str = DEFAULT_INGEST_FOLDER
+) -> List[Report]:
+    """Read the publication timeline on a school page into a list of Reports.
+
+    Args:
+        html (bytes): The content of the school page.
+        school_url (str): The URL the school page was fetched from.
+        ingest_folder (str): The folder the report PDFs will be downloaded to.
+
+    Returns:
+        List[Report]: One Report per publication, in timeline order.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    school = soup.find("h1", class_="heading--title").text.strip()
+    timeline_ol = soup.find("ol", class_="timeline")
+
+    reports = []
+    for li in timeline_ol.find_all("li", class_="timeline__day"):
+        # Skip the events with class 'timeline__day--opened'
+        if "timeline__day--opened" in li.get("class", []):
+            continue
+
+        try:
+            # Find the publication link within the <a> tag
+            publication_link = li.find("a", class_="publication-link")
+            date_span = publication_link.find("span", class_="nonvisual")
+
+            if not date_span:
+                raise Exception("No date span found for given element")
+
+            date_text = date_span.text.strip()
+
+            inspection_type = date_text.split(",")[0].strip().replace(" ", "-")
+            formatted_date = date_text.split("-")[-1].strip()
+            formatted_date = formatted_date.lower().replace(" ", "-")
+
+            result_string = f"{inspection_type.lower()}_{formatted_date}"
+
+            filename = f"{school}_{result_string}.pdf"
+            filename = filename.replace(" ", "-").lower()
+
+            reports.append(
+                Report(
+                    school_url=school_url,
+                    school_name=school,
+                    pdf_url=publication_link["href"],
+                    path=os.path.join(ingest_folder, filename),
+                    inspection_type=inspection_type,
+                    date_text=date_text,
+                    published_date=parse_published_date(date_text),
+                    filename=filename,
+                )
+            )
+        except Exception:
+            continue
+    return reports
+
+
+def parse_published_date(date_text: str) -> Optional[str]:
+    """Read the ISO publication date from a timeline entry such as
+    "Full inspection, Section 5 - 12 March 2023", if it has one"""
+    try:
+        return (
+            datetime.strptime(date_text.split("-")[-1].strip(), "%d %B %Y")
+            .date()
+            .isoformat()
+        )
+    except ValueError:
+        return None
+
+
+def _write_bytes(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+class HostRateLimiter:
+    """Spaces out the start of requests to each host by a fixed interval"""
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        """Wait until a request to the host of `url` is allowed to start"""
+        if not self.interval:
+            return
+
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class OfstedCrawler:
+    """An asyncio crawl engine for the Ofsted reports site.
+
+    All requests share one pooled keep-alive HTTP session. The number of
+    requests in flight is bounded by `max_concurrency` and each host is
+    limited to `requests_per_second` request starts. Pass a ContentCache to
+    skip downloading reports that have not changed since the last crawl.
+
+    Use as an async context manager:
+
+        async with OfstedCrawler() as crawler:
+            reports = await crawler.crawl(search_url)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        max_retries: int = 5,
+        delay_seconds: float = 5,
+        ingest_folder: str = DEFAULT_INGEST_FOLDER,
+        content_cache: Optional[ContentCache] = None,
+        base_url: str = BASE_OFSTED_URL,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.delay_seconds = delay_seconds
+        self.ingest_folder = ingest_folder
+        self.content_cache = content_cache
+        # Relative links on search pages are resolved against this
+        self.base_url = base_url
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        if not os.path.exists(self.ingest_folder):
+            os.makedirs(self.ingest_folder)
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.session = aiohttp.ClientSession(
+            headers=DEFAULT_HEADERS,
+            connector=aiohttp.TCPConnector(
+                limit=self.max_concurrency, keepalive_timeout=30
+            ),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    async def request(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """Make a GET request, retrying when Ofsted responds with a 403.
+
+        Args:
+            url (str): The URL to fetch.
+            headers (Dict[str, str], optional): Extra request headers.
+
+        Returns:
+            Optional[Tuple[int, bytes, Dict[str, str]]]: The status, body and
+                headers of a 200 or 304 response, or None if the request failed.
+        """
+        for attempt in range(self.max_retries):
+            async with self._semaphore:
+                await self.rate_limiter.wait(url)
+                try:
+                    with telemetry.span("http_fetch", url=url) as fetch_span:
+                        async with self.session.get(url, headers=headers) as response:
+                            status = response.status
+                            fetch_span.set(status=status)
+                            if status in (200, 304):
+                                content = await response.read()
+                                fetch_span.set(bytes=len(content))
+                                return status, content, dict(response.headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    print(f"Request to {url} failed: {err}")
+                    return None
+
+            if status == 403:
+                print(
+                    f"Received 403 Forbidden. Retrying... (Attempt {attempt + 1}/{self.max_retries})"
+                )
+                await asyncio.sleep(self.delay_seconds)
+            else:
+                # Handle other status codes if needed
+                print(f"Received unexpected status code: {status}")
+                break
+
+        print(f"Failed to retrieve data after {self.max_retries} attempts. Exiting.")
+        return None
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """Fetch the body of a URL, or None if the request failed"""
+        response = await self.request(url)
+        if response is None:
+            return None
+        _, content, _ = response
+        return content
+
+    async def fetch_search_page(self, url: str) -> Tuple[Optional[str], List[str]]:
+        """Fetch one search result page.
+
+        Returns:
+            Tuple[Optional[str], List[str]]: The next page URL, if any, and the
+                school URLs listed on the page.
+        """
+        html = await self.fetch(url)
+        if html is None:
+            return None, []
+        return (
+            parse_next_page_url(html, self.base_url),
+            parse_school_links(html, self.base_url),
+        )
+
+    async def iter_search_pages(self, url: str) -> AsyncIterator[Tuple[str, List[str]]]:
+        """Follow the pagination of a search, yielding each page URL with
+        the school URLs found on it as soon as the page is fetched."""
+        while url:
+            next_page_url, school_urls = await self.fetch_search_page(url)
+            yield url, school_urls
+            url = next_page_url
+
+    async def get_pages(self, url: str) -> List[str]:
+        """Get the URL of every page of a search result"""
+        return [page async for page, _ in self.iter_search_pages(url)]
+
+    async def extract_school_pages(self, page_urls: List[str]) -> List[str]:
+        """Fetch a set of search result pages concurrently and return the
+        school URLs listed across all of them, in page order."""
+        results = await asyncio.gather(
+            *(self.fetch_search_page(url) for url in page_urls)
+        )
+        school_urls = []
+        for _, page_school_urls in results:
+            for school_url in page_school_urls:
+                if school_url not in school_urls:
+                    school_urls.append(school_url)
+        return school_urls
+
+    async def download_report(self, report: Report) -> Optional[Report]:
+        """Download the PDF for a report to its local path.
+
+        With a content cache, the request is conditional on the ETag and
+        Last-Modified of the previous download and an unchanged report is
+        served from the copy already on disk.
+        """
+        headers = {}
+        if self.content_cache is not None:
+            headers = self.content_cache.conditional_headers(report.pdf_url)
+
+        response = await self.request(report.pdf_url, headers=headers)
+        if response is None:
+            return None
+        status, content, response_headers = response
+
+        if status == 304:
+            cached = self.content_cache.get_url(report.pdf_url)
+            if cached is not None:
+                report.path = cached.path
+                report.content_hash = cached.content_hash
+                return report
+
+            # The cached copy went missing after the request was made, so
+            # fetch the report in full
+            response = await self.request(report.pdf_url)
+            if response is None:
+                return None
+            status, content, response_headers = response
+
+        report.content_hash = hash_content(content)
+        await asyncio.to_thread(_write_bytes, report.path, content)
+
+        if self.content_cache is not None:
+            self.content_cache.put_url(
+                UrlCacheEntry(
+                    url=report.pdf_url,
+                    path=report.path,
+                    content_hash=report.content_hash,
+                    etag=response_headers.get("ETag"),
+                    last_modified=response_headers.get("Last-Modified"),
+                )
+            )
+        return report
+
+    async def extract_reports(
+        self,
+        school_url: str,
+        report_filter: Optional[ReportFilter] = None,
+        on_school: Optional[SchoolCallback] = None,
+    ) -> List[Report]:
+        """Fetch a school page and download all of its reports concurrently.
+
+        Args:
+            school_url (str): The school page to read the timeline from.
+            report_filter (ReportFilter, optional): Only reports it returns
+                True for are downloaded.
+            on_school (SchoolCallback, optional): Called once the timeline has
+                been read, even if it has no reports to download.
+        """
+        html = await self.fetch(school_url)
+        if html is None:
+            return []
+
+        try:
+            reports = parse_school_timeline(
+                html, school_url, ingest_folder=self.ingest_folder
+            )
+        except AttributeError:
+            print(f"No report timeline found for {school_url}")
+            return []
+
+        if on_school is not None:
+            school_name = reports[0].school_name if reports else parse_school_name(html)
+            on_school(school_url, school_name)
+
+        if report_filter is not None:
+            reports = [report for report in reports if report_filter(report)]
+
+        downloaded = await asyncio.gather(
+            *(self.download_report(report) for report in reports)
+        )
+        return [report for report in downloaded if report is not None]
+
+    async def _iter_completed(self, tasks: List[asyncio.Task]) -> AsyncIterator[Report]:
+        try:
+            for task in asyncio.as_completed(tasks):
+                for report in await task:
+                    yield report
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_reports(
+        self,
+        url: str,
+        report_filter: Optional[ReportFilter] = None,
+        on_school: Optional[SchoolCallback] = None,
+    ) -> AsyncIterator[Report]:
+        """Crawl a search and yield each downloaded report as it completes.
+
+        Schools are scheduled as soon as the search page listing them is
+        fetched, so report downloads overlap with the remaining pagination.
+        """
+        seen_school_urls = set()
+        tasks = []
+        async for _, school_urls in self.iter_search_pages(url):
+            for school_url in school_urls:
+                if school_url in seen_school_urls:
+                    continue
+                seen_school_urls.add(school_url)
+                tasks.append(
+                    asyncio.create_task(
+                        self.extract_reports(
+                            school_url,
+                            report_filter=report_filter,
+                            on_school=on_school,
+                        )
+                    )
+                )
+
+        async for report in self._iter_completed(tasks):
+            yield report
+
+    async def iter_school_reports(
+        self,
+        school_urls: List[str],
+        report_filter: Optional[ReportFilter] = None,
+        on_school: Optional[SchoolCallback] = None,
+    ) -> AsyncIterator[Report]:
+        """Yield each downloaded report for a known set of schools as it completes"""
+        tasks = [
+            asyncio.create_task(
+                self.extract_reports(
+                    school_url, report_filter=report_filter, on_school=on_school
+                )
+            )
+            for school_url in dict.fromkeys(school_urls)
+        ]
+        async for report in self._iter_completed(tasks):
+            yield report
+
+    async def crawl(self, url: str) -> List[Report]:
+        """Crawl a search and download every report for every school in it"""
+        return [report async for report in self.iter_reports(url)]
@@ -1,15 +1,11 @@
+import asyncio
 import os
-import time
-from functools import lru_cache
+from typing import List
 
-import requests
 import streamlit as st
-import typer
-from bs4 import BeautifulSoup
-from tqdm import tqdm
 
-BASE_OFSTED_URL = "https://reports.ofsted.gov.uk"
-data = {"pages": [], "schools": []}
+from ofstedai.api.crawler import BASE_OFSTED_URL, OfstedCrawler
+from ofstedai.models.report import Report
 
 if not os.path.exists("./data"):
     os.makedirs("./data")
@@ -18,112 +14,56 @@ if not os.path.exists("./data/Ingest"):
     os.makedirs("./data/Ingest")
 
 
-@st.cache_data
-def make_request(url, max_retries=5, delay_seconds=5):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+def run_crawler(crawl, **crawler_kwargs):
+    """Run a coroutine function against a fresh OfstedCrawler and return its result.
 
-    for attempt in range(max_retries):
-        response = requests.get(url, headers=headers)
+    Args:
+        crawl: An async function taking the open crawler as its only argument.
+        **crawler_kwargs: Passed through to OfstedCrawler.
+    """
 
-        if response.status_code == 403:
-            print(
-                f"Received 403 Forbidden. Retrying... (Attempt {attempt + 1}/{max_retries})"
-            )
-            time.sleep(delay_seconds)
-        elif response.status_code == 200:
-            return response
-        else:
-            # Handle other status codes if needed
-            print(f"Received unexpected status code: {response.status_code}")
-            break
+    async def _run():
+        async with OfstedCrawler(**crawler_kwargs) as crawler:
+            return await crawl(crawler)
 
-    print(f"Failed to retrieve data after {max_retries} attempts. Exiting.")
-    return None
+    return asyncio.run(_run())
 
 
 @st.cache_data
-def extract_next_page_url(url):
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, "html.parser")
-    next_button = soup.find("a", class_="pagination__next")
+def make_request(url, max_retries=5, delay_seconds=5):
+    """Fetch the body of a URL, or None if the request failed"""
+    return run_crawler(
+        lambda crawler: crawler.fetch(url),
+        max_retries=max_retries,
+        delay_seconds=delay_seconds,
+    )
 
-    if next_button:
-        return BASE_OFSTED_URL + next_button["href"]
+
+@st.cache_data
+def extract_next_page_url(url):
+    next_page_url, _ = run_crawler(lambda crawler: crawler.fetch_search_page(url))
+    return next_page_url
 
 
 @st.cache_data
 def get_pages(url):
-    data["pages"].append(url)
-    found_all_pages = False
-    with tqdm(
-        total=None, desc="Fetching page links: ", unit="page", position=0, leave=True
-    ) as pbar:
-        while not found_all_pages:
-            next_page_url = extract_next_page_url(url)
-            if next_page_url:
-                data["pages"].append(next_page_url)
-                url = next_page_url
-                pbar.update(1)  # Increment the progress bar
-            else:
-                found_all_pages = True
-    return data["pages"]
+    return run_crawler(lambda crawler: crawler.get_pages(url))
 
 
 @st.cache_data
 def extract_school_pages(url):
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, "html.parser")
-
-    links = soup.select("ul.results-list > li > h3")
-    for link in links:
-        tag = link.find("a", href=True)
-        if tag:
-            data["schools"].append(BASE_OFSTED_URL + tag["href"])
-    return data["schools"]
+    return run_crawler(lambda crawler: crawler.extract_school_pages([url]))
 
 
 @st.cache_data
 def extract_reports(url):
-    page = make_request(url)
-    soup = BeautifulSoup(page.content, "html.parser")
-    report_paths = []
-    school_names = []
-    school = soup.find("h1", class_="heading--title").text.strip()
-    timeline_ol = soup.find("ol", class_="timeline")
-    for li in timeline_ol.find_all("li", class_="timeline__day"):
-        # Skip the events with class 'timeline__day--opened'
-        if "timeline__day--opened" in li.get("class", []):
-            continue
-
-        try:
-            # Find the publication link within the <a> tag
-            publication_link = li.find("a", class_="publication-link")
-            date_span = publication_link.find("span", class_="nonvisual")
-
-            if not date_span:
-                raise Exception("No date span found for given element")
-
-            date_text = date_span.text.strip()
-
-            inspection_type = date_text.split(",")[0].strip().replace(" ", "-")
-            formatted_date = date_text.split("-")[-1].strip()
-            formatted_date = formatted_date.lower().replace(" ", "-")
-
-            result_string = f"{inspection_type.lower()}_{formatted_date}"
-
-            pdf_url = publication_link["href"]
-
-            filename = f"{school}_{result_string}.pdf"
-            filename = filename.replace(" ", "-").lower()
-
-            response = make_request(pdf_url)
-            if response:
-                with open("./data/Ingest/" + filename, "wb") as pdf_file:
-                    pdf_file.write(response.content)
-                    report_paths.append("./data/Ingest/" + filename)
-                    school_names.append(school)
-        except:
-            continue
+    reports = run_crawler(lambda crawler: crawler.extract_reports(url))
+    report_paths = [report.path for report in reports]
+    school_names = [report.school_name for report in reports]
     return report_paths, school_names
+
+
+@st.cache_data
+def crawl_reports(url) -> List[Report]:
+    """Download every report for every school in a search, concurrently"""
+    return run_crawler(lambda crawler: crawler.crawl(url))
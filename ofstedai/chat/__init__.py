@@ -0,0 +1,22 @@
+from ofstedai.chat.answer_cache import SemanticAnswerCache, get_answer_cache
+from ofstedai.chat.callbacks import TimeToFirstTokenHandler
+from ofstedai.chat.citations import cited_page_numbers, replace_citations
+from ofstedai.chat.compare import compare_schools
+from ofstedai.chat.condense import QuestionCondenser, format_chat_history
+from ofstedai.chat.context import pack_context
+from ofstedai.chat.llm import create_chat_model
+from ofstedai.chat.sessions import ChatSessionStore
+
+__all__ = [
+    "ChatSessionStore",
+    "QuestionCondenser",
+    "SemanticAnswerCache",
+    "TimeToFirstTokenHandler",
+    "cited_page_numbers",
+    "compare_schools",
+    "create_chat_model",
+    "format_chat_history",
+    "get_answer_cache",
+    "pack_context",
+    "replace_citations",
+]
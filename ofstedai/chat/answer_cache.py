@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+def scope_key(file_uuids: List[str]) -> str:
+    """Identifies the exact set of files an answer was drawn from. Indexing a
+    new report adds a file, which changes the key and so misses the cache."""
+    return hashlib.md5("".join(sorted(file_uuids)).encode()).hexdigest()
+
+
+class _CacheEntry:
+    def __init__(self, question: str, embedding: np.ndarray, file_uuids, result):
+        self.question = question
+        self.embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        self.file_uuids = set(file_uuids)
+        self.result = result
+        self.created = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """Reuses answers to questions that mean the same thing over the same files.
+
+    Entries are keyed by the set of files in scope, and within a scope looked
+    up by cosine similarity of the standalone question's embedding, so
+    "how is behaviour?" and "How is behaviour at the school?" can share an
+    answer. Entries expire after `ttl_seconds` and the least recently used
+    are evicted beyond `max_entries`.
+
+    Args:
+        similarity_threshold (float): Minimum cosine similarity for a hit.
+        ttl_seconds (float): How long an answer stays valid.
+        max_entries (int): The most answers kept across all scopes.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 60 * 60,
+        max_entries: int = 1000,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # scope key -> entries, ordered least to most recently used
+        self._scopes: "OrderedDict[str, List[_CacheEntry]]" = OrderedDict()
+        self._size = 0
+
+    def get(self, embedding: List[float], file_uuids: List[str]) -> Optional[dict]:
+        """The cached result for the closest matching question, if close enough"""
+        key = scope_key(file_uuids)
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            entries = self._scopes.get(key)
+            if not entries:
+                return None
+
+            now = time.monotonic()
+            live = [e for e in entries if now - e.created < self.ttl_seconds]
+            self._size -= len(entries) - len(live)
+            self._scopes[key] = live
+            if not live:
+                del self._scopes[key]
+                return None
+
+            similarities = np.stack([e.embedding for e in live]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+
+            self._scopes.move_to_end(key)
+            return live[best].result
+
+    def put(
+        self,
+        question: str,
+        embedding: List[float],
+        file_uuids: List[str],
+        result: dict,
+    ):
+        """Cache the result of answering a standalone question over some files"""
+        entry = _CacheEntry(
+            question, np.asarray(embedding, dtype=np.float32), file_uuids, result
+        )
+        key = scope_key(file_uuids)
+        with self._lock:
+            self._scopes.setdefault(key, []).append(entry)
+            self._scopes.move_to_end(key)
+            self._size += 1
+
+            while self._size > self.max_entries:
+                oldest_key, oldest = next(iter(self._scopes.items()))
+                oldest.pop(0)
+                self._size -= 1
+                if not oldest:
+                    del self._scopes[oldest_key]
+
+    def invalidate(self, file_uuids: List[str]):
+        """Drop every answer drawn from any of these files, e.g. once they
+        have been re-indexed"""
+        file_uuids = set(file_uuids)
+        with self._lock:
+            for key in list(self._scopes.keys()):
+                kept = [e for e in self._scopes[key] if not e.file_uuids & file_uuids]
+                self._size -= len(self._scopes[key]) - len(kept)
+                if kept:
+                    self._scopes[key] = kept
+                else:
+                    del self._scopes[key]
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._size = 0
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """The process-wide answer cache, shared by every chat session"""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache()
+        return _answer_cache
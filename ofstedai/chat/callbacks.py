@@ -0,0 +1,39 @@
+import time
+from typing import Dict
+from uuid import UUID
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from ofstedai import telemetry
+
+
+class TimeToFirstTokenHandler(BaseCallbackHandler):
+    """Records how long each streamed LLM call takes to produce its first
+    token, as the `time_to_first_token` stage within the current span"""
+
+    # Run on the calling thread, so the current span is the one the call
+    # was made in, even for async chains
+    run_inline = True
+
+    def __init__(self, stage: str = "answer"):
+        self.stage = stage
+        self._starts: Dict[UUID, float] = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs) -> None:
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            telemetry.observe(
+                "time_to_first_token", time.perf_counter() - start, stage=self.stage
+            )
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        self._starts.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self._starts.pop(run_id, None)
@@ -0,0 +1,76 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+from langchain.schema import Document
+
+from ofstedai.models import File
+
+_UUID = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+# <Doc{uuid}> only, as the answer prompt asks for
+STRICT_CITATION_PATTERN = re.compile(rf"<Doc({_UUID})>")
+# Also the variants models drift into: <Doc {uuid}>, Doc {uuid}, Document {uuid}
+FLEXIBLE_CITATION_PATTERN = re.compile(rf"<Doc ?({_UUID})>|\bDoc(?:ument)? ({_UUID})")
+
+
+def cited_page_numbers(documents: Iterable[Document]) -> Dict[str, List[int]]:
+    """Collect the pages each file's retrieved chunks came from.
+
+    Args:
+        documents (Iterable[Document]): Retrieved chunks, whose metadata hold
+            `parent_doc_uuid` and optionally `page_numbers`, as a list or the
+            JSON string the vector store keeps.
+
+    Returns:
+        Dict[str, List[int]]: Sorted page numbers for each file uuid.
+    """
+    pages = {}
+    for document in documents:
+        file_pages = pages.setdefault(document.metadata["parent_doc_uuid"], set())
+        page_numbers = document.metadata.get("page_numbers")
+        if isinstance(page_numbers, str):
+            page_numbers = json.loads(page_numbers)
+        if page_numbers:
+            file_pages.update(page_numbers)
+    return {file_uuid: sorted(file_pages) for file_uuid, file_pages in pages.items()}
+
+
+def format_citation(file: File, page_numbers: Optional[List[int]] = None) -> str:
+    """A markdown link to a file's school, with the pages cited"""
+    if page_numbers:
+        label = "p." if len(page_numbers) == 1 else "pp."
+        pages = ", ".join(str(page) for page in page_numbers)
+        return f"[{file.name} ({label} {pages})]({file.school_url})"
+    return f"[{file.name}]({file.school_url})"
+
+
+def replace_citations(
+    text: str,
+    files: Dict[str, File],
+    page_numbers: Dict[str, List[int]] = {},
+    flexible: bool = True,
+) -> str:
+    """Rewrite every document citation in an answer as a link, in one pass.
+
+    Citations of uuids not in `files` are left as they are.
+
+    Args:
+        text (str): The model's answer.
+        files (Dict[str, File]): Files by uuid, usually already in memory.
+        page_numbers (Dict[str, List[int]]): Pages cited for each file uuid.
+        flexible (bool): Also match the looser `Doc …`/`Document …` forms.
+
+    Returns:
+        str: The answer with citations replaced by markdown links.
+    """
+    pattern = FLEXIBLE_CITATION_PATTERN if flexible else STRICT_CITATION_PATTERN
+
+    def replace(match: re.Match) -> str:
+        file_uuid = next(group for group in match.groups() if group)
+        file = files.get(file_uuid)
+        if file is None:
+            return match.group(0)
+        return format_citation(file, page_numbers.get(file_uuid))
+
+    return pattern.sub(replace, text)
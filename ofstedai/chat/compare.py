@@ -0,0 +1,115 @@
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from langchain.chains.llm import LLMChain
+from langchain.prompts import PromptTemplate
+from langchain.schema import Document, format_document
+from langchain.schema.language_model import BaseLanguageModel
+
+from ofstedai import telemetry
+from ofstedai.chat.context import pack_context
+
+# Given a question and a school's file uuids, returns that school's documents
+Retrieve = Callable[[str, List[str]], List[Document]]
+
+
+async def _summarise_school(
+    question: str,
+    school_name: str,
+    file_uuids: List[str],
+    retrieve: Retrieve,
+    map_chain: LLMChain,
+    document_prompt: PromptTemplate,
+    max_context_tokens: int,
+    semaphore: asyncio.Semaphore,
+) -> tuple:
+    async with semaphore:
+        docs = await asyncio.to_thread(retrieve, question, file_uuids)
+        docs = pack_context(docs, max_tokens=max_context_tokens)
+        if len(docs) == 0:
+            return school_name, docs, "No relevant information found."
+
+        summaries = "\n\n".join(format_document(doc, document_prompt) for doc in docs)
+        with telemetry.span("compare_map", school_name=school_name):
+            result = await map_chain.acall(
+                {
+                    "question": question,
+                    "school_name": school_name,
+                    "summaries": summaries,
+                }
+            )
+        return school_name, docs, result["text"]
+
+
+async def compare_schools(
+    question: str,
+    school_file_uuids: Dict[str, List[str]],
+    retrieve: Retrieve,
+    llm: BaseLanguageModel,
+    map_prompt: PromptTemplate,
+    reduce_prompt: PromptTemplate,
+    document_prompt: PromptTemplate,
+    max_concurrency: int = 4,
+    max_context_tokens: int = 2000,
+    callbacks: Optional[list] = None,
+) -> dict:
+    """Answer a question across several schools with a concurrent map-reduce.
+
+    Each school's documents are retrieved and summarised against the question
+    in its own LLM call, at most `max_concurrency` at a time, so the map step
+    takes about as long as the slowest school. The summaries are then
+    combined in one reduce call, which streams to `callbacks`.
+
+    Args:
+        question (str): The standalone question.
+        school_file_uuids (Dict[str, List[str]]): Each school's file uuids.
+        retrieve (Retrieve): Retrieves documents scoped to a school's files.
+        llm (BaseLanguageModel): Used for both the map and reduce calls.
+        map_prompt (PromptTemplate): Takes question, school_name and summaries.
+        reduce_prompt (PromptTemplate): Takes question and summaries.
+        document_prompt (PromptTemplate): Formats each retrieved document.
+        max_concurrency (int): School summaries in flight at once.
+        max_context_tokens (int): Document token budget per school.
+        callbacks (list, optional): Callbacks for the reduce call.
+
+    Returns:
+        dict: With `output_text`, every school's `input_documents` and the
+            per-school `school_summaries`, shaped like a stuff chain result.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    map_chain = LLMChain(llm=llm, prompt=map_prompt)
+
+    results = await asyncio.gather(
+        *(
+            _summarise_school(
+                question,
+                school_name,
+                file_uuids,
+                retrieve,
+                map_chain,
+                document_prompt,
+                max_context_tokens,
+                semaphore,
+            )
+            for school_name, file_uuids in school_file_uuids.items()
+        )
+    )
+
+    school_summaries = {school_name: summary for school_name, _, summary in results}
+    summaries = "\n\n".join(
+        f"SCHOOL: {school_name}\n{summary}"
+        for school_name, summary in school_summaries.items()
+    )
+
+    reduce_chain = LLMChain(llm=llm, prompt=reduce_prompt)
+    with telemetry.span("compare_reduce", schools=len(school_summaries)):
+        reduced = await reduce_chain.acall(
+            {"question": question, "summaries": summaries}, callbacks=callbacks
+        )
+
+    return {
+        "question": question,
+        "input_documents": [doc for _, docs, _ in results for doc in docs],
+        "school_summaries": school_summaries,
+        "output_text": reduced["text"],
+    }
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+from ofstedai import telemetry
+from ofstedai.models.chat import ChatMessage
+from ofstedai.models.file import get_encoding
+
+_role_names = {"human": "Human", "ai": "Assistant"}
+
+
+def prior_turns(messages: List[ChatMessage], question: str) -> List[ChatMessage]:
+    """The human and AI messages before the current question, dropping the
+    system prompt and the current question if it has already been appended"""
+    turns = [m for m in messages if m.message.type in _role_names]
+    if (
+        turns
+        and turns[-1].message.type == "human"
+        and turns[-1].message.content == question
+    ):
+        turns = turns[:-1]
+    return turns
+
+
+def has_prior_turn(messages: List[ChatMessage], question: str) -> bool:
+    """Whether the user has asked anything before this question. The greeting
+    alone gives the condense step nothing to resolve against."""
+    return any(m.message.type == "human" for m in prior_turns(messages, question))
+
+
+def format_chat_history(messages: List[ChatMessage], max_tokens: int = 1000) -> str:
+    """Render the most recent turns that fit in a token budget, oldest first"""
+    encoding = get_encoding()
+    lines = []
+    used = 0
+    for message in reversed(messages):
+        line = f"{_role_names[message.message.type]}: {message.message.content}"
+        tokens = len(encoding.encode(line))
+        if used + tokens > max_tokens:
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(reversed(lines))
+
+
+class QuestionCondenser:
+    """Rewrites follow up questions into standalone ones, only when needed.
+
+    First questions are returned as they are without an LLM call. Later ones
+    are condensed against a token-limited window of the chat history, and
+    the result memoised per (history, question) so repeats and reruns are free.
+
+    Args:
+        condense (Callable[[str, str], str]): Makes the LLM call, given the
+            question and formatted chat history.
+        max_history_tokens (int): Budget for the chat history in the prompt.
+        max_entries (int): Condensations kept in memory.
+    """
+
+    def __init__(
+        self,
+        condense: Callable[[str, str], str],
+        max_history_tokens: int = 1000,
+        max_entries: int = 1024,
+    ):
+        self.condense = condense
+        self.max_history_tokens = max_history_tokens
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memo: OrderedDict = OrderedDict()
+
+    def __call__(self, question: str, messages: List[ChatMessage]) -> str:
+        if not has_prior_turn(messages, question):
+            return question
+
+        chat_history = format_chat_history(
+            prior_turns(messages, question), max_tokens=self.max_history_tokens
+        )
+        key = (hashlib.md5(chat_history.encode()).hexdigest(), question)
+
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        with telemetry.span("condense"):
+            standalone_question = self.condense(question, chat_history)
+
+        with self._lock:
+            self._memo[key] = standalone_question
+            if len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return standalone_question
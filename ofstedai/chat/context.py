@@ -0,0 +1,58 @@
+from typing import List
+
+from langchain.schema import Document
+
+from ofstedai.models.file import get_encoding
+
+# Tokens added around each document by STUFF_DOCUMENT_PROMPT's <DocX> tags
+DOCUMENT_OVERHEAD_TOKENS = 40
+
+
+def document_tokens(doc: Document) -> int:
+    """The token count recorded at indexing time, or counted now if missing"""
+    token_count = doc.metadata.get("token_count")
+    if token_count is None:
+        token_count = len(get_encoding().encode(doc.page_content))
+    return int(token_count) + DOCUMENT_OVERHEAD_TOKENS
+
+
+def pack_context(docs: List[Document], max_tokens: int = 3000) -> List[Document]:
+    """Choose which retrieved documents go into the prompt.
+
+    Documents are taken in relevance order, by `hybrid_score` when the
+    retriever set one. A document is dropped if another from the same file
+    has already been taken with the same text, or with text that contains
+    it. The rest are added while they fit in `max_tokens`.
+
+    Args:
+        docs (List[Document]): Retrieved documents, most relevant first.
+        max_tokens (int): The input token budget for all documents.
+
+    Returns:
+        List[Document]: The documents to stuff, most relevant first.
+    """
+    if any("hybrid_score" in doc.metadata for doc in docs):
+        docs = sorted(
+            docs, key=lambda doc: doc.metadata.get("hybrid_score", 0.0), reverse=True
+        )
+
+    packed = []
+    used = 0
+    for doc in docs:
+        parent_file_uuid = doc.metadata.get("parent_file_uuid")
+        overlaps = any(
+            taken.metadata.get("parent_file_uuid") == parent_file_uuid
+            and doc.page_content in taken.page_content
+            for taken in packed
+        )
+        if overlaps:
+            continue
+
+        tokens = document_tokens(doc)
+        if used + tokens > max_tokens:
+            # A smaller, less relevant document may still fit
+            continue
+
+        packed.append(doc)
+        used += tokens
+    return packed
@@ -0,0 +1,22 @@
+import os
+from typing import Optional
+
+from ofstedai.startup import timed
+
+
+def create_chat_model(anthropic_api_key: Optional[str] = None):
+    """The chat model that condenses and answers questions, streaming its tokens
+
+    Args:
+        anthropic_api_key (str, optional): Defaults to the ANTHROPIC_API_KEY
+            environment variable.
+    """
+    with timed("create chat model"):
+        from langchain.chat_models.anthropic import ChatAnthropic
+
+        return ChatAnthropic(
+            anthropic_api_key=anthropic_api_key or os.environ["ANTHROPIC_API_KEY"],
+            max_tokens=500,
+            temperature=0.3,
+            streaming=True,
+        )
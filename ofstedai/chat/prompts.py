@@ -52,6 +52,39 @@ WITH_SOURCES_PROMPT = PromptTemplate.from_template(
     _core_ofsted_prompt + _with_sources_template
 )
 
+_map_school_template = """Given the following extracted parts of Ofsted reports for {school_name} \
+and a question, summarise only what these reports say that is relevant to the question. \
+If they say nothing relevant, say so. Be concise. \
+After each point, cite the document it came from in the <DocX> format where X is the document UUID.
+
+QUESTION: {question}
+=========
+{summaries}
+=========
+SUMMARY FOR {school_name}:"""
+
+MAP_SCHOOL_PROMPT = PromptTemplate.from_template(_map_school_template)
+
+_reduce_comparison_template = """Given the following summaries of Ofsted reports for several \
+schools and a question, write a final answer comparing the schools, with Sources at the end. \
+If you don't know the answer, just say that you don't know. Don't try to make up an answer.
+Prefer a markdown table with one row per school where it suits the question.
+At the end of your response add a "Sources:" section with the documents you used. \
+ONLY PUT CITED DOCUMENTS IN THE "Sources:" SECTION AND NO WHERE ELSE IN YOUR RESPONSE. \
+Only cite documents that appear in the summaries. \
+YOU MUST CITE USING THE <DocX> FORMAT. NO OTHER FORMAT WILL BE ACCEPTED.
+Example: "Sources: <DocX> <DocY> <DocZ>"
+
+QUESTION: {question}
+=========
+{summaries}
+=========
+FINAL ANSWER:"""
+
+REDUCE_COMPARISON_PROMPT = PromptTemplate.from_template(
+    _core_ofsted_prompt + _reduce_comparison_template
+)
+
 _stuff_document_template = "<Doc{parent_doc_uuid}>{page_content}</Doc{parent_doc_uuid}>"
 
 STUFF_DOCUMENT_PROMPT = PromptTemplate.from_template(_stuff_document_template)
@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ofstedai.models.chat import ChatMessage, ChatSession, ChatSessionMessage
+from ofstedai.storage.storage_handler import BaseStorageHandler
+
+# Sessions are renamed after their first question unless given a name
+DEFAULT_SESSION_NAME = "New chat"
+
+
+class _LoadedSession:
+    def __init__(self, session: ChatSession):
+        self.session = session
+        # The messages read so far, by uuid
+        self.messages: Dict[str, ChatSessionMessage] = {}
+        self.last_used = time.monotonic()
+
+
+class ChatSessionStore:
+    """Chat sessions persisted through a storage handler, with bounded memory.
+
+    Each message is written as it is sent, without the chain that produced
+    it. History is read from storage a page at a time, newest first, and
+    sessions idle for `idle_seconds` or beyond the `max_sessions` most
+    recently used are dropped from memory, to be read back if resumed. The
+    list of sessions is read from storage once, then kept up to date as
+    sessions are created, added to and deleted through the store.
+
+    Args:
+        storage_handler (BaseStorageHandler): Where sessions are kept.
+        page_size (int): Messages read by default per history page.
+        idle_seconds (float): How long an unused session stays in memory.
+        max_sessions (int): The most sessions held in memory at once.
+    """
+
+    def __init__(
+        self,
+        storage_handler: BaseStorageHandler,
+        page_size: int = 20,
+        idle_seconds: float = 30 * 60,
+        max_sessions: int = 256,
+    ):
+        self.storage_handler = storage_handler
+        self.page_size = page_size
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        # session uuid -> loaded session, ordered least to most recently used
+        self._sessions: "OrderedDict[str, _LoadedSession]" = OrderedDict()
+        # session uuid -> every stored session, read on first listing
+        self._listed: Optional[Dict[str, ChatSession]] = None
+
+    def _load(self, session_uuid: str) -> _LoadedSession:
+        loaded = self._sessions.get(session_uuid)
+        if loaded is None:
+            loaded = _LoadedSession(
+                self.storage_handler.read_item(session_uuid, "ChatSession")
+            )
+            self._sessions[session_uuid] = loaded
+        loaded.last_used = time.monotonic()
+        self._sessions.move_to_end(session_uuid)
+        self._evict()
+        return loaded
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest_uuid, oldest = next(iter(self._sessions.items()))
+            if (
+                len(self._sessions) > self.max_sessions
+                or now - oldest.last_used > self.idle_seconds
+            ):
+                del self._sessions[oldest_uuid]
+            else:
+                break
+
+    def evict_idle(self) -> int:
+        """Drop idle sessions from memory, returning how many are still held"""
+        with self._lock:
+            self._evict()
+            return len(self._sessions)
+
+    def create_session(
+        self,
+        messages: List[ChatMessage] = [],
+        name: str = DEFAULT_SESSION_NAME,
+        creator_user_uuid: Optional[str] = None,
+    ) -> ChatSession:
+        """Start and store a session, e.g. seeded with the system prompt"""
+        session = ChatSession(name=name, creator_user_uuid=creator_user_uuid)
+        stored = [
+            ChatSessionMessage.from_chat_message(message, session.uuid)
+            for message in messages
+        ]
+        session.message_uuids = [message.uuid for message in stored]
+
+        self.storage_handler.write_items(stored)
+        self.storage_handler.write_item(session)
+
+        with self._lock:
+            loaded = _LoadedSession(session)
+            loaded.messages = {message.uuid: message for message in stored}
+            self._sessions[session.uuid] = loaded
+            self._evict()
+            if self._listed is not None:
+                self._listed[session.uuid] = session
+        return session
+
+    def get_session(self, session_uuid: str) -> ChatSession:
+        with self._lock:
+            return self._load(session_uuid).session
+
+    def list_sessions(
+        self, creator_user_uuid: Optional[str] = None
+    ) -> List[ChatSession]:
+        """Stored sessions, most recently active first"""
+        with self._lock:
+            if self._listed is None:
+                self._listed = {
+                    session.uuid: session
+                    for session in self.storage_handler.read_all_items("ChatSession")
+                }
+            sessions = [
+                session
+                for session in self._listed.values()
+                if creator_user_uuid is None
+                or session.creator_user_uuid == creator_user_uuid
+            ]
+        return sorted(sessions, key=lambda s: s.last_active_datetime, reverse=True)
+
+    def append_message(
+        self,
+        session_uuid: str,
+        chat_message: ChatMessage,
+        markdown: Optional[str] = None,
+    ) -> ChatSessionMessage:
+        """Store a message at the end of a session"""
+        message = ChatSessionMessage.from_chat_message(
+            chat_message, session_uuid, markdown=markdown
+        )
+        self.storage_handler.write_item(message)
+
+        with self._lock:
+            loaded = self._load(session_uuid)
+            session = loaded.session
+            if message.role == "human" and session.name == DEFAULT_SESSION_NAME:
+                session.name = message.content[:80]
+            session.message_uuids.append(message.uuid)
+            session.last_active_datetime = datetime.utcnow().isoformat()
+            loaded.messages[message.uuid] = message
+            self.storage_handler.write_item(session)
+            if self._listed is not None:
+                self._listed[session_uuid] = session
+        return message
+
+    def message_count(self, session_uuid: str) -> int:
+        with self._lock:
+            return len(self._load(session_uuid).session.message_uuids)
+
+    def read_messages(
+        self,
+        session_uuid: str,
+        limit: Optional[int] = None,
+        before: Optional[int] = None,
+    ) -> List[ChatSessionMessage]:
+        """A page of a session's history, oldest first.
+
+        Args:
+            session_uuid (str): The session to read.
+            limit (int, optional): How many messages, by default `page_size`.
+            before (int, optional): Read the messages before this position,
+                by default the end of the session.
+
+        Returns:
+            List[ChatSessionMessage]: Only messages not read before come
+                from storage.
+        """
+        limit = self.page_size if limit is None else limit
+        with self._lock:
+            loaded = self._load(session_uuid)
+            message_uuids = loaded.session.message_uuids
+            end = len(message_uuids) if before is None else before
+            page = message_uuids[max(end - limit, 0) : end]
+            missing = [uuid for uuid in page if uuid not in loaded.messages]
+
+        if missing:
+            messages = self.storage_handler.read_items(missing, "ChatSessionMessage")
+            with self._lock:
+                loaded.messages.update({message.uuid: message for message in messages})
+
+        return [loaded.messages[uuid] for uuid in page if uuid in loaded.messages]
+
+    def delete_session(self, session_uuid: str):
+        """Delete a session and all of its messages"""
+        with self._lock:
+            session = self._load(session_uuid).session
+            del self._sessions[session_uuid]
+            if self._listed is not None:
+                self._listed.pop(session_uuid, None)
+        self.storage_handler.delete_items(session.message_uuids, "ChatSessionMessage")
+        self.storage_handler.delete_item(session_uuid, "ChatSession")
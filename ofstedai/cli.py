@@ -0,0 +1,270 @@
+import json
+import os
+import pathlib
+from collections import defaultdict
+from typing import Optional
+
+import dotenv
+import numpy as np
+import typer
+
+from ofstedai import telemetry
+from ofstedai.parsing.file_chunker import FileChunker
+from ofstedai.pipeline import CrawlStateStore, IngestPipeline
+from ofstedai.retrieval import get_lexical_index
+from ofstedai.storage import (
+    FileSystemStorageHandler,
+    SQLiteStorageHandler,
+    get_storage_handler,
+    migrate_storage,
+)
+from ofstedai.storage.content_cache import ContentCache
+from ofstedai.vectorstore import get_vector_store, load_vector_store
+from ofstedai.vectorstore.store import default_vector_backend
+
+app = typer.Typer(help="Ofsted AI Copilot command line tools")
+
+
+@app.callback()
+def main():
+    # Bring VARS into environment, so options default to the app's settings
+    dotenv.load_dotenv(".env")
+
+
+@app.command()
+def sync(
+    search_url: Optional[str] = typer.Option(
+        None, help="An Ofsted search to discover schools from."
+    ),
+    data_path: pathlib.Path = typer.Option(
+        pathlib.Path("./data"), help="The root of the local data store."
+    ),
+    storage: str = typer.Option(
+        "filesystem",
+        envvar="STORAGE_BACKEND",
+        help="The storage backend, filesystem or sqlite.",
+    ),
+    chunk_workers: int = typer.Option(
+        os.cpu_count() or 1, help="Processes used to chunk reports."
+    ),
+    full: bool = typer.Option(
+        False, help="Fetch every report rather than only newly published ones."
+    ),
+    trace_file: Optional[pathlib.Path] = typer.Option(
+        None, help="Append a JSON line for every timed stage to this file."
+    ),
+    metrics_port: Optional[int] = typer.Option(
+        None, help="Serve Prometheus metrics on this port while syncing."
+    ),
+):
+    """Fetch and index newly published inspections.
+
+    Without a search URL every school crawled before is revisited, and only
+    timeline entries that have not already been ingested are downloaded.
+    """
+    telemetry.configure_tracing(trace_file)
+    if metrics_port is not None:
+        telemetry.start_metrics_server(metrics_port)
+
+    storage_handler = get_storage_handler(backend=storage, root_path=data_path)
+    crawl_state = CrawlStateStore(storage_handler)
+
+    school_urls = None
+    if search_url is None:
+        school_urls = crawl_state.school_urls()
+        if len(school_urls) == 0:
+            typer.echo("No schools have been crawled yet, pass --search-url to start.")
+            raise typer.Exit(code=1)
+
+    pipeline = IngestPipeline(
+        storage_handler=storage_handler,
+        vector_store=get_vector_store(persist_directory=str(data_path / "VectorStore")),
+        lexical_index=get_lexical_index(data_path / "LexicalIndex" / "lexical.sqlite3"),
+        file_chunker=FileChunker(max_workers=chunk_workers),
+        content_cache=ContentCache(path=data_path / "Cache" / "content_cache.jsonl"),
+        crawl_state=crawl_state,
+    )
+
+    for event in pipeline.run(
+        search_url=search_url, school_urls=school_urls, incremental=not full
+    ):
+        if event.error:
+            typer.echo(
+                f"Failed to {event.stage} {event.file_name or 'reports'}: {event.error}",
+                err=True,
+            )
+        elif event.stage == "index" and event.file_name:
+            typer.echo(
+                f"{'Unchanged' if event.cached else 'Indexed'} {event.file_name}"
+            )
+
+    stats = {stage_stats.name: stage_stats for stage_stats in event.stats}
+    typer.echo(
+        f"Downloaded {stats['download'].processed - stats['index'].skipped} "
+        "new reports, "
+        f"indexed {stats['index'].processed}, "
+        f"{stats['index'].skipped} unchanged, "
+        f"{sum(s.failed for s in event.stats)} failed."
+    )
+    for row in telemetry.stage_report():
+        typer.echo(
+            f"  {row['stage']:<20} {row['count']:>7} x {row['mean_ms']:>9.1f} ms "
+            f"= {row['seconds']:>9.1f} s"
+        )
+    pipeline.file_chunker.close()
+
+
+@app.command()
+def migrate_to_sqlite(
+    data_path: pathlib.Path = typer.Option(
+        pathlib.Path("./data"), help="The root of the local data store."
+    ),
+    batch_size: int = typer.Option(1000, help="Objects written per transaction."),
+):
+    """Copy the one-file-per-object store into a single SQLite database."""
+    copied = migrate_storage(
+        source=FileSystemStorageHandler(root_path=data_path),
+        target=SQLiteStorageHandler(database_path=data_path / "ofstedai.sqlite3"),
+        batch_size=batch_size,
+    )
+    for model_type, count in copied.items():
+        typer.echo(f"Copied {count} {model_type} objects")
+    typer.echo('Set STORAGE_BACKEND="sqlite" in .env to use the migrated store.')
+
+
+@app.command()
+def build_lexical_index(
+    data_path: pathlib.Path = typer.Option(
+        pathlib.Path("./data"), help="The root of the local data store."
+    ),
+    storage: str = typer.Option(
+        "filesystem",
+        envvar="STORAGE_BACKEND",
+        help="The storage backend, filesystem or sqlite.",
+    ),
+    batch_size: int = typer.Option(1000, help="Chunks indexed per transaction."),
+):
+    """Add every stored Chunk to the keyword index, e.g. for data ingested
+    before the index existed."""
+    storage_handler = get_storage_handler(backend=storage, root_path=data_path)
+    lexical_index = get_lexical_index(data_path / "LexicalIndex" / "lexical.sqlite3")
+
+    for chunks in storage_handler.iter_all_items("Chunk", batch_size=batch_size):
+        lexical_index.add_chunks(chunks)
+    typer.echo(f"Indexed {lexical_index.count()} chunks")
+
+
+@app.command()
+def build_vector_index(
+    data_path: pathlib.Path = typer.Option(
+        pathlib.Path("./data"), help="The root of the local data store."
+    ),
+    clusters: int = typer.Option(
+        0, help="Cluster the index for IVF search, 0 keeps exact search."
+    ),
+    batch_size: int = typer.Option(5000, help="Embeddings copied per batch."),
+):
+    """Copy the Chroma vector store's embeddings into the memory-mapped numpy
+    index, reusing them rather than embedding every chunk again."""
+    persist_directory = str(data_path / "VectorStore")
+    chroma = load_vector_store(persist_directory, backend="chroma")
+    numpy_store = load_vector_store(persist_directory, backend="numpy")
+
+    offset = 0
+    while True:
+        batch = chroma.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=batch_size,
+            offset=offset,
+        )
+        if len(batch["ids"]) == 0:
+            break
+        numpy_store.add_embeddings(
+            texts=batch["documents"],
+            embeddings=batch["embeddings"],
+            metadatas=batch["metadatas"],
+            ids=batch["ids"],
+        )
+        offset += len(batch["ids"])
+
+    if clusters > 0:
+        numpy_store.build_clusters(clusters)
+    typer.echo(f"Indexed {numpy_store.count()} embeddings")
+    typer.echo('Set VECTOR_BACKEND="numpy" in .env to search the new index.')
+
+
+@app.command()
+def quantize_vector_index(
+    quantization: str = typer.Argument(..., help="float16 or int8."),
+    data_path: pathlib.Path = typer.Option(
+        pathlib.Path("./data"), help="The root of the local data store."
+    ),
+):
+    """Build a reduced precision copy of the numpy index to search in, with
+    the best candidates rescored against the full precision vectors."""
+    numpy_store = load_vector_store(str(data_path / "VectorStore"), backend="numpy")
+    numpy_store.quantize(quantization)
+    typer.echo(f"Quantized {numpy_store.count()} embeddings to {quantization}")
+    typer.echo(f'Set VECTOR_QUANTIZATION="{quantization}" in .env to search the copy.')
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="The address to listen on."),
+    port: int = typer.Option(8000, help="The port to listen on."),
+    workers: int = typer.Option(
+        1, help="Worker processes, each with its own copy of the models."
+    ),
+):
+    """Run the HTTP API for search, chat and ingest jobs."""
+    if workers > 1 and default_vector_backend() != "numpy":
+        # Each worker would open its own Chroma client on the same directory,
+        # and Chroma's persistent store is not safe to share between processes
+        typer.echo('More than one worker needs VECTOR_BACKEND="numpy" in .env.')
+        raise typer.Exit(code=1)
+
+    import uvicorn
+
+    # An import string, so that each worker process creates its own app
+    uvicorn.run("ofstedai.server.app:app", host=host, port=port, workers=workers)
+
+
+@app.command()
+def trace_summary(
+    trace_file: pathlib.Path = typer.Argument(..., help="A trace file to read."),
+    root: Optional[str] = typer.Option(
+        None, help="Only count stages traced under this one, e.g. chat_turn."
+    ),
+):
+    """Summarise where the time goes in a trace file, per stage."""
+    with open(trace_file) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    traces = None
+    if root is not None:
+        traces = {r["trace_id"] for r in records if r["name"] == root}
+        records = [r for r in records if r["trace_id"] in traces]
+
+    seconds = defaultdict(list)
+    errors = defaultdict(int)
+    for record in records:
+        seconds[record["name"]].append(record["seconds"])
+        errors[record["name"]] += record["error"] is not None
+
+    typer.echo(
+        f"  {'stage':<20} {'count':>7} {'total s':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'errors':>7}" + (f" {f'per {root}':>14}" if traces else "")
+    )
+    for name, values in sorted(seconds.items(), key=lambda x: -sum(x[1])):
+        p50, p95 = np.percentile(values, [50, 95]) * 1000
+        line = (
+            f"  {name:<20} {len(values):>7} {sum(values):>9.2f} {p50:>9.1f} "
+            f"{p95:>9.1f} {errors[name]:>7}"
+        )
+        if traces:
+            line += f" {sum(values) / len(traces):>12.3f} s"
+        typer.echo(line)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,3 +1,15 @@
+from ofstedai.models.chat import ChatSession, ChatSessionMessage
+from ofstedai.models.crawl_state import SchoolCrawlState
 from ofstedai.models.file import Chunk, File
+from ofstedai.models.ingest_job import IngestJob
+from ofstedai.models.report import Report
 
-__all__ = ["Chunk", "File"]
+__all__ = [
+    "ChatSession",
+    "ChatSessionMessage",
+    "Chunk",
+    "File",
+    "IngestJob",
+    "Report",
+    "SchoolCrawlState",
+]
@@ -1,9 +1,7 @@
 from datetime import datetime
-from typing import Optional, Union
+from typing import List, Optional
 from uuid import uuid4
 
-from langchain.chains.base import Chain
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
 from pydantic import BaseModel, Field, computed_field, field_serializer
 
 
@@ -21,17 +19,88 @@ class ChatMessage(BaseModel):
         return self.__class__.__name__
 
     @field_serializer("chain")
-    def serialise_chain(self, chain: Chain, _info):
+    def serialise_chain(self, chain: object, _info):
+        from langchain.chains.base import Chain
+
         if isinstance(chain, Chain):
             return chain.dict()
         else:
             return chain
 
     @field_serializer("message")
-    def serialise_message(
-        self, message: Union[AIMessage, HumanMessage, SystemMessage], _info
-    ):
+    def serialise_message(self, message: object, _info):
+        from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
         if isinstance(message, (AIMessage, HumanMessage, SystemMessage)):
             return message.dict()
         else:
             return message
+
+
+class ChatSessionMessage(BaseModel):
+    """A chat message as stored, without the chain that produced it"""
+
+    uuid: str = Field(default_factory=lambda: str(uuid4()))
+    session_uuid: str
+    # The langchain message type: system, human or ai
+    role: str
+    content: str
+    # An AI answer with its citations rendered, so history doesn't re-render
+    markdown: Optional[str] = None
+    created_datetime: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    creator_user_uuid: Optional[str] = None
+
+    @computed_field
+    def model_type(self) -> str:
+        return self.__class__.__name__
+
+    @classmethod
+    def from_chat_message(
+        cls,
+        chat_message: ChatMessage,
+        session_uuid: str,
+        markdown: Optional[str] = None,
+    ) -> "ChatSessionMessage":
+        return cls(
+            uuid=chat_message.uuid,
+            session_uuid=session_uuid,
+            role=chat_message.message.type,
+            content=chat_message.message.content,
+            markdown=markdown,
+            created_datetime=chat_message.created_datetime,
+            creator_user_uuid=chat_message.creator_user_uuid,
+        )
+
+    def to_chat_message(self) -> ChatMessage:
+        from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+        message_types = {
+            "system": SystemMessage,
+            "human": HumanMessage,
+            "ai": AIMessage,
+        }
+        return ChatMessage(
+            uuid=self.uuid,
+            chain=None,
+            message=message_types[self.role](content=self.content),
+            created_datetime=self.created_datetime,
+            creator_user_uuid=self.creator_user_uuid,
+        )
+
+
+class ChatSession(BaseModel):
+    """A conversation, holding its messages' uuids in order rather than the
+    messages themselves so history can be read a page at a time"""
+
+    uuid: str = Field(default_factory=lambda: str(uuid4()))
+    name: str = "New chat"
+    message_uuids: List[str] = []
+    created_datetime: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    last_active_datetime: str = Field(
+        default_factory=lambda: datetime.utcnow().isoformat()
+    )
+    creator_user_uuid: Optional[str] = None
+
+    @computed_field
+    def model_type(self) -> str:
+        return self.__class__.__name__
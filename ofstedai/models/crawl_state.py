@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, computed_field
+
+
+def school_crawl_state_uuid(school_url: str) -> str:
+    """Crawl state is keyed by school so there is only ever one per school"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, school_url))
+
+
+class SchoolCrawlState(BaseModel):
+    """What has already been ingested for a school, for incremental re-crawls"""
+
+    uuid: str
+    school_url: str
+    school_name: str
+    last_published_date: Optional[str] = None
+    seen_report_urls: List[str] = []
+    last_crawled_datetime: str = Field(
+        default_factory=lambda: datetime.utcnow().isoformat()
+    )
+    creator_user_uuid: Optional[str] = None
+
+    @computed_field
+    def model_type(self) -> str:
+        return self.__class__.__name__
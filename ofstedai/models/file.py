@@ -1,16 +1,88 @@
 import hashlib
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional
 from uuid import uuid4
 
-import tiktoken
-from langchain.schema import Document
-from pydantic import BaseModel, Field, computed_field
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
 
-encoding = tiktoken.get_encoding("cl100k_base")
+from ofstedai.startup import timed
 
 
-class File(BaseModel):
+@lru_cache(maxsize=None)
+def get_encoding():
+    """The tiktoken encoding, loaded on first use as it takes a while"""
+    with timed("load tiktoken encoding"):
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def __getattr__(name):
+    # Keeps `from ofstedai.models.file import encoding` working without
+    # loading tiktoken at import time
+    if name == "encoding":
+        return get_encoding()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class TextMetricsMixin(BaseModel):
+    """Computes `text_hash` and `token_count` once per instance, rather than
+    on every access and every `model_dump`. Both are recomputed if `text`
+    is reassigned or replaced in `model_copy`."""
+
+    _text_hash: Optional[str] = PrivateAttr(default=None)
+    _token_count: Optional[int] = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        if name == "text":
+            self._text_hash = None
+            self._token_count = None
+        super().__setattr__(name, value)
+
+    def model_copy(self, *, update=None, deep=False):
+        # The update is written to __dict__ directly, bypassing __setattr__
+        copy = super().model_copy(update=update, deep=deep)
+        if update and "text" in update:
+            copy._text_hash = None
+            copy._token_count = None
+        return copy
+
+    @computed_field
+    @property
+    def text_hash(self) -> str:
+        if self._text_hash is None:
+            self._text_hash = hashlib.md5(
+                self.text.encode(encoding="UTF-8", errors="strict")
+            ).hexdigest()
+        return self._text_hash
+
+    @computed_field
+    @property
+    def token_count(self) -> int:
+        if self._token_count is None:
+            self._token_count = len(get_encoding().encode(self.text))
+        return self._token_count
+
+
+def set_token_counts(items: List[TextMetricsMixin]) -> None:
+    """Tokenize the text of many Chunks or Files in one batched call, caching
+    each count on its item.
+
+    Args:
+        items (List[TextMetricsMixin]): The items to count tokens for. Those
+            already counted are skipped.
+    """
+    uncounted = [item for item in items if item._token_count is None]
+    if len(uncounted) == 0:
+        return
+
+    tokens = get_encoding().encode_batch([item.text for item in uncounted])
+    for item, item_tokens in zip(uncounted, tokens):
+        item._token_count = len(item_tokens)
+
+
+class File(TextMetricsMixin):
     uuid: str = Field(default_factory=lambda: str(uuid4()))
     school_url: str
     school_name: str
@@ -28,26 +100,21 @@ class File(BaseModel):
     def model_type(self) -> str:
         return self.__class__.__name__
 
-    @computed_field
     @property
-    def text_hash(self) -> str:
-        return hashlib.md5(
-            self.text.encode(encoding="UTF-8", errors="strict")
-        ).hexdigest()
-
-    @computed_field
-    @property
-    def token_count(self) -> int:
-        return len(encoding.encode(self.text))
+    def urn(self) -> str:
+        """The school's unique reference number, the last part of its Ofsted URL"""
+        return self.school_url.rstrip("/").split("/")[-1]
 
     def to_document(self) -> str:
+        from langchain.schema import Document
+
         return Document(
             page_content=f"<Doc{self.uuid}>Title: {self.name}\n\n{self.text}</Doc{self.uuid}>\n\n",
             metadata={"source": self.storage_kind},
         )
 
 
-class Chunk(BaseModel):
+class Chunk(TextMetricsMixin):
     uuid: str = Field(default_factory=lambda: str(uuid4()))
     parent_file_uuid: str
     index: int
@@ -61,18 +128,6 @@ class Chunk(BaseModel):
     def model_type(self) -> str:
         return self.__class__.__name__
 
-    @computed_field
-    @property
-    def text_hash(self) -> str:
-        return hashlib.md5(
-            self.text.encode(encoding="UTF-8", errors="strict")
-        ).hexdigest()
-
-    @computed_field
-    @property
-    def token_count(self) -> int:
-        return len(encoding.encode(self.text))
-
 
 class FileExistsException(Exception):
     def __init__(self):
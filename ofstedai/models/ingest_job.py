@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel, Field, computed_field
+
+INGEST_JOB_STATUSES = ["queued", "running", "done", "failed"]
+
+
+class IngestJob(BaseModel):
+    """An ingest run requested through the API service, stored so that any
+    worker process can report its progress"""
+
+    uuid: str = Field(default_factory=lambda: str(uuid4()))
+    search_url: Optional[str] = None
+    school_urls: Optional[List[str]] = None
+    incremental: bool = False
+    # One of INGEST_JOB_STATUSES
+    status: str = "queued"
+    indexed: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    # The latest errors, most recent last
+    errors: List[str] = []
+    # The pipeline's StageStats as of the last update
+    stats: List[dict] = []
+    created_datetime: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_datetime: Optional[str] = None
+    creator_user_uuid: Optional[str] = None
+
+    @computed_field
+    def model_type(self) -> str:
+        return self.__class__.__name__
@@ -0,0 +1,17 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Report(BaseModel):
+    """A published Ofsted report that has been downloaded to local storage"""
+
+    school_url: str
+    school_name: str
+    pdf_url: str
+    path: str
+    inspection_type: str
+    date_text: str
+    filename: str
+    published_date: Optional[str] = None
+    content_hash: Optional[str] = None
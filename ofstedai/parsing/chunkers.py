@@ -6,10 +6,8 @@ from email.message import Message
 from email.parser import BytesParser
 from typing import List, Union
 
-from unstructured.chunking.title import chunk_by_title
-from unstructured.partition.auto import partition
-
-from ofstedai.models.file import Chunk, File
+from ofstedai import telemetry
+from ofstedai.models.file import Chunk, File, set_token_counts
 
 
 def creation_date(path_to_file) -> datetime:
@@ -37,13 +35,21 @@ def creation_date(path_to_file) -> datetime:
 
 
 def other_chunker(file: File, creator_user_uuid: str = "dev") -> List[Chunk]:
-    elements = partition(filename=file.path)
+    # unstructured is slow to import, so only pay for it when chunking
+    from unstructured.chunking.title import chunk_by_title
+    from unstructured.partition.auto import partition
+
+    with telemetry.span("partition", file_type=file.type) as partition_span:
+        elements = partition(filename=file.path)
+        partition_span.set(elements=len(elements))
     raw_chunks = chunk_by_title(elements=elements)
 
     chunks = []
     for i, raw_chunk in enumerate(raw_chunks):
         raw_chunk = raw_chunk.to_dict()
         raw_chunk["metadata"]["parent_doc_uuid"] = file.uuid
+        raw_chunk["metadata"]["school_name"] = file.school_name
+        raw_chunk["metadata"]["urn"] = file.urn
 
         chunk = Chunk(
             parent_file_uuid=file.uuid,
@@ -54,4 +60,6 @@ def other_chunker(file: File, creator_user_uuid: str = "dev") -> List[Chunk]:
         )
         chunks.append(chunk)
 
+    set_token_counts(chunks)
+
     return chunks
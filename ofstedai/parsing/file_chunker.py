@@ -1,13 +1,58 @@
-from typing import List
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Iterator, List, Optional
 
+from pydantic import BaseModel
+
+from ofstedai import telemetry
 from ofstedai.models.file import Chunk, File
 from ofstedai.parsing.chunkers import other_chunker
 
 
+class ChunkingResult(BaseModel):
+    """The outcome of chunking one file, with any error kept rather than raised"""
+
+    file: File
+    chunks: List[Chunk] = []
+    error: Optional[str] = None
+    # Trace records of the spans timed in a worker process
+    spans: List[dict] = []
+
+
+def _chunk_file_in_worker(
+    file: File, creator_user_uuid: str, collect_spans: bool = False
+) -> ChunkingResult:
+    """Chunk a file in a worker process, catching errors so that one bad file
+    never takes down the rest of a batch. With `collect_spans` the stages
+    timed are returned with the result, for the parent process to record."""
+    with telemetry.collect_spans() if collect_spans else nullcontext([]) as spans:
+        try:
+            chunks = FileChunker().chunk_file(file, creator_user_uuid=creator_user_uuid)
+            result = ChunkingResult(file=file, chunks=chunks)
+        except Exception as err:
+            result = ChunkingResult(file=file, error=f"{type(err).__name__}: {err}")
+    result.spans = spans
+    return result
+
+
+def _record_worker_spans(future: "Future[ChunkingResult]"):
+    if not future.cancelled() and future.exception() is None:
+        telemetry.record_spans(future.result().spans)
+
+
 class FileChunker:
     """A class to wrap unstructured and generate compliant chunks from files"""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 1):
+        """
+        Args:
+            max_workers (int): The number of processes used to chunk files in
+                parallel. 1 chunks in the calling process.
+        """
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
         self.supported_file_types = {
             ".eml": other_chunker,
             ".html": other_chunker,
@@ -46,7 +91,9 @@ class FileChunker:
             raise ValueError(f"File type {file.type} of {file.name} is not supported")
 
         chunker = self.supported_file_types.get(file.type)
-        chunks = chunker(file, creator_user_uuid=creator_user_uuid)
+        with telemetry.span("chunk", file_name=file.name) as chunk_span:
+            chunks = chunker(file, creator_user_uuid=creator_user_uuid)
+            chunk_span.set(chunks=len(chunks))
 
         # Ensure page numbers are a list for schema compliance
         for chunk in chunks:
@@ -59,13 +106,87 @@ class FileChunker:
 
         return chunks
 
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn rather than fork, callers such as the ingest pipeline are
+            # multithreaded and forking those can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def submit(self, file: File, creator_user_uuid="dev") -> "Future[ChunkingResult]":
+        """Schedule a file to be chunked, in the process pool if there is one.
+
+        Args:
+            file (File): The file to chunk.
+
+        Returns:
+            Future[ChunkingResult]: Resolves once the file has been chunked.
+        """
+        if self.max_workers <= 1:
+            future = Future()
+            future.set_result(_chunk_file_in_worker(file, creator_user_uuid))
+            return future
+
+        future = self._get_pool().submit(
+            _chunk_file_in_worker, file, creator_user_uuid, True
+        )
+        future.add_done_callback(_record_worker_spans)
+        return future
+
+    def iter_chunk_files(
+        self, files: List[File], creator_user_uuid="dev"
+    ) -> Iterator[ChunkingResult]:
+        """Chunk files in parallel, yielding each result as its file finishes.
+
+        Args:
+            files (List[File]): List of files to chunk
+
+        Yields:
+            ChunkingResult: The chunks or error for each file, in completion order.
+        """
+        if self.max_workers <= 1:
+            # Without a pool submit chunks synchronously, so chunk one file at
+            # a time rather than all of them before the first is yielded
+            for file in files:
+                yield self.submit(file, creator_user_uuid=creator_user_uuid).result()
+            return
+
+        futures = {
+            self.submit(file, creator_user_uuid=creator_user_uuid): file
+            for file in files
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as err:
+                # The worker process itself died, e.g. a crash inside a parser
+                yield ChunkingResult(
+                    file=futures[future], error=f"{type(err).__name__}: {err}"
+                )
+
     def chunk_files(self, files: List[File]) -> List[List[Chunk]]:
         """A bulk function for chunking files.
 
+        Files that fail to chunk are reported and give an empty list of chunks.
+
         Args:
             files (List[File]): List of files to chunk
 
         Returns:
             List[List[Chunk]]: A list of lists for all the chunks extracted from each file.
         """
-        return [self.chunk_file(file=file) for file in files]
+        chunks_by_file_uuid = {}
+        for result in self.iter_chunk_files(files):
+            if result.error:
+                print(f"Failed to chunk {result.file.name}, error: {result.error}")
+            chunks_by_file_uuid[result.file.uuid] = result.chunks
+        return [chunks_by_file_uuid[file.uuid] for file in files]
+
+    def close(self):
+        """Shut down the process pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
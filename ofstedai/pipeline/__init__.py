@@ -0,0 +1,4 @@
+from ofstedai.pipeline.crawl_state import CrawlStateStore
+from ofstedai.pipeline.ingest import IngestPipeline, ProgressEvent, StageStats
+
+__all__ = ["CrawlStateStore", "IngestPipeline", "ProgressEvent", "StageStats"]
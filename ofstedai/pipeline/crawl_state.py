@@ -0,0 +1,82 @@
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+from ofstedai.models import Report, SchoolCrawlState
+from ofstedai.models.crawl_state import school_crawl_state_uuid
+from ofstedai.storage.storage_handler import BaseStorageHandler
+
+
+class CrawlStateStore:
+    """Tracks which schools have been crawled and which of their reports
+    have already been ingested.
+
+    State is held in memory for fast lookups during a crawl and written
+    through to the storage handler as each school or report is recorded.
+    """
+
+    def __init__(self, storage_handler: BaseStorageHandler):
+        self.storage_handler = storage_handler
+        self._lock = threading.Lock()
+        self._states: Dict[str, SchoolCrawlState] = {
+            state.school_url: state
+            for state in storage_handler.read_all_items("SchoolCrawlState")
+        }
+
+    def school_urls(self) -> List[str]:
+        """Every school that has been crawled before"""
+        return list(self._states.keys())
+
+    def is_new(self, report: Report) -> bool:
+        """Whether a timeline entry has not yet been ingested.
+
+        Entries published before the newest report ingested for the school are
+        treated as seen, even if their URL has since changed. A report that
+        failed to ingest on an earlier run is only retried by a full crawl.
+        """
+        state = self._states.get(report.school_url)
+        if state is None:
+            return True
+        if (
+            report.published_date
+            and state.last_published_date
+            and report.published_date < state.last_published_date
+        ):
+            return False
+        return report.pdf_url not in state.seen_report_urls
+
+    def _get_or_create(self, school_url: str, school_name: str) -> SchoolCrawlState:
+        state = self._states.get(school_url)
+        if state is None:
+            state = SchoolCrawlState(
+                uuid=school_crawl_state_uuid(school_url),
+                school_url=school_url,
+                school_name=school_name,
+            )
+            self._states[school_url] = state
+        return state
+
+    def record_school(self, school_url: str, school_name: str):
+        """Mark a school as crawled, whether or not any of its reports were
+        ingested, so that later syncs revisit it"""
+        with self._lock:
+            state = self._get_or_create(school_url, school_name)
+            state.last_crawled_datetime = datetime.utcnow().isoformat()
+
+            self.storage_handler.write_item(state)
+
+    def record(self, report: Report):
+        """Mark a report as ingested for its school"""
+        with self._lock:
+            state = self._get_or_create(report.school_url, report.school_name)
+
+            if report.pdf_url not in state.seen_report_urls:
+                state.seen_report_urls.append(report.pdf_url)
+            if report.published_date and (
+                state.last_published_date is None
+                or report.published_date > state.last_published_date
+            ):
+                state.last_published_date = report.published_date
+            state.last_crawled_datetime = datetime.utcnow().isoformat()
+
+            self.storage_handler.write_item(state)
@@ -0,0 +1,397 @@
+import asyncio
+import pathlib
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
+
+from pydantic import BaseModel, computed_field
+
+from ofstedai import telemetry
+from ofstedai.api.crawler import OfstedCrawler, ReportFilter
+from ofstedai.models import Chunk, File, Report
+from ofstedai.parsing.file_chunker import FileChunker
+from ofstedai.pipeline.crawl_state import CrawlStateStore
+from ofstedai.retrieval import LexicalIndex
+from ofstedai.storage.content_cache import ContentCache, ContentCacheEntry
+from ofstedai.storage.storage_handler import BaseStorageHandler
+from ofstedai.vectorstore import add_chunks_to_vector_store
+
+if TYPE_CHECKING:
+    from langchain.schema.vectorstore import VectorStore
+
+# Marks the end of the stream of items passed between stages
+_DONE = object()
+
+STAGES = ["download", "chunk", "save", "index"]
+
+
+class StageStats(BaseModel):
+    """Running counters for one stage of the ingest pipeline"""
+
+    name: str
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    busy_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    queue_depth: int = 0
+
+    @computed_field
+    @property
+    def throughput(self) -> float:
+        """Items completed per second of pipeline wall-clock time"""
+        if self.elapsed_seconds == 0:
+            return 0.0
+        return self.processed / self.elapsed_seconds
+
+
+class ProgressEvent(BaseModel):
+    """Emitted by the ingest pipeline whenever a stage finishes an item"""
+
+    stage: str
+    file_name: Optional[str] = None
+    file_uuid: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    done: bool = False
+    stats: List[StageStats]
+
+
+class IngestItem(BaseModel):
+    """A report on its way through the pipeline"""
+
+    file: File
+    report: Report
+    chunks: List[Chunk] = []
+
+
+def report_to_file(report: Report, creator_user_uuid: str = "dev") -> File:
+    """Create a File for a downloaded report"""
+    return File(
+        path=report.path,
+        school_url=report.school_url,
+        school_name=report.school_name,
+        type=pathlib.Path(report.path).suffix,
+        name=pathlib.Path(report.path).stem,
+        storage_kind="local",
+        creator_user_uuid=creator_user_uuid,
+    )
+
+
+class IngestPipeline:
+    """A streaming producer/consumer pipeline from an Ofsted search to the vector store.
+
+    Reports flow through four stages, each on its own thread with a bounded
+    queue in front of it:
+
+        download -> chunk -> save -> index
+
+    so the first reports are searchable while later ones are still downloading.
+    A full queue blocks the stage feeding it, bounding memory use.
+
+    Args:
+        storage_handler (BaseStorageHandler): Where Files and Chunks are saved.
+        vector_store (VectorStore): Where Chunks are embedded.
+        lexical_index (LexicalIndex, optional): Where Chunks are indexed for
+            keyword search, alongside the vector store.
+        file_chunker (FileChunker, optional): Chunks each downloaded report.
+        queue_size (int): The capacity of each queue between stages.
+        crawler_kwargs (dict, optional): Passed through to OfstedCrawler.
+        content_cache (ContentCache, optional): When given, reports whose
+            bytes have been ingested before reuse their existing File and
+            Chunks instead of being chunked, saved and embedded again.
+        crawl_state (CrawlStateStore, optional): When given, every school
+            crawled is recorded, along with each report ingested for it, which
+            is what allows an incremental run to skip reports it has seen
+            before.
+        creator_user_uuid (str): Recorded against every File and Chunk.
+    """
+
+    def __init__(
+        self,
+        storage_handler: BaseStorageHandler,
+        vector_store: "VectorStore",
+        lexical_index: Optional[LexicalIndex] = None,
+        file_chunker: Optional[FileChunker] = None,
+        queue_size: int = 8,
+        crawler_kwargs: Optional[dict] = None,
+        content_cache: Optional[ContentCache] = None,
+        crawl_state: Optional[CrawlStateStore] = None,
+        creator_user_uuid: str = "dev",
+    ):
+        self.storage_handler = storage_handler
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.file_chunker = file_chunker or FileChunker()
+        self.queue_size = queue_size
+        self.crawler_kwargs = crawler_kwargs or {}
+        self.content_cache = content_cache
+        self.crawl_state = crawl_state
+        self.creator_user_uuid = creator_user_uuid
+
+    def run(
+        self,
+        search_url: Optional[str] = None,
+        school_urls: Optional[List[str]] = None,
+        incremental: bool = False,
+    ) -> Iterator[ProgressEvent]:
+        """Ingest every report for a search or set of schools, yielding
+        progress as it happens.
+
+        Args:
+            search_url (str, optional): The Ofsted search to ingest.
+            school_urls (List[str], optional): Schools to ingest directly,
+                instead of a search.
+            incremental (bool): Only download timeline entries that the crawl
+                state has not recorded before. Requires `crawl_state`.
+
+        Yields:
+            ProgressEvent: One per item completed or failed by any stage, then
+                a final event with `done` set.
+        """
+        self._stop = threading.Event()
+        self._events = queue.Queue()
+        self._started = time.perf_counter()
+        self._stats = {name: StageStats(name=name) for name in STAGES}
+        self._queues = {
+            name: queue.Queue(maxsize=self.queue_size) for name in STAGES[1:]
+        }
+
+        # Chunking is CPU bound, so it gets one thread per chunker process
+        chunk_workers = max(self.file_chunker.max_workers, 1)
+        self._running_workers = {"chunk": chunk_workers, "save": 1, "index": 1}
+        self._workers_lock = threading.Lock()
+        # The chunk workers share each stage's StageStats
+        self._stats_lock = threading.Lock()
+
+        if incremental and self.crawl_state is None:
+            raise ValueError(
+                "An incremental run needs a crawl_state to compare against"
+            )
+        report_filter = self.crawl_state.is_new if incremental else None
+
+        threads = [
+            threading.Thread(
+                target=self._download_stage,
+                args=(search_url, school_urls, report_filter),
+            )
+        ]
+        threads += [
+            threading.Thread(
+                target=self._worker_stage, args=("chunk", "save", self._chunk)
+            )
+            for _ in range(chunk_workers)
+        ]
+        threads += [
+            threading.Thread(
+                target=self._worker_stage, args=("save", "index", self._save)
+            ),
+            threading.Thread(
+                target=self._worker_stage, args=("index", None, self._index)
+            ),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            finished_stages = 0
+            while finished_stages < len(STAGES):
+                event = self._events.get()
+                if event is _DONE:
+                    finished_stages += 1
+                    continue
+                yield event
+            yield self._event("index", done=True)
+        finally:
+            # Stop the stages if the consumer goes away part way through
+            self._stop.set()
+
+    def _snapshot(self) -> List[StageStats]:
+        elapsed = time.perf_counter() - self._started
+        stats = []
+        for name in STAGES:
+            with self._stats_lock:
+                stage_stats = self._stats[name].model_copy()
+            stage_stats.elapsed_seconds = elapsed
+            if name in self._queues:
+                stage_stats.queue_depth = self._queues[name].qsize()
+            stats.append(stage_stats)
+        return stats
+
+    def _event(self, stage: str, **kwargs) -> ProgressEvent:
+        return ProgressEvent(stage=stage, stats=self._snapshot(), **kwargs)
+
+    def _put(self, stage: Optional[str], item) -> bool:
+        """Put an item on the queue in front of a stage, waiting while it is
+        full. Returns False if the pipeline was stopped first."""
+        if stage is None:
+            return True
+        while not self._stop.is_set():
+            try:
+                self._queues[stage].put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _download_stage(
+        self,
+        search_url: Optional[str],
+        school_urls: Optional[List[str]],
+        report_filter: Optional[ReportFilter],
+    ):
+        stats = self._stats["download"]
+
+        async def _crawl():
+            async with OfstedCrawler(
+                content_cache=self.content_cache, **self.crawler_kwargs
+            ) as crawler:
+                on_school = (
+                    self.crawl_state.record_school
+                    if self.crawl_state is not None
+                    else None
+                )
+                if search_url is not None:
+                    reports = crawler.iter_reports(
+                        search_url, report_filter, on_school=on_school
+                    )
+                else:
+                    reports = crawler.iter_school_reports(
+                        school_urls, report_filter, on_school=on_school
+                    )
+
+                last = time.perf_counter()
+                async for report in reports:
+                    with self._stats_lock:
+                        stats.processed += 1
+                        stats.busy_seconds += time.perf_counter() - last
+                    self._events.put(self._event("download", file_name=report.filename))
+
+                    cached_file = self._cached_file(report.content_hash)
+                    if cached_file is not None:
+                        with self._stats_lock:
+                            for stage in STAGES[1:]:
+                                self._stats[stage].skipped += 1
+                        if self.crawl_state is not None:
+                            self.crawl_state.record(report)
+                        self._events.put(
+                            self._event(
+                                "index",
+                                file_name=cached_file.name,
+                                file_uuid=cached_file.uuid,
+                                cached=True,
+                            )
+                        )
+                    else:
+                        item = IngestItem(
+                            file=report_to_file(report, self.creator_user_uuid),
+                            report=report,
+                        )
+                        if not await asyncio.to_thread(self._put, "chunk", item):
+                            return
+                    last = time.perf_counter()
+
+        try:
+            asyncio.run(_crawl())
+        except Exception as err:
+            with self._stats_lock:
+                stats.failed += 1
+            self._events.put(self._event("download", error=str(err)))
+        finally:
+            self._put("chunk", _DONE)
+            self._events.put(_DONE)
+
+    def _worker_stage(self, stage: str, next_stage: Optional[str], work: Callable):
+        stats = self._stats[stage]
+        in_queue = self._queues[stage]
+
+        while not self._stop.is_set():
+            try:
+                item = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                # Pass the end marker on to any other workers on this stage
+                self._put(stage, _DONE)
+                break
+
+            file = item.file
+            start = time.perf_counter()
+            try:
+                result = work(item)
+            except Exception as err:
+                with self._stats_lock:
+                    stats.failed += 1
+                self._events.put(
+                    self._event(stage, file_name=file.name, error=str(err))
+                )
+                continue
+            with self._stats_lock:
+                stats.busy_seconds += time.perf_counter() - start
+                stats.processed += 1
+
+            self._events.put(
+                self._event(stage, file_name=file.name, file_uuid=file.uuid)
+            )
+            if not self._put(next_stage, result):
+                break
+
+        with self._workers_lock:
+            self._running_workers[stage] -= 1
+            last_worker = self._running_workers[stage] == 0
+
+        if last_worker:
+            self._put(next_stage, _DONE)
+            self._events.put(_DONE)
+
+    def _cached_file(self, content_hash: Optional[str]) -> Optional[File]:
+        """The File already ingested from identical bytes, if it still exists"""
+        if self.content_cache is None or content_hash is None:
+            return None
+
+        entry = self.content_cache.get_content(content_hash)
+        if entry is None:
+            return None
+
+        try:
+            return self.storage_handler.read_item(entry.file_uuid, "File")
+        except FileNotFoundError:
+            return None
+
+    def _chunk(self, item: IngestItem) -> IngestItem:
+        result = self.file_chunker.submit(
+            file=item.file, creator_user_uuid=self.creator_user_uuid
+        ).result()
+        if result.error:
+            raise RuntimeError(result.error)
+        item.chunks = result.chunks
+        return item
+
+    def _save(self, item: IngestItem) -> IngestItem:
+        with telemetry.span(
+            "storage_write", file_name=item.file.name, chunks=len(item.chunks)
+        ):
+            self.storage_handler.write_item(item=item.file)
+            self.storage_handler.write_items(items=item.chunks)
+        return item
+
+    def _index(self, item: IngestItem) -> IngestItem:
+        with telemetry.span("index", file_name=item.file.name, chunks=len(item.chunks)):
+            add_chunks_to_vector_store(self.vector_store, item.chunks)
+            if self.lexical_index is not None:
+                self.lexical_index.add_chunks(item.chunks)
+
+        # Only recorded once embedded, so a failed run is retried next time
+        if self.content_cache is not None and item.report.content_hash is not None:
+            self.content_cache.put_content(
+                ContentCacheEntry(
+                    content_hash=item.report.content_hash,
+                    file_uuid=item.file.uuid,
+                    chunk_uuids=[chunk.uuid for chunk in item.chunks],
+                )
+            )
+        if self.crawl_state is not None:
+            self.crawl_state.record(item.report)
+        return item
@@ -0,0 +1,4 @@
+from ofstedai.retrieval.hybrid import HybridRetriever, scope_filter
+from ofstedai.retrieval.lexical import LexicalIndex, get_lexical_index
+
+__all__ = ["HybridRetriever", "LexicalIndex", "get_lexical_index", "scope_filter"]
@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from langchain.schema.vectorstore import VectorStore
+
+from ofstedai import telemetry
+from ofstedai.retrieval.lexical import LexicalIndex
+
+
+def scope_filter(parent_file_uuids: List[str]) -> dict:
+    """A vector store filter matching chunks from any of the given files"""
+    if len(parent_file_uuids) == 1:
+        return {"parent_file_uuid": parent_file_uuids[0]}
+    return {"parent_file_uuid": {"$in": parent_file_uuids}}
+
+
+def min_max_normalise(scores: Dict[str, float]) -> Dict[str, float]:
+    """Scale scores to 0-1 so BM25 and vector scores can be added together"""
+    if len(scores) == 0:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {key: 1.0 for key in scores}
+    return {key: (score - low) / (high - low) for key, score in scores.items()}
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 keyword matches with dense vector similarity.
+
+    The lexical index picks up to `fetch_k` keyword candidates, which are
+    then scored against the query vector alongside the `fetch_k` nearest
+    neighbours from the vector store. Both scores are normalised and
+    combined, weighted by `vector_weight`, and the top `k` returned with
+    their score in `metadata["hybrid_score"]`.
+
+    When scoped to `parent_file_uuids`, the scope's vectors are looked up
+    through the vector store's metadata index and scored exactly, so a
+    scoped query costs the size of the scope rather than of the corpus.
+    """
+
+    vector_store: VectorStore
+    lexical_index: LexicalIndex
+    k: int = 5
+    fetch_k: int = 50
+    vector_weight: float = 0.5
+    # Restricts retrieval to chunks from these files
+    parent_file_uuids: Optional[List[str]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _vector_search(self, query: str, filter: Optional[dict]) -> Dict[str, tuple]:
+        with telemetry.span("vector_query", filtered=filter is not None):
+            results = self.vector_store.similarity_search_with_score(
+                query, k=self.fetch_k, filter=filter
+            )
+        # Distances, so negate to make higher better
+        return {doc.metadata["uuid"]: (doc, -distance) for doc, distance in results}
+
+    def _scoped_vector_search(self, query: str) -> Dict[str, tuple]:
+        with telemetry.span("vector_query", scoped=True) as query_span:
+            scope = self.vector_store.get(
+                where=scope_filter(self.parent_file_uuids),
+                include=["embeddings", "documents", "metadatas"],
+            )
+            query_span.set(scope_size=len(scope["ids"]))
+            if len(scope["ids"]) == 0:
+                return {}
+
+            embeddings = np.asarray(scope["embeddings"], dtype=np.float32)
+            query_vector = np.asarray(
+                self.vector_store.embeddings.embed_query(query), dtype=np.float32
+            )
+            # Squared L2, the same distance the vector store ranks by
+            scores = -((embeddings - query_vector) ** 2).sum(axis=1)
+
+        return {
+            metadata["uuid"]: (
+                Document(page_content=text, metadata=metadata),
+                float(score),
+            )
+            for text, metadata, score in zip(
+                scope["documents"], scope["metadatas"], scores
+            )
+        }
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        with telemetry.span("lexical_query"):
+            lexical_scores = dict(
+                self.lexical_index.search(
+                    query, k=self.fetch_k, parent_file_uuids=self.parent_file_uuids
+                )
+            )
+
+        if self.parent_file_uuids:
+            # Every chunk in scope is scored, keyword candidates included
+            dense = self._scoped_vector_search(query)
+        else:
+            dense = self._vector_search(query, None)
+            lexical_only = [uuid for uuid in lexical_scores if uuid not in dense]
+            if lexical_only:
+                # Score the keyword candidates the nearest neighbours missed
+                dense.update(
+                    self._vector_search(query, {"uuid": {"$in": lexical_only}})
+                )
+
+        vector_scores = min_max_normalise({uuid: s for uuid, (_, s) in dense.items()})
+        lexical_scores = min_max_normalise(lexical_scores)
+
+        fused = {
+            uuid: self.vector_weight * vector_scores[uuid]
+            + (1 - self.vector_weight) * lexical_scores.get(uuid, 0.0)
+            for uuid in dense
+        }
+
+        docs = []
+        for uuid in sorted(fused, key=fused.get, reverse=True)[: self.k]:
+            doc = dense[uuid][0]
+            doc.metadata["hybrid_score"] = fused[uuid]
+            docs.append(doc)
+        return docs
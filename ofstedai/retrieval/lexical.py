@@ -0,0 +1,114 @@
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from ofstedai.models import Chunk
+
+default_index_path = pathlib.Path("./data/LexicalIndex/lexical.sqlite3")
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def query_terms(query: str) -> List[str]:
+    """Split a query into the terms matched against the index"""
+    return list(dict.fromkeys(token.lower() for token in _TOKEN_PATTERN.findall(query)))
+
+
+class LexicalIndex:
+    """An on-disk BM25 inverted index over Chunk text.
+
+    Backed by an SQLite FTS5 table, so postings are stored and ranked in
+    SQLite itself and new chunks can be added as they are ingested.
+    Keyword lookups for URNs, school names or terms like "SEND", which dense
+    retrieval often misses, stay in milliseconds at hundreds of thousands
+    of chunks.
+    """
+
+    def __init__(self, path: pathlib.Path = default_index_path):
+        self.path = pathlib.Path(path)
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                "text, uuid UNINDEXED, parent_file_uuid UNINDEXED, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def add_chunks(self, chunks: List[Chunk]):
+        """Index chunks in one transaction, replacing any already indexed"""
+        with self._connection() as connection:
+            connection.executemany(
+                "DELETE FROM chunks WHERE uuid = ?", [(chunk.uuid,) for chunk in chunks]
+            )
+            connection.executemany(
+                "INSERT INTO chunks (text, uuid, parent_file_uuid) VALUES (?, ?, ?)",
+                [(chunk.text, chunk.uuid, chunk.parent_file_uuid) for chunk in chunks],
+            )
+
+    def delete_chunks(self, chunk_uuids: List[str]):
+        with self._connection() as connection:
+            connection.executemany(
+                "DELETE FROM chunks WHERE uuid = ?", [(uuid,) for uuid in chunk_uuids]
+            )
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        k: int = 50,
+        parent_file_uuids: Optional[List[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Find the chunks that best match any of the query's terms.
+
+        Args:
+            query (str): Free text, split into terms.
+            k (int): The number of chunks to return.
+            parent_file_uuids (List[str], optional): Only search these files.
+
+        Returns:
+            List[Tuple[str, float]]: Chunk uuids with their BM25 score, best first.
+        """
+        terms = query_terms(query)
+        if len(terms) == 0:
+            return []
+
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = "SELECT uuid, -bm25(chunks) FROM chunks WHERE chunks MATCH ?"
+        params = [match]
+        if parent_file_uuids:
+            sql += (
+                f" AND parent_file_uuid IN ({','.join('?' * len(parent_file_uuids))})"
+            )
+            params += parent_file_uuids
+        sql += " ORDER BY bm25(chunks) LIMIT ?"
+        params.append(k)
+
+        return self._connection().execute(sql, params).fetchall()
+
+
+def get_lexical_index(path: pathlib.Path = default_index_path) -> LexicalIndex:
+    """The process-wide lexical index for a path, opened on first use"""
+    key = os.path.abspath(path)
+    with _lock:
+        if key not in _indexes:
+            _indexes[key] = LexicalIndex(path)
+        return _indexes[key]
@@ -0,0 +1,4 @@
+from ofstedai.server.app import create_app
+from ofstedai.server.resources import ServiceResources
+
+__all__ = ["ServiceResources", "create_app"]
@@ -0,0 +1,335 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional
+
+import dotenv
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from langchain.callbacks.streaming_aiter import AsyncIteratorCallbackHandler
+from langchain.schema import Document
+
+from ofstedai import telemetry
+from ofstedai.chat import (
+    TimeToFirstTokenHandler,
+    cited_page_numbers,
+    get_answer_cache,
+    pack_context,
+    replace_citations,
+)
+from ofstedai.models import IngestJob
+from ofstedai.server.resources import ServiceResources
+from ofstedai.server.schemas import (
+    ChatRequest,
+    ChatResponse,
+    IngestRequest,
+    Scope,
+    SearchRequest,
+    SearchResult,
+    Source,
+)
+
+router = APIRouter()
+
+
+def get_resources(request: Request) -> ServiceResources:
+    return request.app.state.resources
+
+
+def sse(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class PreparedAnswer(NamedTuple):
+    standalone_question: str
+    question_embedding: List[float]
+    # The files the answer is drawn from, which key the answer cache
+    cache_scope: List[str]
+    cached_result: Optional[dict]
+    docs: List[Document]
+
+
+def resolve_scope(resources: ServiceResources, scope: Scope) -> Optional[List[str]]:
+    """The file uuids a request is restricted to, None for the whole corpus.
+
+    Raises:
+        HTTPException: 404 when the request is restricted to no files at all.
+    """
+    file_uuids = resources.scope_file_uuids(scope.school_names, scope.file_uuids)
+    if file_uuids is not None and len(file_uuids) == 0:
+        raise HTTPException(status_code=404, detail="No files match the given scope")
+    return file_uuids
+
+
+async def prepare_answer(
+    resources: ServiceResources,
+    request: ChatRequest,
+    scope_file_uuids: Optional[List[str]],
+) -> PreparedAnswer:
+    """Condense the question, then find a cached answer or the documents to
+    answer it from. The blocking steps run on threads, off the event loop."""
+    standalone_question = await asyncio.to_thread(
+        resources.condenser, request.question, request.chat_messages()
+    )
+
+    # Near-identical questions over the same files reuse the earlier answer
+    question_embedding = await asyncio.to_thread(
+        resources.embeddings.embed_query, standalone_question
+    )
+    if scope_file_uuids is None:
+        cache_scope = list((await asyncio.to_thread(resources.files)).keys())
+    else:
+        cache_scope = scope_file_uuids
+    cached_result = get_answer_cache().get(question_embedding, cache_scope)
+
+    def retrieve_context() -> List[Document]:
+        docs = resources.retrieve(standalone_question, request.k, scope_file_uuids)
+        return pack_context(docs, max_tokens=request.max_context_tokens)
+
+    docs = []
+    if cached_result is None:
+        with telemetry.span("retrieve", k=request.k, scoped=bool(scope_file_uuids)):
+            docs = await asyncio.to_thread(retrieve_context)
+
+    return PreparedAnswer(
+        standalone_question, question_embedding, cache_scope, cached_result, docs
+    )
+
+
+def answer_inputs(prepared: PreparedAnswer) -> dict:
+    return {
+        "question": prepared.standalone_question,
+        "input_documents": prepared.docs,
+    }
+
+
+def chat_response(
+    resources: ServiceResources,
+    request: ChatRequest,
+    prepared: PreparedAnswer,
+    result: dict,
+) -> ChatResponse:
+    """The answer with its citations rendered and the files it drew on"""
+    page_numbers = cited_page_numbers(result["input_documents"])
+    all_files = resources.files()
+    files = {
+        file_uuid: all_files[file_uuid]
+        for file_uuid in page_numbers
+        if file_uuid in all_files
+    }
+    return ChatResponse(
+        question=request.question,
+        standalone_question=prepared.standalone_question,
+        answer=str(result["output_text"]),
+        markdown=replace_citations(
+            str(result["output_text"]), files, page_numbers=page_numbers, flexible=True
+        ),
+        sources=[
+            Source(
+                file_uuid=file.uuid,
+                name=file.name,
+                school_name=file.school_name,
+                school_url=file.school_url,
+                page_numbers=page_numbers[file.uuid],
+            )
+            for file in files.values()
+        ],
+        cached=prepared.cached_result is not None,
+    )
+
+
+@router.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timings of this worker process, for Prometheus to scrape"""
+    return telemetry.metrics_text()
+
+
+@router.get("/files")
+async def list_files(
+    school_name: Optional[str] = None,
+    resources: ServiceResources = Depends(get_resources),
+):
+    files = await asyncio.to_thread(resources.files)
+    return [
+        file.model_dump(exclude={"text"})
+        for file in files.values()
+        if school_name is None or file.school_name == school_name
+    ]
+
+
+@router.post("/search", response_model=List[SearchResult])
+async def search(
+    request: SearchRequest, resources: ServiceResources = Depends(get_resources)
+):
+    scope_file_uuids = await asyncio.to_thread(resolve_scope, resources, request)
+    with telemetry.span("search", k=request.k, scoped=scope_file_uuids is not None):
+        docs = await asyncio.to_thread(
+            resources.retrieve, request.query, request.k, scope_file_uuids
+        )
+    return [
+        SearchResult(
+            uuid=doc.metadata["uuid"],
+            parent_file_uuid=doc.metadata["parent_file_uuid"],
+            text=doc.page_content,
+            score=doc.metadata.get("hybrid_score", 0.0),
+            metadata=doc.metadata,
+        )
+        for doc in docs
+    ]
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest, resources: ServiceResources = Depends(get_resources)
+):
+    scope_file_uuids = await asyncio.to_thread(resolve_scope, resources, request)
+    with telemetry.span("chat_turn", streamed=False):
+        prepared = await prepare_answer(resources, request, scope_file_uuids)
+        result = prepared.cached_result
+        if result is None:
+            with telemetry.span("answer", documents=len(prepared.docs)):
+                result = await resources.answer_chain.acall(
+                    answer_inputs(prepared), callbacks=[TimeToFirstTokenHandler()]
+                )
+            get_answer_cache().put(
+                prepared.standalone_question,
+                prepared.question_embedding,
+                prepared.cache_scope,
+                dict(result),
+            )
+        return await asyncio.to_thread(
+            chat_response, resources, request, prepared, result
+        )
+
+
+async def stream_answer(
+    resources: ServiceResources,
+    request: ChatRequest,
+    scope_file_uuids: Optional[List[str]],
+) -> AsyncIterator[str]:
+    """Server-sent events for one chat turn: `token` events as the answer is
+    generated, then `done` with the whole ChatResponse, or `error`"""
+    with telemetry.span("chat_turn", streamed=True):
+        try:
+            prepared = await prepare_answer(resources, request, scope_file_uuids)
+        except Exception as err:
+            yield sse("error", {"detail": f"{type(err).__name__}: {err}"})
+            return
+        result = prepared.cached_result
+        if result is not None:
+            yield sse("token", {"text": str(result["output_text"])})
+        else:
+            stream = AsyncIteratorCallbackHandler()
+            with telemetry.span("answer", documents=len(prepared.docs)):
+                task = asyncio.create_task(
+                    resources.answer_chain.acall(
+                        answer_inputs(prepared),
+                        callbacks=[stream, TimeToFirstTokenHandler()],
+                    )
+                )
+                # Stop waiting for tokens if the chain fails before the LLM runs
+                task.add_done_callback(lambda _: stream.done.set())
+                try:
+                    async for token in stream.aiter():
+                        yield sse("token", {"text": token})
+                    result = await task
+                except Exception as err:
+                    yield sse("error", {"detail": f"{type(err).__name__}: {err}"})
+                    return
+                finally:
+                    # The client went away part way through
+                    if not task.done():
+                        task.cancel()
+            get_answer_cache().put(
+                prepared.standalone_question,
+                prepared.question_embedding,
+                prepared.cache_scope,
+                dict(result),
+            )
+
+        response = await asyncio.to_thread(
+            chat_response, resources, request, prepared, result
+        )
+        yield sse("done", response.model_dump())
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest, resources: ServiceResources = Depends(get_resources)
+):
+    scope_file_uuids = await asyncio.to_thread(resolve_scope, resources, request)
+    return StreamingResponse(
+        stream_answer(resources, request, scope_file_uuids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/ingest", response_model=IngestJob, status_code=202)
+async def start_ingest(
+    request: IngestRequest, resources: ServiceResources = Depends(get_resources)
+):
+    """Queue an ingest job in this worker, returning at once. Poll the job
+    for its progress."""
+    if (request.search_url is None) == (request.school_urls is None):
+        raise HTTPException(
+            status_code=422, detail="Give exactly one of search_url or school_urls"
+        )
+    job = IngestJob(**request.model_dump(), creator_user_uuid="api")
+    return await asyncio.to_thread(resources.jobs.submit, job)
+
+
+@router.get("/ingest", response_model=List[IngestJob])
+async def list_ingest_jobs(resources: ServiceResources = Depends(get_resources)):
+    return await asyncio.to_thread(resources.jobs.list_jobs)
+
+
+@router.get("/ingest/{job_uuid}", response_model=IngestJob)
+async def get_ingest_job(
+    job_uuid: str, resources: ServiceResources = Depends(get_resources)
+):
+    try:
+        return await asyncio.to_thread(resources.jobs.get, job_uuid)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No ingest job {job_uuid}")
+
+
+def create_app(
+    create_resources: Callable[[], ServiceResources] = ServiceResources,
+    warm_up: bool = True,
+) -> FastAPI:
+    """The API service. Each worker process creates its own ServiceResources
+    as it starts, which every request it serves then shares.
+
+    Args:
+        create_resources (Callable[[], ServiceResources]): Called once per
+            worker process on start up.
+        warm_up (bool): Load the embedding model before serving requests.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Bring VARS into environment
+        dotenv.load_dotenv(".env")
+        telemetry.configure_tracing(dotenv.dotenv_values(".env").get("TRACE_FILE"))
+
+        resources = await asyncio.to_thread(create_resources)
+        if warm_up:
+            await asyncio.to_thread(resources.warm_up)
+        app.state.resources = resources
+        yield
+        resources.close()
+
+    app = FastAPI(title="Ofsted AI Copilot", lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+
+# For uvicorn, e.g. `uvicorn ofstedai.server.app:app --workers 4`
+app = create_app()
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
+
+from ofstedai.models import IngestJob
+from ofstedai.parsing.file_chunker import FileChunker
+from ofstedai.pipeline import CrawlStateStore, IngestPipeline
+from ofstedai.storage.content_cache import ContentCache
+
+if TYPE_CHECKING:
+    from ofstedai.server.resources import ServiceResources
+
+# Errors kept on a job, the most recent ones
+_MAX_JOB_ERRORS = 20
+
+
+class IngestJobRunner:
+    """Runs the ingest jobs accepted by one worker process, one at a time on a
+    background thread, saving each job's progress to storage as it goes so
+    any worker can report on it.
+
+    Args:
+        resources (ServiceResources): The stores and indexes to ingest into.
+        chunk_workers (int): Processes used to chunk reports.
+        save_interval (float): Seconds between saves of a running job.
+    """
+
+    def __init__(
+        self,
+        resources: "ServiceResources",
+        chunk_workers: int = 1,
+        save_interval: float = 1.0,
+    ):
+        self.resources = resources
+        self.storage_handler = resources.storage_handler
+        self.file_chunker = FileChunker(max_workers=chunk_workers)
+        self.save_interval = save_interval
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        """Save a job and queue it to run after any already accepted"""
+        self.storage_handler.write_item(job)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_forever, daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_uuid: str) -> IngestJob:
+        """The latest saved state of a job, from whichever worker runs it
+
+        Raises:
+            FileNotFoundError: If there is no such job.
+        """
+        return self.storage_handler.read_item(job_uuid, "IngestJob")
+
+    def list_jobs(self) -> List[IngestJob]:
+        """Every job, most recently created first"""
+        jobs = self.storage_handler.read_all_items("IngestJob")
+        return sorted(jobs, key=lambda job: job.created_datetime, reverse=True)
+
+    def _run_forever(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            self._run(job)
+
+    def _run(self, job: IngestJob):
+        data_path = self.resources.data_path
+        pipeline = IngestPipeline(
+            storage_handler=self.storage_handler,
+            vector_store=self.resources.vector_store,
+            lexical_index=self.resources.lexical_index,
+            file_chunker=self.file_chunker,
+            content_cache=ContentCache(
+                path=data_path / "Cache" / "content_cache.jsonl"
+            ),
+            crawl_state=CrawlStateStore(self.storage_handler),
+            creator_user_uuid=job.creator_user_uuid or "api",
+        )
+
+        job.status = "running"
+        self.storage_handler.write_item(job)
+        last_saved = time.monotonic()
+        try:
+            for event in pipeline.run(
+                search_url=job.search_url,
+                school_urls=job.school_urls,
+                incremental=job.incremental,
+            ):
+                if event.error:
+                    job.failed += 1
+                    job.errors = job.errors[-(_MAX_JOB_ERRORS - 1) :] + [
+                        f"Failed to {event.stage} "
+                        f"{event.file_name or 'reports'}: {event.error}"
+                    ]
+                elif event.stage == "index" and event.file_name:
+                    if event.cached:
+                        job.unchanged += 1
+                    else:
+                        job.indexed += 1
+                job.stats = [stats.model_dump() for stats in event.stats]
+
+                if time.monotonic() - last_saved >= self.save_interval:
+                    self.storage_handler.write_item(job)
+                    last_saved = time.monotonic()
+            job.status = "done"
+        except Exception as err:
+            job.status = "failed"
+            job.errors = job.errors[-(_MAX_JOB_ERRORS - 1) :] + [
+                f"{type(err).__name__}: {err}"
+            ]
+        finally:
+            job.finished_datetime = datetime.utcnow().isoformat()
+            self.storage_handler.write_item(job)
+            self.resources.refresh_files()
+
+    def close(self):
+        """Stop taking queued jobs. A job still running when the process
+        exits is left with the progress it last saved."""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread = None
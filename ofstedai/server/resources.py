@@ -0,0 +1,183 @@
+import os
+import pathlib
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from langchain.chains.llm import LLMChain
+from langchain.chains.qa_with_sources import load_qa_with_sources_chain
+from langchain.schema import Document
+from langchain.schema.vectorstore import VectorStore
+
+from ofstedai.chat import QuestionCondenser, create_chat_model
+from ofstedai.chat.prompts import (
+    CONDENSE_QUESTION_PROMPT,
+    STUFF_DOCUMENT_PROMPT,
+    WITH_SOURCES_PROMPT,
+)
+from ofstedai.models import File
+from ofstedai.retrieval import HybridRetriever, LexicalIndex, get_lexical_index
+from ofstedai.server.jobs import IngestJobRunner
+from ofstedai.storage import get_storage_handler
+from ofstedai.vectorstore import get_vector_store
+
+
+class ServiceResources:
+    """The models, stores and indexes every request in a worker process shares.
+
+    Created once per process as the service starts, so each worker loads the
+    embedding model, opens the stores and creates the chat model only once,
+    however many requests it serves.
+
+    Args:
+        data_path (pathlib.Path): The root of the local data store.
+        storage_backend (str, optional): Defaults to STORAGE_BACKEND.
+        vector_store (VectorStore, optional): Defaults to the process-wide
+            store for `data_path`.
+        lexical_index (LexicalIndex, optional): Defaults to the process-wide
+            index for `data_path`.
+        llm (optional): The chat model, created on first use by default.
+        files_ttl_seconds (float): How long the list of Files is reused
+            before it is read from storage again, unless an ingest job in
+            any worker has finished since.
+        chunk_workers (int): Processes used to chunk reports for ingest jobs.
+    """
+
+    def __init__(
+        self,
+        data_path: pathlib.Path = pathlib.Path("./data"),
+        storage_backend: Optional[str] = None,
+        vector_store: Optional[VectorStore] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        llm=None,
+        files_ttl_seconds: float = 60,
+        chunk_workers: int = 1,
+    ):
+        self.data_path = pathlib.Path(data_path)
+        self.storage_handler = get_storage_handler(
+            backend=storage_backend
+            or os.environ.get("STORAGE_BACKEND")
+            or "filesystem",
+            root_path=self.data_path,
+        )
+        if vector_store is None:
+            vector_store = get_vector_store(
+                persist_directory=str(self.data_path / "VectorStore")
+            )
+        if lexical_index is None:
+            lexical_index = get_lexical_index(
+                self.data_path / "LexicalIndex" / "lexical.sqlite3"
+            )
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.files_ttl_seconds = files_ttl_seconds
+
+        self._llm = llm
+        self._answer_chain = None
+        self._lock = threading.Lock()
+        self._files: Dict[str, File] = {}
+        self._files_read = None
+        # Touched when an ingest job finishes, so every worker sees new Files
+        self._files_marker = self.data_path / "Cache" / "files_changed"
+        self._files_marker_seen = None
+
+        self.condenser = QuestionCondenser(self._condense)
+        self.jobs = IngestJobRunner(self, chunk_workers=chunk_workers)
+
+    @property
+    def embeddings(self):
+        """The embedding model the vector store searches with"""
+        return self.vector_store.embeddings
+
+    @property
+    def llm(self):
+        with self._lock:
+            if self._llm is None:
+                self._llm = create_chat_model()
+            return self._llm
+
+    @property
+    def answer_chain(self):
+        """Answers a question from documents, citing them as <DocX>"""
+        llm = self.llm
+        with self._lock:
+            if self._answer_chain is None:
+                self._answer_chain = load_qa_with_sources_chain(
+                    llm,
+                    chain_type="stuff",
+                    prompt=WITH_SOURCES_PROMPT,
+                    document_prompt=STUFF_DOCUMENT_PROMPT,
+                )
+            return self._answer_chain
+
+    def _condense(self, question: str, chat_history: str) -> str:
+        chain = LLMChain(llm=self.llm, prompt=CONDENSE_QUESTION_PROMPT)
+        return chain({"question": question, "chat_history": chat_history})["text"]
+
+    def warm_up(self):
+        """Load the embedding model before the first request needs it"""
+        self.embeddings.embed_query("warm up")
+
+    def _files_marker_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._files_marker).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def files(self) -> Dict[str, File]:
+        """Every ingested File by uuid, re-read at most every `files_ttl_seconds`
+        or once an ingest job finishes"""
+        with self._lock:
+            marker = self._files_marker_mtime()
+            if (
+                self._files_read is None
+                or marker != self._files_marker_seen
+                or time.monotonic() - self._files_read > self.files_ttl_seconds
+            ):
+                self._files = {
+                    file.uuid: file
+                    for file in self.storage_handler.read_all_items("File")
+                }
+                self._files_read = time.monotonic()
+                self._files_marker_seen = marker
+            return self._files
+
+    def refresh_files(self):
+        """Read the Files again on next use in every worker, e.g. once an
+        ingest job finishes"""
+        with self._lock:
+            self._files_marker.parent.mkdir(parents=True, exist_ok=True)
+            self._files_marker.touch()
+            self._files_read = None
+
+    def scope_file_uuids(
+        self,
+        school_names: Optional[Iterable[str]] = None,
+        file_uuids: Optional[Iterable[str]] = None,
+    ) -> Optional[List[str]]:
+        """The files a request is restricted to, or None for the whole corpus"""
+        if school_names is None and file_uuids is None:
+            return None
+
+        scope = set(file_uuids or [])
+        if school_names is not None:
+            school_names = set(school_names)
+            scope.update(
+                file.uuid
+                for file in self.files().values()
+                if file.school_name in school_names
+            )
+        return sorted(scope)
+
+    def retrieve(
+        self, query: str, k: int, parent_file_uuids: Optional[List[str]] = None
+    ) -> List[Document]:
+        return HybridRetriever(
+            vector_store=self.vector_store,
+            lexical_index=self.lexical_index,
+            k=k,
+            parent_file_uuids=parent_file_uuids,
+        ).get_relevant_documents(query)
+
+    def close(self):
+        self.jobs.close()
@@ -0,0 +1,85 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from ofstedai.models.chat import ChatMessage
+
+# Bounds on the work one request can ask for
+MAX_K = 100
+MAX_CONTEXT_TOKENS = 20000
+
+
+class Scope(BaseModel):
+    """Restricts a request to some schools or files, by default the whole corpus"""
+
+    school_names: Optional[List[str]] = None
+    file_uuids: Optional[List[str]] = None
+
+
+class SearchRequest(Scope):
+    query: str
+    k: int = Field(5, ge=1, le=MAX_K)
+
+
+class SearchResult(BaseModel):
+    uuid: str
+    parent_file_uuid: str
+    text: str
+    score: float
+    metadata: dict
+
+
+class HistoryMessage(BaseModel):
+    # The langchain message type, human or ai
+    role: str
+    content: str
+
+
+class ChatRequest(Scope):
+    question: str
+    # Earlier turns of the conversation, oldest first
+    history: List[HistoryMessage] = []
+    k: int = Field(20, ge=1, le=MAX_K)
+    # Input tokens allowed for retrieved documents in the answer prompt
+    max_context_tokens: int = Field(3000, ge=1, le=MAX_CONTEXT_TOKENS)
+
+    def chat_messages(self) -> List[ChatMessage]:
+        """The history as the ChatMessages the question condenser reads"""
+        from langchain.schema import AIMessage, HumanMessage
+
+        message_types = {"human": HumanMessage, "ai": AIMessage}
+        return [
+            ChatMessage(
+                chain=None,
+                message=message_types[message.role](content=message.content),
+                creator_user_uuid="api",
+            )
+            for message in self.history
+            if message.role in message_types
+        ]
+
+
+class Source(BaseModel):
+    file_uuid: str
+    name: str
+    school_name: str
+    school_url: str
+    page_numbers: List[int] = []
+
+
+class ChatResponse(BaseModel):
+    question: str
+    standalone_question: str
+    # The answer as the model gave it, citing documents as <DocX>
+    answer: str
+    # The answer with its citations rendered as markdown links
+    markdown: str
+    sources: List[Source]
+    cached: bool = False
+
+
+class IngestRequest(BaseModel):
+    search_url: Optional[str] = None
+    school_urls: Optional[List[str]] = None
+    # Only download reports not ingested before
+    incremental: bool = False
@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Imported as early as possible so the report can show time since start up
+_process_started = time.perf_counter()
+_timings: Dict[str, float] = {}
+
+
+@contextmanager
+def timed(name: str):
+    """Record how long a one-off start up step, such as loading a model, takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[name] = _timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def startup_report() -> List[dict]:
+    """Every start up step timed so far in this process, slowest first"""
+    rows = [
+        {"step": name, "seconds": round(seconds, 3)}
+        for name, seconds in sorted(_timings.items(), key=lambda x: -x[1])
+    ]
+    rows.append(
+        {
+            "step": "since ofstedai was imported",
+            "seconds": round(time.perf_counter() - _process_started, 3),
+        }
+    )
+    return rows
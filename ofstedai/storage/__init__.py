@@ -1,7 +1,12 @@
+from ofstedai.storage.backends import get_storage_handler
 from ofstedai.storage.filesystem import FileSystemStorageHandler
+from ofstedai.storage.sqlite import SQLiteStorageHandler, migrate_storage
 from ofstedai.storage.storage_handler import BaseStorageHandler
 
 __all__ = [
     "BaseStorageHandler",
     "FileSystemStorageHandler",
+    "SQLiteStorageHandler",
+    "get_storage_handler",
+    "migrate_storage",
 ]
@@ -0,0 +1,26 @@
+import pathlib
+
+from ofstedai.storage.filesystem import FileSystemStorageHandler
+from ofstedai.storage.sqlite import SQLiteStorageHandler
+from ofstedai.storage.storage_handler import BaseStorageHandler
+
+storage_backends = ["filesystem", "sqlite"]
+
+
+def get_storage_handler(
+    backend: str = "filesystem", root_path: pathlib.Path = pathlib.Path("./data/")
+) -> BaseStorageHandler:
+    """Create the storage handler for a backend name
+
+    Args:
+        backend (str): One of `storage_backends`.
+        root_path (pathlib.Path): The root of the local data store.
+    """
+    root_path = pathlib.Path(root_path)
+    if backend == "filesystem":
+        return FileSystemStorageHandler(root_path=root_path)
+    elif backend == "sqlite":
+        return SQLiteStorageHandler(database_path=root_path / "ofstedai.sqlite3")
+    raise ValueError(
+        f"Storage backend {backend} is not supported, use one of {storage_backends}"
+    )
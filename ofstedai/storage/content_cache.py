@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+from pyprojroot import here
+
+default_cache_path = here() / "data" / "Cache" / "content_cache.jsonl"
+
+
+def hash_content(content: bytes) -> str:
+    """The content address used for downloaded reports"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class UrlCacheEntry(BaseModel):
+    """What was last downloaded from a URL, with its HTTP validators"""
+
+    url: str
+    path: str
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ContentCacheEntry(BaseModel):
+    """The File and Chunks that were created from a given PDF's bytes"""
+
+    content_hash: str
+    file_uuid: str
+    chunk_uuids: List[str]
+
+
+class ContentCache:
+    """A persistent content-addressed cache for downloaded and parsed reports.
+
+    Two lookups are kept:
+        * URL -> the ETag/Last-Modified and content hash of the last download,
+          so unchanged reports can be requested conditionally.
+        * content hash -> the File and Chunk uuids created from those bytes,
+          so identical PDFs are never partitioned or embedded twice.
+
+    Entries are appended to a JSON lines log and replayed on start up, so
+    recording an entry never rewrites the whole cache.
+    """
+
+    def __init__(self, path: pathlib.Path = default_cache_path):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._urls: Dict[str, UrlCacheEntry] = {}
+        self._contents: Dict[str, ContentCacheEntry] = {}
+
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record.pop("kind")
+                if kind == "url":
+                    entry = UrlCacheEntry(**record)
+                    self._urls[entry.url] = entry
+                elif kind == "content":
+                    entry = ContentCacheEntry(**record)
+                    self._contents[entry.content_hash] = entry
+
+    def _append(self, kind: str, entry: BaseModel):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": kind, **entry.model_dump()}) + "\n")
+
+    def get_url(self, url: str) -> Optional[UrlCacheEntry]:
+        """The last download recorded for a URL, if its file is still on disk"""
+        entry = self._urls.get(url)
+        if entry is None or not os.path.exists(entry.path):
+            return None
+        return entry
+
+    def put_url(self, entry: UrlCacheEntry):
+        with self._lock:
+            self._urls[entry.url] = entry
+            self._append("url", entry)
+
+    def get_content(self, content_hash: str) -> Optional[ContentCacheEntry]:
+        return self._contents.get(content_hash)
+
+    def put_content(self, entry: ContentCacheEntry):
+        with self._lock:
+            self._contents[entry.content_hash] = entry
+            self._append("content", entry)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers for a conditional request that only returns changed content"""
+        entry = self.get_url(url)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
@@ -1,22 +1,68 @@
 import json
 import os
 import pathlib
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
 
-from pydantic import BaseModel, TypeAdapter
+from pydantic import BaseModel
 from pyprojroot import here
 
-from ofstedai.models import Chunk, File
+from ofstedai.models import (
+    ChatSession,
+    ChatSessionMessage,
+    Chunk,
+    File,
+    IngestJob,
+    SchoolCrawlState,
+)
+from ofstedai.storage.serialization import deserialize_item
 from ofstedai.storage.storage_handler import BaseStorageHandler
 
 default_root_path = here() / "data"
 
-models_to_store = [Chunk, File]
+models_to_store = [
+    Chunk,
+    File,
+    SchoolCrawlState,
+    ChatSession,
+    ChatSessionMessage,
+    IngestJob,
+]
+
+# Thread pools for file IO, shared by every handler in the process
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """The process-wide thread pool of a size, started on first use"""
+    with _executors_lock:
+        if max_workers not in _executors:
+            _executors[max_workers] = ThreadPoolExecutor(max_workers=max_workers)
+        return _executors[max_workers]
 
 
 class FileSystemStorageHandler(BaseStorageHandler):
-    def __init__(self, root_path: pathlib.Path = default_root_path):
+    def __init__(
+        self,
+        root_path: pathlib.Path = default_root_path,
+        max_workers: int = 8,
+        trusted: bool = False,
+    ):
+        """
+        Args:
+            root_path (pathlib.Path): The directory to keep one folder per model in.
+            max_workers (int): Threads used to read and write files in the
+                batch methods. File IO releases the GIL so these overlap. The
+                threads are shared with other handlers of the same size.
+            trusted (bool): Skip validation on read. Only for data stores
+                written solely by this handler.
+        """
         self.root_path = root_path
+        self.trusted = trusted
+        self.max_workers = max_workers
+        self._executor = _get_executor(max_workers)
 
         # Initialise directories in root path for each model
 
@@ -41,25 +87,31 @@ class FileSystemStorageHandler(BaseStorageHandler):
 
     def write_items(self, items: list):
         """Write a list of objects to a data store"""
-        for item in items:
-            self.write_item(item)
+        list(self._executor.map(self.write_item, items))
 
     def read_item(self, item_uuid: str, model_type: str):
         """Read an object from a data store"""
-        with open(
-            self.root_path / model_type / f"{item_uuid}.json", "r", encoding="utf-8"
-        ) as f:
-            item_dict = json.load(f)
-            model = self.get_model_by_model_type(model_type)
-            item = TypeAdapter(model).validate_python(item_dict)
-            return item
+        with open(self.root_path / model_type / f"{item_uuid}.json", "rb") as f:
+            return deserialize_item(
+                f.read(),
+                self.get_model_by_model_type(model_type),
+                trusted=self.trusted,
+            )
 
     def read_items(self, item_uuids: List[str], model_type: str):
         """Read a list of objects from a data store"""
-        items = []
-        for item_uuid in item_uuids:
-            items.append(self.read_item(item_uuid, model_type))
-        return items
+        return list(
+            self._executor.map(
+                lambda item_uuid: self.read_item(item_uuid, model_type), item_uuids
+            )
+        )
+
+    def iter_items(
+        self, item_uuids: List[str], model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read a list of objects from a data store in batches"""
+        for i in range(0, len(item_uuids), batch_size):
+            yield self.read_items(item_uuids[i : i + batch_size], model_type)
 
     def update_item(self, item_uuid: str, item: type[BaseModel]):
         """Update an object in a data store"""
@@ -67,8 +119,7 @@ class FileSystemStorageHandler(BaseStorageHandler):
 
     def update_items(self, item_uuids: List[str], items: List[type[BaseModel]]):
         """Update a list of objects in a data store"""
-        for item in items:
-            self.write_item(item)
+        self.write_items(items)
 
     def delete_item(self, item_uuid: str, model_type: str):
         """Delete an object from a data store"""
@@ -76,8 +127,11 @@ class FileSystemStorageHandler(BaseStorageHandler):
 
     def delete_items(self, item_uuids: List[str], model_type: str):
         """Delete a list of objects from a data store"""
-        for item_uuid in item_uuids:
-            self.delete_item(item_uuid, model_type)
+        list(
+            self._executor.map(
+                lambda item_uuid: self.delete_item(item_uuid, model_type), item_uuids
+            )
+        )
 
     def list_all_items(self, model_type: str):
         """List all objects of a given type from a data store"""
@@ -87,6 +141,18 @@ class FileSystemStorageHandler(BaseStorageHandler):
 
     def read_all_items(self, model_type: str):
         """Read all objects of a given type from a data store"""
-        raw_file_names = os.listdir(self.root_path / model_type)
-        item_uuids = [x.split(".")[0] for x in raw_file_names]
-        return self.read_items(item_uuids, model_type)
+        return self.read_items(self.list_all_items(model_type), model_type)
+
+    def iter_all_items(
+        self, model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read all objects of a given type from a data store in batches"""
+        with os.scandir(self.root_path / model_type) as entries:
+            batch = []
+            for entry in entries:
+                batch.append(entry.name.split(".")[0])
+                if len(batch) == batch_size:
+                    yield self.read_items(batch, model_type)
+                    batch = []
+            if batch:
+                yield self.read_items(batch, model_type)
@@ -0,0 +1,50 @@
+import json
+from functools import lru_cache
+from typing import Union
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library parser is used without it
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def get_validator(model: type[BaseModel]) -> TypeAdapter:
+    """The TypeAdapter for a model, built once per process rather than per read"""
+    return TypeAdapter(model)
+
+
+def loads(raw: Union[str, bytes]) -> dict:
+    """Parse JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def construct_item(item_dict: dict, model: type[BaseModel]) -> BaseModel:
+    """Build a model from a dict without validating it.
+
+    Only safe for data this package serialised itself. Computed fields such
+    as `token_count` are dropped since they are derived on access.
+    """
+    return model.model_construct(
+        **{k: v for k, v in item_dict.items() if k in model.model_fields}
+    )
+
+
+def deserialize_item(
+    raw: Union[str, bytes], model: type[BaseModel], trusted: bool = False
+) -> BaseModel:
+    """Turn stored JSON back into a model.
+
+    Args:
+        raw (Union[str, bytes]): The stored JSON.
+        model (type[BaseModel]): The model to build.
+        trusted (bool): Skip validation, for data the storage handler wrote
+            itself. Otherwise pydantic parses and validates in one pass.
+    """
+    if trusted:
+        return construct_item(loads(raw), model)
+    return get_validator(model).validate_json(raw)
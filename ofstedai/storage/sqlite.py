@@ -0,0 +1,254 @@
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Iterator, List
+
+from pydantic import BaseModel
+from pyprojroot import here
+
+from ofstedai.storage.serialization import deserialize_item
+from ofstedai.storage.storage_handler import BaseStorageHandler
+
+default_database_path = here() / "data" / "ofstedai.sqlite3"
+
+# Stay well under SQLite's limit on bound parameters per statement
+_MAX_PARAMETERS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    uuid TEXT PRIMARY KEY,
+    model_type TEXT NOT NULL,
+    parent_file_uuid TEXT,
+    school_name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_model_type ON items (model_type);
+CREATE INDEX IF NOT EXISTS items_parent_file_uuid ON items (model_type, parent_file_uuid);
+CREATE INDEX IF NOT EXISTS items_school_name ON items (model_type, school_name);
+"""
+
+
+class SQLiteStorageHandler(BaseStorageHandler):
+    """Stores every object in a single SQLite database file.
+
+    Objects are kept as compact JSON alongside indexed `uuid`,
+    `parent_file_uuid` and `school_name` columns. Batch methods run in one
+    transaction and read in bulk, rather than one file per object.
+    """
+
+    def __init__(
+        self, database_path: pathlib.Path = default_database_path, trusted: bool = False
+    ):
+        """
+        Args:
+            database_path (pathlib.Path): The SQLite database file.
+            trusted (bool): Skip validation on read. Only for databases
+                written solely by this handler.
+        """
+        self.database_path = pathlib.Path(database_path)
+        self.trusted = trusted
+        self.root_path = self.database_path.parent
+
+        if not os.path.exists(self.root_path):
+            os.makedirs(self.root_path)
+
+        self.upload_folder = self.root_path / "Ingest"
+
+        if not os.path.exists(self.upload_folder):
+            os.makedirs(self.upload_folder)
+
+        # sqlite3 connections can't be shared across threads, keep one per thread
+        self._local = threading.local()
+
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.database_path, timeout=30)
+            # WAL lets readers carry on while a batch is being written
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _model_name(self, model_type: str) -> str:
+        return self.get_model_by_model_type(model_type).__name__
+
+    def _to_row(self, item: type[BaseModel]) -> tuple:
+        return (
+            item.uuid,
+            item.__class__.__name__,
+            getattr(item, "parent_file_uuid", None),
+            getattr(item, "school_name", None),
+            json.dumps(item.model_dump(), ensure_ascii=False),
+        )
+
+    def _from_rows(self, rows: List[tuple], model_type: str) -> list:
+        model = self.get_model_by_model_type(model_type)
+        return [deserialize_item(data, model, trusted=self.trusted) for (data,) in rows]
+
+    def write_item(self, item: type[BaseModel]):
+        """Write an object to a data store"""
+        self.write_items([item])
+
+    def write_items(self, items: list):
+        """Write a list of objects to a data store in one transaction"""
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)",
+                [self._to_row(item) for item in items],
+            )
+
+    def read_item(self, item_uuid: str, model_type: str):
+        """Read an object from a data store"""
+        return self.read_items([item_uuid], model_type)[0]
+
+    def read_items(self, item_uuids: List[str], model_type: str):
+        """Read a list of objects from a data store, in the order requested"""
+        model_name = self._model_name(model_type)
+        data_by_uuid = {}
+        for i in range(0, len(item_uuids), _MAX_PARAMETERS):
+            batch = item_uuids[i : i + _MAX_PARAMETERS]
+            rows = (
+                self._connection()
+                .execute(
+                    f"SELECT uuid, data FROM items WHERE model_type = ? AND uuid IN ({','.join('?' * len(batch))})",
+                    [model_name, *batch],
+                )
+                .fetchall()
+            )
+            data_by_uuid.update(rows)
+
+        missing = [uuid for uuid in item_uuids if uuid not in data_by_uuid]
+        if missing:
+            raise FileNotFoundError(f"No {model_type} with uuids {', '.join(missing)}")
+
+        return self._from_rows(
+            [(data_by_uuid[uuid],) for uuid in item_uuids], model_type
+        )
+
+    def iter_items(
+        self, item_uuids: List[str], model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read a list of objects from a data store in batches"""
+        for i in range(0, len(item_uuids), batch_size):
+            yield self.read_items(item_uuids[i : i + batch_size], model_type)
+
+    def read_items_by_parent_file_uuid(
+        self, parent_file_uuid: str, model_type: str = "Chunk"
+    ):
+        """Read every object belonging to a File"""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT data FROM items WHERE model_type = ? AND parent_file_uuid = ?",
+                (self._model_name(model_type), parent_file_uuid),
+            )
+            .fetchall()
+        )
+        return self._from_rows(rows, model_type)
+
+    def read_items_by_school_name(self, school_name: str, model_type: str = "File"):
+        """Read every object belonging to a school"""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT data FROM items WHERE model_type = ? AND school_name = ?",
+                (self._model_name(model_type), school_name),
+            )
+            .fetchall()
+        )
+        return self._from_rows(rows, model_type)
+
+    def update_item(self, item_uuid: str, item: type[BaseModel]):
+        """Update an object in a data store"""
+        self.write_item(item)
+
+    def update_items(self, item_uuids: List[str], items: List[type[BaseModel]]):
+        """Update a list of objects in a data store"""
+        self.write_items(items)
+
+    def delete_item(self, item_uuid: str, model_type: str):
+        """Delete an object from a data store"""
+        self.delete_items([item_uuid], model_type)
+
+    def delete_items(self, item_uuids: List[str], model_type: str):
+        """Delete a list of objects from a data store in one transaction"""
+        with self._connection() as connection:
+            connection.executemany(
+                "DELETE FROM items WHERE model_type = ? AND uuid = ?",
+                [(self._model_name(model_type), uuid) for uuid in item_uuids],
+            )
+
+    def list_all_items(self, model_type: str):
+        """List all objects of a given type from a data store"""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT uuid FROM items WHERE model_type = ?",
+                (self._model_name(model_type),),
+            )
+            .fetchall()
+        )
+        return [uuid for (uuid,) in rows]
+
+    def read_all_items(self, model_type: str):
+        """Read all objects of a given type from a data store"""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT data FROM items WHERE model_type = ?",
+                (self._model_name(model_type),),
+            )
+            .fetchall()
+        )
+        return self._from_rows(rows, model_type)
+
+    def iter_all_items(
+        self, model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read all objects of a given type from a data store in batches"""
+        cursor = self._connection().execute(
+            "SELECT data FROM items WHERE model_type = ?",
+            (self._model_name(model_type),),
+        )
+        while rows := cursor.fetchmany(batch_size):
+            yield self._from_rows(rows, model_type)
+
+
+def migrate_storage(
+    source: BaseStorageHandler,
+    target: BaseStorageHandler,
+    model_types: List[str] = [
+        "File",
+        "Chunk",
+        "SchoolCrawlState",
+        "ChatSession",
+        "ChatSessionMessage",
+        "IngestJob",
+    ],
+    batch_size: int = 1000,
+) -> dict:
+    """Copy every object from one storage handler to another, e.g. from the
+    directory-per-model FileSystemStorageHandler layout into SQLite.
+
+    Args:
+        source (BaseStorageHandler): The store to read from.
+        target (BaseStorageHandler): The store to write to.
+        model_types (List[str]): The types of object to copy.
+        batch_size (int): The number of objects written per transaction.
+
+    Returns:
+        dict: The number of objects copied for each model type.
+    """
+    copied = {}
+    for model_type in model_types:
+        copied[model_type] = 0
+        for items in source.iter_all_items(model_type, batch_size=batch_size):
+            target.write_items(items)
+            copied[model_type] += len(items)
+    return copied
@@ -1,9 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
 
 from pydantic import BaseModel
 
-from ofstedai.models import Chunk, File
+from ofstedai.models import (
+    ChatSession,
+    ChatSessionMessage,
+    Chunk,
+    File,
+    IngestJob,
+    SchoolCrawlState,
+)
 
 
 class BaseStorageHandler(ABC):
@@ -14,7 +21,17 @@ class BaseStorageHandler(ABC):
     """
 
     # dict comprehension for lowercase class name to class
-    model_type_map = {v.__name__.lower(): v for v in [Chunk, File]}
+    model_type_map = {
+        v.__name__.lower(): v
+        for v in [
+            Chunk,
+            File,
+            SchoolCrawlState,
+            ChatSession,
+            ChatSessionMessage,
+            IngestJob,
+        ]
+    }
 
     def get_model_by_model_type(self, model_type):
         return self.model_type_map[model_type.lower()]
@@ -41,7 +58,11 @@ class BaseStorageHandler(ABC):
 
     @abstractmethod
     def read_items(self, item_uuids: List[str], model_type: str):
-        """Read a list of objects from a data store"""
+        """Read a list of objects from a data store, in the order requested.
+
+        Raises:
+            FileNotFoundError: If any of the uuids is not in the data store.
+        """
         pass
 
     @abstractmethod
@@ -73,3 +94,18 @@ class BaseStorageHandler(ABC):
     def read_all_items(self, model_type: str):
         """Read all objects of a given type from a data store"""
         pass
+
+    @abstractmethod
+    def iter_items(
+        self, item_uuids: List[str], model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read a list of objects from a data store in batches"""
+        pass
+
+    @abstractmethod
+    def iter_all_items(
+        self, model_type: str, batch_size: int = 500
+    ) -> Iterator[List[BaseModel]]:
+        """Read all objects of a given type from a data store in batches,
+        without holding them all in memory at once"""
+        pass
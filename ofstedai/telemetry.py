@@ -0,0 +1,256 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Upper bounds in seconds, from a cached lookup up to a slow LLM answer
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Counts of the durations recorded for one stage, by bucket"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.errors += error
+
+
+class Span:
+    """One timed stage. Spans opened inside another belong to its trace."""
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = time.time()
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Add attributes known only once the stage is under way"""
+        self.attributes.update(attributes)
+
+    def record(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "seconds": self.seconds,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Histogram] = {}
+_trace_file = None
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "current_span", default=None
+)
+# When set, finished spans are kept here rather than recorded, see collect_spans
+_collected: contextvars.ContextVar = contextvars.ContextVar("collected", default=None)
+
+
+def _record(record: dict):
+    with _lock:
+        histogram = _histograms.get(record["name"])
+        if histogram is None:
+            histogram = _histograms[record["name"]] = Histogram()
+        histogram.observe(record["seconds"], error=record["error"] is not None)
+        if _trace_file is not None:
+            _trace_file.write(json.dumps(record, default=str) + "\n")
+
+
+def _finish(finished: Span):
+    collected = _collected.get()
+    if collected is not None:
+        collected.append(finished.record())
+    else:
+        _record(finished.record())
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a stage, adding it to the stage's histogram and the trace file.
+
+        with span("embed", texts=len(texts)):
+            ...
+
+    Yields:
+        Span: The open span, to `set` further attributes on.
+    """
+    current = Span(name, attributes, parent=_current_span.get())
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as err:
+        current.error = f"{type(err).__name__}: {err}"
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        _current_span.reset(token)
+        _finish(current)
+
+
+def observe(name: str, seconds: float, **attributes):
+    """Record a duration measured some other way, such as time to first
+    token, as a span within the current one"""
+    observed = Span(name, attributes, parent=_current_span.get())
+    observed.start_time -= seconds
+    observed.seconds = seconds
+    _finish(observed)
+
+
+@contextmanager
+def collect_spans():
+    """Keep the spans finished within the block instead of recording them, so
+    a worker process can send them back to be passed to `record_spans`.
+
+    Yields:
+        List[dict]: Filled with the trace record of each span as it finishes.
+    """
+    collected = []
+    token = _collected.set(collected)
+    try:
+        yield collected
+    finally:
+        _collected.reset(token)
+
+
+def record_spans(records: List[dict]):
+    """Record spans collected in another process"""
+    for record in records:
+        _record(record)
+
+
+def configure_tracing(path: Optional[str]):
+    """Append a JSON line for every span finished from now on to a file, or
+    stop writing them when given None"""
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            if path is not None and _trace_file.name == str(path):
+                return
+            _trace_file.close()
+            _trace_file = None
+        if path:
+            # Line buffered, so the file is complete up to the last span
+            _trace_file = open(path, "a", buffering=1)
+
+
+def metrics_text() -> str:
+    """Every stage's histogram in the Prometheus text exposition format"""
+    with _lock:
+        histograms = sorted(
+            (
+                name,
+                histogram.bucket_counts[:],
+                histogram.count,
+                histogram.sum,
+                histogram.errors,
+            )
+            for name, histogram in _histograms.items()
+        )
+
+    lines = [
+        "# HELP ofstedai_stage_seconds Time spent in each stage of ingest and chat.",
+        "# TYPE ofstedai_stage_seconds histogram",
+    ]
+    for name, bucket_counts, count, total, _ in histograms:
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, bucket_counts):
+            cumulative += bucket_count
+            lines.append(
+                f'ofstedai_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'ofstedai_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}'
+        )
+        lines.append(f'ofstedai_stage_seconds_sum{{stage="{name}"}} {total}')
+        lines.append(f'ofstedai_stage_seconds_count{{stage="{name}"}} {count}')
+
+    lines += [
+        "# HELP ofstedai_stage_errors_total Stages that raised an error.",
+        "# TYPE ofstedai_stage_errors_total counter",
+    ]
+    for name, _, _, _, errors in histograms:
+        lines.append(f'ofstedai_stage_errors_total{{stage="{name}"}} {errors}')
+    return "\n".join(lines) + "\n"
+
+
+def stage_report() -> List[dict]:
+    """Count, total and mean duration of every stage timed so far in this
+    process, most total time first"""
+    with _lock:
+        rows = [
+            {
+                "stage": name,
+                "count": histogram.count,
+                "seconds": round(histogram.sum, 3),
+                "mean_ms": round(histogram.sum / histogram.count * 1000, 1),
+                "errors": histogram.errors,
+            }
+            for name, histogram in _histograms.items()
+        ]
+    return sorted(rows, key=lambda row: -row["seconds"])
+
+
+def reset():
+    """Forget every stage timed so far"""
+    with _lock:
+        _histograms.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1") -> int:
+    """Serve `metrics_text` at http://host:port/metrics from a background
+    thread, for Prometheus to scrape. Only the first call in a process starts
+    a server.
+
+    Returns:
+        int: The port served on, useful when given 0 for any free port.
+    """
+    global _metrics_server
+    with _lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        return _metrics_server.server_address[1]
@@ -0,0 +1,22 @@
+from ofstedai.vectorstore.embedding import EmbeddingCache, EmbeddingService
+from ofstedai.vectorstore.indexing import add_chunks_to_vector_store, chunk_metadatas
+from ofstedai.vectorstore.numpy_store import NumpyVectorStore, quantizations
+from ofstedai.vectorstore.store import (
+    get_embedding_function,
+    get_vector_store,
+    load_vector_store,
+    vector_backends,
+)
+
+__all__ = [
+    "EmbeddingCache",
+    "EmbeddingService",
+    "NumpyVectorStore",
+    "add_chunks_to_vector_store",
+    "chunk_metadatas",
+    "get_embedding_function",
+    "get_vector_store",
+    "load_vector_store",
+    "quantizations",
+    "vector_backends",
+]
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+from ofstedai import telemetry
+from ofstedai.models.file import get_encoding
+from ofstedai.startup import timed
+
+# The model langchain's SentenceTransformerEmbeddings uses by default, kept so
+# existing vector stores stay compatible
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+default_cache_path = pathlib.Path("./data/Cache/embeddings.sqlite3")
+
+
+def hash_text(text: str) -> str:
+    """The same hash as Chunk.text_hash"""
+    return hashlib.md5(text.encode(encoding="UTF-8", errors="strict")).hexdigest()
+
+
+def token_budget_batches(
+    texts: List[str], max_batch_tokens: int, max_batch_size: int = 256
+) -> List[List[int]]:
+    """Group texts into batches by padded token cost rather than a fixed count.
+
+    Texts are sorted by length so each batch pads to a similar length, then
+    batches are filled until the longest text times the batch size would
+    exceed `max_batch_tokens`.
+
+    Args:
+        texts (List[str]): The texts to batch.
+        max_batch_tokens (int): The padded token budget of one batch.
+        max_batch_size (int): A hard cap on texts per batch.
+
+    Returns:
+        List[List[int]]: Batches of indices into `texts`.
+    """
+    token_counts = [len(tokens) for tokens in get_encoding().encode_batch(texts)]
+    order = sorted(range(len(texts)), key=lambda i: token_counts[i])
+
+    batches = []
+    batch = []
+    for i in order:
+        padded_cost = (len(batch) + 1) * max(token_counts[i], 1)
+        if batch and (padded_cost > max_batch_tokens or len(batch) == max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingCache:
+    """Persistent embeddings keyed by (model name, text hash), in SQLite"""
+
+    def __init__(self, path: pathlib.Path = default_cache_path):
+        self.path = pathlib.Path(path)
+        if not os.path.exists(self.path.parent):
+            os.makedirs(self.path.parent)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, text_hash TEXT, vector BLOB, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+
+    def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for i in range(0, len(text_hashes), 500):
+            batch = text_hashes[i : i + 500]
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+            for text_hash, vector in rows:
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [
+                    (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+
+
+class EmbeddingService(Embeddings):
+    """Embeds texts with a sentence transformer, never embedding the same text twice.
+
+    A langchain Embeddings, so it can be handed straight to a vector store.
+    Each call deduplicates its texts by hash, serves what it can from the
+    persistent cache, and embeds the rest in batches sized by token budget.
+    Query embeddings are also kept in a small in-memory LRU.
+
+    Args:
+        model_name (str): The sentence transformer to load.
+        cache (EmbeddingCache, optional): Persistent cache, None disables it.
+        max_batch_tokens (int): Padded token budget for one encode batch.
+        pool_processes (int): When above 0, encode across this many worker
+            processes with sentence-transformers' multi-process pool.
+        query_cache_size (int): Query embeddings kept in memory.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache: Optional[EmbeddingCache] = None,
+        max_batch_tokens: int = 16384,
+        pool_processes: int = 0,
+        query_cache_size: int = 1024,
+    ):
+        self.model_name = model_name
+        self.cache = cache
+        self.max_batch_tokens = max_batch_tokens
+        self.pool_processes = pool_processes
+        self.query_cache_size = query_cache_size
+
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._query_cache: OrderedDict = OrderedDict()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                with timed("load embedding model"):
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+                    if self.pool_processes > 0:
+                        self._pool = self._model.start_multi_process_pool(
+                            target_devices=["cpu"] * self.pool_processes
+                        )
+            return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        model = self._get_model()
+        vectors = [None] * len(texts)
+        for batch in token_budget_batches(texts, self.max_batch_tokens):
+            batch_texts = [texts[i] for i in batch]
+            with telemetry.span("embed", texts=len(batch_texts)):
+                if self._pool is not None:
+                    encoded = model.encode_multi_process(
+                        batch_texts, self._pool, batch_size=len(batch_texts)
+                    )
+                else:
+                    encoded = model.encode(batch_texts, batch_size=len(batch_texts))
+            for i, vector in zip(batch, encoded):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing any embedding computed before for the same text"""
+        text_hashes = [hash_text(text) for text in texts]
+        unique = dict(zip(text_hashes, texts))
+
+        vectors = {}
+        if self.cache is not None:
+            vectors = self.cache.get_many(self.model_name, list(unique.keys()))
+
+        missing = [text_hash for text_hash in unique if text_hash not in vectors]
+        if missing:
+            encoded = dict(
+                zip(missing, self._encode([unique[text_hash] for text_hash in missing]))
+            )
+            if self.cache is not None:
+                self.cache.put_many(self.model_name, encoded)
+            vectors.update(encoded)
+
+        return [vectors[text_hash] for text_hash in text_hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, from memory if it has been asked recently"""
+        with self._lock:
+            if text in self._query_cache:
+                self._query_cache.move_to_end(text)
+                return self._query_cache[text]
+
+        vector = self.embed_documents([text])[0]
+
+        with self._lock:
+            self._query_cache[text] = vector
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return vector
+
+    def close(self):
+        """Stop the encoder process pool, if one was started"""
+        if self._pool is not None:
+            self._model.stop_multi_process_pool(self._pool)
+            self._pool = None
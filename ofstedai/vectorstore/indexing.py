@@ -0,0 +1,65 @@
+import json
+from typing import TYPE_CHECKING, List
+
+from ofstedai.models import Chunk
+from ofstedai.models.file import set_token_counts
+
+if TYPE_CHECKING:
+    from langchain.schema.vectorstore import VectorStore
+
+
+def chunk_metadatas(chunks: List[Chunk]) -> List[dict]:
+    """Build vector store safe metadata for a list of Chunks
+
+    Args:
+        chunks (List[Chunk]): The chunks to build metadata for
+
+    Returns:
+        List[dict]: One flat metadata dict per chunk, with lists and dicts
+            converted to JSON strings.
+    """
+
+    set_token_counts(chunks)
+    metadatas = [dict(chunk.metadata) for chunk in chunks]
+
+    for i, chunk in enumerate(chunks):
+        # add other chunk fields to metadata
+        metadatas[i]["uuid"] = chunk.uuid
+        metadatas[i]["parent_file_uuid"] = chunk.parent_file_uuid
+        metadatas[i]["index"] = chunk.index
+        metadatas[i]["created_datetime"] = chunk.created_datetime
+        metadatas[i]["token_count"] = chunk.token_count
+        metadatas[i]["text_hash"] = chunk.text_hash
+
+    sanitised_metadatas = []
+
+    for metadata in metadatas:
+        for k, v in metadata.items():
+            if isinstance(v, list) or isinstance(v, dict):
+                # Converting {k} metadata into JSON string to make vectorstore safe
+                metadata[k] = json.dumps(metadata[k], ensure_ascii=False)
+
+        sanitised_metadatas.append(metadata)
+
+    return sanitised_metadatas
+
+
+def add_chunks_to_vector_store(
+    vector_store: "VectorStore", chunks: List[Chunk], batch_size: int = 160
+) -> None:
+    """Takes a list of Chunks and embeds them into the vector store
+
+    Args:
+        vector_store (VectorStore): The vector store to add the chunks to
+        chunks (List[Chunk]): The chunks to be added to the vector store
+        batch_size (int): The number of chunks embedded per call
+    """
+
+    sanitised_metadatas = chunk_metadatas(chunks)
+
+    for i in range(0, len(chunks), batch_size):
+        vector_store.add_texts(
+            texts=[chunk.text for chunk in chunks[i : i + batch_size]],
+            metadatas=[meta for meta in sanitised_metadatas[i : i + batch_size]],
+            ids=[chunk.uuid for chunk in chunks[i : i + batch_size]],
+        )
@@ -0,0 +1,697 @@
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.embeddings import Embeddings
+from langchain.schema.vectorstore import VectorStore
+
+# Rows scored per matrix multiply, bounding the temporary arrays of a search
+_BLOCK_ROWS = 65536
+# Quantized rows are converted to float32 to be scored, so take fewer at once
+# to bound the converted copy. The conversion, not the block size, sets the
+# cost: float16 searches are several times slower than float32 ones, as
+# numpy converts float16 slowly and its float16 matmul is slower still.
+_QUANTIZED_BLOCK_ROWS = 8192
+# Stay well under SQLite's limit on bound parameters per statement
+_MAX_PARAMETERS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    uuid TEXT NOT NULL,
+    parent_file_uuid TEXT,
+    cluster INTEGER,
+    document TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_uuid ON rows (uuid);
+CREATE INDEX IF NOT EXISTS rows_parent_file_uuid ON rows (parent_file_uuid);
+"""
+
+
+quantizations = ["float16", "int8"]
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 scalar quantization with one scale per vector, so rows
+    can be quantized as they are appended without retraining anything.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The int8 codes and float32 scales,
+            where `codes * scales[:, None]` approximates `vectors`.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _write_rows(path: pathlib.Path, row: int, data: np.ndarray):
+    """Write rows of an array file starting at a row, overwriting anything
+    left there by a write that was never committed"""
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        f.seek(row * data[0].nbytes)
+        f.write(np.ascontiguousarray(data).tobytes())
+
+
+def kmeans(
+    vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Lloyd's k-means, returning the cluster centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        for cluster in range(n_clusters):
+            members = vectors[assignments == cluster]
+            if len(members) > 0:
+                centroids[cluster] = members.mean(axis=0)
+    return centroids
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """The index of the closest centroid to each vector, by L2 distance"""
+    distances = (centroids**2).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1)
+
+
+class NumpyVectorStore(VectorStore):
+    """A vector store kept as a memory-mapped float32 array.
+
+    Embeddings are appended to `vectors.f32` under `persist_directory`, one
+    row per chunk, with their squared norms in `norms.f32`. Chunk uuids,
+    text and metadata live in a side table in `index.sqlite3` keyed by row.
+    Searches score blocks of rows with one matrix multiply each and keep
+    the top k, ranking by squared L2 distance as Chroma does.
+
+    The arrays are opened read only with `np.memmap`, so every process
+    using the same directory shares one copy through the OS page cache
+    rather than loading its own. Appends from any process are picked up on
+    the next search.
+
+    After `build_clusters`, searches without a filter only score the rows
+    in the `n_probe` clusters nearest the query, an IVF index for large
+    corpora. Filtered searches always score every row in scope.
+
+    After `quantize`, a float16 or int8 copy of the vectors is kept as well.
+    Searching with `quantization` set scans that copy instead, then rescores
+    the best `k * rescore_factor` candidates exactly against the float32
+    rows. Only the quantized copy and the norms need to stay in memory, a
+    half or a quarter of the float32 array. This saves memory, not time:
+    int8 searches are a little slower than float32 and float16 ones much
+    slower.
+
+    Args:
+        persist_directory (str): Where the index files are kept.
+        embedding_function (Embeddings): Embeds texts and queries.
+        n_probe (int): Clusters searched per query once clustered.
+        quantization (str, optional): One of `quantizations` to search in,
+            once built with `quantize`. Until then float32 is searched.
+        rescore_factor (int): Candidates rescored exactly per result.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Embeddings,
+        n_probe: int = 8,
+        quantization: Optional[str] = None,
+        rescore_factor: int = 4,
+    ):
+        if quantization is not None and quantization not in quantizations:
+            raise ValueError(
+                f"Quantization {quantization} is not supported, use one of {quantizations}"
+            )
+        self.persist_directory = pathlib.Path(persist_directory)
+        self.embedding_function = embedding_function
+        self.n_probe = n_probe
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+
+        if not os.path.exists(self.persist_directory):
+            os.makedirs(self.persist_directory)
+        self.vectors_path = self.persist_directory / "vectors.f32"
+        self.norms_path = self.persist_directory / "norms.f32"
+        self.centroids_path = self.persist_directory / "centroids.npy"
+        self.float16_path = self.persist_directory / "vectors.f16"
+        self.int8_path = self.persist_directory / "vectors.i8"
+        self.scales_path = self.persist_directory / "scales.f32"
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+        self._reset()
+        self._refresh()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.persist_directory / "index.sqlite3", timeout=30
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _settings(self, connection: sqlite3.Connection) -> Dict[str, int]:
+        return {
+            key: int(value)
+            for key, value in connection.execute("SELECT key, value FROM settings")
+        }
+
+    def _reset(self):
+        # The generation of the side table this process has read, see _refresh
+        self._generation = None
+        self._count = 0
+        self._dim = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        # The quantized vectors searched in place of _vectors, if built
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._clusters = np.zeros(0, dtype=np.int32)
+        self._centroids: Optional[np.ndarray] = None
+        self._row_by_uuid: Dict[str, int] = {}
+        self._rows_by_parent: Dict[str, List[int]] = {}
+
+    def _grow(self, count: int):
+        if count > len(self._alive):
+            capacity = max(count, 2 * len(self._alive), 1024)
+            self._alive = np.resize(self._alive, capacity)
+            self._alive[self._count :] = False
+            self._clusters = np.resize(self._clusters, capacity)
+
+    def _map(self, count: int, settings: Dict[str, int]):
+        self._count = count
+        self._vectors = self._norms = self._codes = self._scales = None
+        if count == 0:
+            return
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r", shape=(count, self._dim)
+        )
+        self._norms = np.memmap(
+            self.norms_path, dtype=np.float32, mode="r", shape=(count,)
+        )
+        if self.quantization == "float16" and settings.get("float16"):
+            self._codes = np.memmap(
+                self.float16_path, dtype=np.float16, mode="r", shape=(count, self._dim)
+            )
+        elif self.quantization == "int8" and settings.get("int8"):
+            self._codes = np.memmap(
+                self.int8_path, dtype=np.int8, mode="r", shape=(count, self._dim)
+            )
+            self._scales = np.memmap(
+                self.scales_path, dtype=np.float32, mode="r", shape=(count,)
+            )
+
+    def _quantized_available(self, settings: Dict[str, int]) -> bool:
+        return (
+            self.quantization is not None
+            and bool(settings.get(self.quantization))
+            and self._codes is None
+        )
+
+    def _refresh(self):
+        """Catch up with rows written since the side table was last read.
+
+        Appends only read the new rows. Deletes and re-clustering bump the
+        generation, which makes every process reload the side table.
+        """
+        with self._lock:
+            settings = self._settings(self._connection())
+            count = settings.get("count", 0)
+            generation = settings.get("generation", 0)
+            if generation != self._generation:
+                self._reset()
+                self._generation = generation
+            elif count == self._count and not self._quantized_available(settings):
+                return
+
+            self._dim = settings.get("dim", 0)
+            if self._centroids is None and os.path.exists(self.centroids_path):
+                self._centroids = np.load(self.centroids_path)
+
+            rows = self._connection().execute(
+                "SELECT row, uuid, parent_file_uuid, cluster FROM rows "
+                "WHERE row >= ? AND row < ?",
+                (self._count, count),
+            )
+            self._grow(count)
+            for row, uuid, parent_file_uuid, cluster in rows:
+                self._add_to_side_table(row, uuid, parent_file_uuid, cluster)
+            self._map(count, settings)
+
+    def _add_to_side_table(
+        self, row: int, uuid: str, parent_file_uuid: Optional[str], cluster
+    ):
+        self._row_by_uuid[uuid] = row
+        self._rows_by_parent.setdefault(parent_file_uuid, []).append(row)
+        self._alive[row] = True
+        self._clusters[row] = -1 if cluster is None else cluster
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Append already embedded texts, replacing any with the same ids"""
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [metadata.get("uuid") or str(uuid4()) for metadata in metadatas]
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(ids) == 0:
+            return []
+
+        with self._lock:
+            # BEGIN IMMEDIATE serialises writers across processes, so row
+            # numbers and file offsets stay in step
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                settings = self._settings(connection)
+                count = settings.get("count", 0)
+                dim = settings.get("dim", vectors.shape[1])
+                if vectors.shape[1] != dim:
+                    raise ValueError(
+                        f"Embeddings have {vectors.shape[1]} dimensions, the index has {dim}"
+                    )
+
+                replaced = self._delete_rows(connection, ids)
+
+                clusters = [None] * len(ids)
+                if os.path.exists(self.centroids_path):
+                    centroids = np.load(self.centroids_path)
+                    clusters = nearest_centroids(vectors, centroids).tolist()
+
+                # Written at the committed row count, so a failed write is
+                # overwritten by the next one
+                _write_rows(self.vectors_path, count, vectors)
+                _write_rows(self.norms_path, count, (vectors**2).sum(axis=1))
+                self._write_quantized(settings, count, vectors)
+
+                connection.executemany(
+                    "INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            count + i,
+                            uuid,
+                            metadata.get("parent_file_uuid"),
+                            cluster,
+                            text,
+                            json.dumps(metadata, ensure_ascii=False),
+                        )
+                        for i, (uuid, text, metadata, cluster) in enumerate(
+                            zip(ids, texts, metadatas, clusters)
+                        )
+                    ],
+                )
+                new_settings = {"count": count + len(ids), "dim": dim}
+                if replaced:
+                    new_settings["generation"] = settings.get("generation", 0) + 1
+                connection.executemany(
+                    "INSERT OR REPLACE INTO settings VALUES (?, ?)",
+                    list(new_settings.items()),
+                )
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+            self._refresh()
+        return ids
+
+    def _write_quantized(self, settings: Dict[str, int], row: int, vectors: np.ndarray):
+        """Keep every quantized copy that has been built up to date"""
+        if settings.get("float16"):
+            _write_rows(self.float16_path, row, vectors.astype(np.float16))
+        if settings.get("int8"):
+            codes, scales = quantize_int8(vectors)
+            _write_rows(self.int8_path, row, codes)
+            _write_rows(self.scales_path, row, scales)
+
+    def quantize(self, quantization: str):
+        """Build a quantized copy of every row, kept up to date from then on.
+
+        Args:
+            quantization (str): One of `quantizations`.
+        """
+        if quantization not in quantizations:
+            raise ValueError(
+                f"Quantization {quantization} is not supported, use one of {quantizations}"
+            )
+        with self._lock:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                settings = self._settings(connection)
+                count = settings.get("count", 0)
+                if count > 0:
+                    vectors = np.memmap(
+                        self.vectors_path,
+                        dtype=np.float32,
+                        mode="r",
+                        shape=(count, settings["dim"]),
+                    )
+                    build = {**settings, quantization: 1}
+                    build.pop("int8" if quantization == "float16" else "float16", None)
+                    for start in range(0, count, _BLOCK_ROWS):
+                        self._write_quantized(
+                            build,
+                            start,
+                            np.asarray(vectors[start : start + _BLOCK_ROWS]),
+                        )
+                connection.execute(
+                    "INSERT OR REPLACE INTO settings VALUES (?, 1)", (quantization,)
+                )
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            self._refresh()
+
+    def _delete_rows(self, connection: sqlite3.Connection, ids: List[str]) -> int:
+        deleted = 0
+        for i in range(0, len(ids), _MAX_PARAMETERS):
+            batch = ids[i : i + _MAX_PARAMETERS]
+            deleted += connection.execute(
+                f"DELETE FROM rows WHERE uuid IN ({','.join('?' * len(batch))})", batch
+            ).rowcount
+        return deleted
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed and append texts, replacing any with the same ids"""
+        texts = list(texts)
+        return self.add_embeddings(
+            texts, self.embedding_function.embed_documents(texts), metadatas, ids
+        )
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Remove rows from the side table. Their vectors stay in the array,
+        masked out, until the index is rebuilt."""
+        with self._lock:
+            connection = self._connection()
+            with connection:
+                if self._delete_rows(connection, ids or []):
+                    generation = self._settings(connection).get("generation", 0) + 1
+                    connection.execute(
+                        "INSERT OR REPLACE INTO settings VALUES ('generation', ?)",
+                        (generation,),
+                    )
+            self._refresh()
+        return True
+
+    def count(self) -> int:
+        """The number of live rows"""
+        self._refresh()
+        return len(self._row_by_uuid)
+
+    def build_clusters(
+        self, n_clusters: int, sample_size: int = 50000, iterations: int = 10
+    ):
+        """Cluster the index for IVF search, assigning every row to its
+        nearest centroid. Rows appended later are assigned as they arrive."""
+        self._refresh()
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[: self._count])
+            if len(live_rows) == 0:
+                return
+            sample = np.random.default_rng(0).choice(
+                live_rows, min(sample_size, len(live_rows)), replace=False
+            )
+            centroids = kmeans(
+                np.asarray(self._vectors[np.sort(sample)]),
+                min(n_clusters, len(sample)),
+                iterations,
+            )
+
+            # Assigned under BEGIN IMMEDIATE, so no other process can append
+            # a row between reading the rows and saving the new centroids
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                settings = self._settings(connection)
+                vectors = np.memmap(
+                    self.vectors_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(settings["count"], settings["dim"]),
+                )
+                live_rows = np.asarray(
+                    [row for (row,) in connection.execute("SELECT row FROM rows")],
+                    dtype=np.int64,
+                )
+                live_rows.sort()
+
+                assignments = []
+                for start in range(0, len(live_rows), _BLOCK_ROWS):
+                    rows = live_rows[start : start + _BLOCK_ROWS]
+                    clusters = nearest_centroids(np.asarray(vectors[rows]), centroids)
+                    assignments.extend(zip(clusters.tolist(), rows.tolist()))
+
+                connection.executemany(
+                    "UPDATE rows SET cluster = ? WHERE row = ?", assignments
+                )
+                generation = settings.get("generation", 0) + 1
+                connection.execute(
+                    "INSERT OR REPLACE INTO settings VALUES ('generation', ?)",
+                    (generation,),
+                )
+                np.save(self.centroids_path, centroids)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            self._refresh()
+
+    def _rows_for_filter(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """The rows matching a Chroma style filter on uuid or parent_file_uuid,
+        or None for no filter"""
+        if not filter:
+            return None
+        if len(filter) != 1:
+            raise ValueError(f"Unsupported filter {filter}")
+
+        ((field, condition),) = filter.items()
+        values = condition["$in"] if isinstance(condition, dict) else [condition]
+        if field == "uuid":
+            rows = [self._row_by_uuid[v] for v in values if v in self._row_by_uuid]
+        elif field == "parent_file_uuid":
+            rows = [row for v in values for row in self._rows_by_parent.get(v, [])]
+        else:
+            raise ValueError(f"Unsupported filter {filter}")
+
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        return rows[self._alive[rows]]
+
+    def _probe_rows(
+        self, query: np.ndarray, clusters: np.ndarray, alive: np.ndarray
+    ) -> Optional[np.ndarray]:
+        """The rows in the clusters nearest the query, or None when unclustered"""
+        if self._centroids is None:
+            return None
+        distances = ((self._centroids - query) ** 2).sum(axis=1)
+        probe = np.argsort(distances)[: self.n_probe]
+        return np.flatnonzero(np.isin(clusters, probe) & alive)
+
+    def _search(
+        self, query: np.ndarray, k: int, filter: Optional[dict]
+    ) -> List[Tuple[int, float]]:
+        self._refresh()
+        # A consistent view of the index, so a concurrent append can't change
+        # it part way through scoring
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return []
+            vectors, norms = self._vectors, self._norms
+            codes, scales = self._codes, self._scales
+            alive = self._alive[:count].copy()
+            rows = self._rows_for_filter(filter)
+            if rows is None:
+                rows = self._probe_rows(query, self._clusters[:count], alive)
+
+        query_norm = query @ query
+
+        def distances(index) -> np.ndarray:
+            # Squared L2, from exact norms and exact or quantized dot products
+            if codes is None:
+                dots = vectors[index] @ query
+            else:
+                dots = np.asarray(codes[index], dtype=np.float32) @ query
+                if scales is not None:
+                    dots *= scales[index]
+            return np.asarray(norms[index]) - 2 * np.asarray(dots) + query_norm
+
+        block_rows = _BLOCK_ROWS if codes is None else _QUANTIZED_BLOCK_ROWS
+        fetch_k = k if codes is None else k * self.rescore_factor
+
+        best_rows, best_distances = [], []
+        if rows is None:
+            for start in range(0, count, block_rows):
+                end = min(start + block_rows, count)
+                block_distances = distances(slice(start, end))
+                block_distances[~alive[start:end]] = np.inf
+                top = np.argpartition(
+                    block_distances, min(fetch_k, len(block_distances) - 1)
+                )[:fetch_k]
+                best_rows.append(top + start)
+                best_distances.append(block_distances[top])
+        else:
+            for start in range(0, len(rows), block_rows):
+                block = rows[start : start + block_rows]
+                block_distances = distances(block)
+                top = np.argpartition(
+                    block_distances, min(fetch_k, len(block_distances) - 1)
+                )[:fetch_k]
+                best_rows.append(block[top])
+                best_distances.append(block_distances[top])
+
+        if not best_rows:
+            return []
+        rows = np.concatenate(best_rows)
+        found = np.concatenate(best_distances)
+        keep = np.isfinite(found)
+        rows, found = rows[keep], found[keep]
+        order = np.argsort(found)[:fetch_k]
+        rows, found = rows[order], found[order]
+
+        if codes is not None:
+            # Rescore the candidates exactly against their float32 rows,
+            # read in file order
+            rows = np.sort(rows)
+            found = (
+                np.asarray(norms[rows])
+                - 2 * np.asarray(vectors[rows] @ query)
+                + query_norm
+            )
+            order = np.argsort(found)[:k]
+            rows, found = rows[order], found[order]
+
+        return [(int(row), float(distance)) for row, distance in zip(rows, found)]
+
+    def _documents(self, rows: List[int]) -> Dict[int, Tuple[str, Document]]:
+        """The uuid and Document stored for each row"""
+        documents = {}
+        for i in range(0, len(rows), _MAX_PARAMETERS):
+            batch = rows[i : i + _MAX_PARAMETERS]
+            for row, uuid, document, metadata in self._connection().execute(
+                "SELECT row, uuid, document, metadata FROM rows "
+                f"WHERE row IN ({','.join('?' * len(batch))})",
+                batch,
+            ):
+                documents[row] = (
+                    uuid,
+                    Document(page_content=document, metadata=json.loads(metadata)),
+                )
+        return documents
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, float]]:
+        results = self._search(np.asarray(embedding, dtype=np.float32), k, filter)
+        documents = self._documents([row for row, _ in results])
+        return [
+            (documents[row][1], distance)
+            for row, distance in results
+            if row in documents
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self.embedding_function.embed_query(query), k=k, filter=filter
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_by_vector_with_score(
+                embedding, k=k, filter=filter
+            )
+        ]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)
+        ]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[dict] = None,
+        include: List[str] = ["documents", "metadatas"],
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> dict:
+        """Read rows by id or filter, shaped like Chroma's `get`"""
+        self._refresh()
+        with self._lock:
+            vectors, dim = self._vectors, self._dim
+            if ids is not None:
+                rows = self._rows_for_filter({"uuid": {"$in": ids}})
+            elif where is not None:
+                rows = self._rows_for_filter(where)
+            else:
+                rows = np.flatnonzero(self._alive[: self._count])
+        rows = rows[offset : None if limit is None else offset + limit]
+
+        documents = self._documents(rows.tolist())
+        rows = np.asarray([row for row in rows.tolist() if row in documents], dtype=int)
+        result = {"ids": [documents[row][0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [documents[row][1].page_content for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [documents[row][1].metadata for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = (
+                np.asarray(vectors[rows]) if len(rows) else np.zeros((0, dim))
+            )
+        return result
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: str = os.path.join("data", "VectorStore"),
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(persist_directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,88 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from ofstedai.startup import timed
+from ofstedai.vectorstore.embedding import EmbeddingCache, EmbeddingService
+
+if TYPE_CHECKING:
+    from langchain.schema.embeddings import Embeddings
+    from langchain.schema.vectorstore import VectorStore
+
+default_persist_directory = os.path.join("data", "VectorStore")
+vector_backends = ["chroma", "numpy"]
+
+# Models are shared by every session and thread in the process, and only
+# loaded the first time something needs them
+_lock = threading.RLock()
+_embedding_function: Optional["Embeddings"] = None
+_vector_stores: Dict[Tuple[str, str], "VectorStore"] = {}
+
+
+def get_embedding_function() -> "Embeddings":
+    """The process-wide embedding model, loaded on first use"""
+    global _embedding_function
+    with _lock:
+        if _embedding_function is None:
+            # The model itself is loaded by the service on its first embed
+            _embedding_function = EmbeddingService(
+                cache=EmbeddingCache(),
+                pool_processes=int(os.environ.get("EMBEDDING_PROCESSES", 0)),
+            )
+        return _embedding_function
+
+
+def default_vector_backend() -> str:
+    """The backend named by the VECTOR_BACKEND environment variable"""
+    return os.environ.get("VECTOR_BACKEND") or "chroma"
+
+
+def load_vector_store(
+    persist_directory: str = default_persist_directory,
+    embedding_function: Optional["Embeddings"] = None,
+    backend: Optional[str] = None,
+) -> "VectorStore":
+    """Open the persistent vector store, creating it if needed
+
+    Args:
+        persist_directory (str): Where the vector store keeps its data.
+        embedding_function (Embeddings, optional): Defaults to the shared
+            EmbeddingService.
+        backend (str, optional): One of `vector_backends`, by default
+            `default_vector_backend()`.
+    """
+    backend = backend or default_vector_backend()
+    with timed("open vector store"):
+        if not os.path.exists(persist_directory):
+            os.makedirs(persist_directory)
+
+        if backend == "chroma":
+            from langchain_community.vectorstores import Chroma
+
+            return Chroma(
+                embedding_function=embedding_function or get_embedding_function(),
+                persist_directory=persist_directory,
+            )
+        elif backend == "numpy":
+            from ofstedai.vectorstore.numpy_store import NumpyVectorStore
+
+            return NumpyVectorStore(
+                persist_directory=persist_directory,
+                embedding_function=embedding_function or get_embedding_function(),
+                quantization=os.environ.get("VECTOR_QUANTIZATION") or None,
+            )
+    raise ValueError(
+        f"Vector backend {backend} is not supported, use one of {vector_backends}"
+    )
+
+
+def get_vector_store(
+    persist_directory: str = default_persist_directory, backend: Optional[str] = None
+) -> "VectorStore":
+    """The process-wide vector store for a directory, opened on first use"""
+    backend = backend or default_vector_backend()
+    key = (os.path.abspath(persist_directory), backend)
+    with _lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = load_vector_store(persist_directory, backend=backend)
+        return _vector_stores[key]